@@ -1,86 +1,105 @@
-from langchain_core.prompts import PromptTemplate
-from langchain_groq import ChatGroq
+from Utils.LLMClients import get_chat_model, invoke_model, ainvoke_model
+from Utils.Prompts import register_prompt, get_prompt
 
-class Agent:
-    def __init__(self, medical_report=None, role=None, extra_info=None):
-        self.medical_report = medical_report
-        self.role = role
-        self.extra_info = extra_info
-        # Initialize the prompt based on role and other info
-        self.prompt_template = self.create_prompt_template()
-        # Initialize the model
-        self.model = ChatGroq(temperature=0, model="llama-3.3-70b-versatile")
-
-    def create_prompt_template(self):
-        if self.role == "MultidisciplinaryTeam":
-            templates = f"""
-                Act like a multidisciplinary team of healthcare professionals.
-                You will receive a medical report of a patient visited by a Cardiologist, Psychologist, and Pulmonologist.
-                Task: Review the patient's medical report from the Cardiologist, Psychologist, and Pulmonologist, analyze them and come up with a list of 3 possible health issues of the patient.
-                Just return a list of bullet points of 3 possible health issues of the patient and for each issue provide the reason.
-                
-                Cardiologist Report: {self.extra_info.get('cardiologist_report', '')}
-                Psychologist Report: {self.extra_info.get('psychologist_report', '')}
-                Pulmonologist Report: {self.extra_info.get('pulmonologist_report', '')}
-            """
-        else:
-            templates = {
-                "Cardiologist": """
+register_prompt("Agents.Cardiologist", """
                     Act like a cardiologist. You will receive a medical report of a patient.
                     Task: Review the patient's cardiac workup, including ECG, blood tests, Holter monitor results, and echocardiogram.
                     Focus: Determine if there are any subtle signs of cardiac issues that could explain the patient’s symptoms. Rule out any underlying heart conditions, such as arrhythmias or structural abnormalities, that might be missed on routine testing.
                     Recommendation: Provide guidance on any further cardiac testing or monitoring needed to ensure there are no hidden heart-related concerns. Suggest potential management strategies if a cardiac issue is identified.
                     Please only return the possible causes of the patient's symptoms and the recommended next steps.
                     Medical Report: {medical_report}
-                """,
-                "Psychologist": """
+                """)
+
+register_prompt("Agents.Psychologist", """
                     Act like a psychologist. You will receive a patient's report.
                     Task: Review the patient's report and provide a psychological assessment.
                     Focus: Identify any potential mental health issues, such as anxiety, depression, or trauma, that may be affecting the patient's well-being.
                     Recommendation: Offer guidance on how to address these mental health concerns, including therapy, counseling, or other interventions.
                     Please only return the possible mental health issues and the recommended next steps.
                     Patient's Report: {medical_report}
-                """,
-                "Pulmonologist": """
+                """)
+
+register_prompt("Agents.Pulmonologist", """
                     Act like a pulmonologist. You will receive a patient's report.
                     Task: Review the patient's report and provide a pulmonary assessment.
                     Focus: Identify any potential respiratory issues, such as asthma, COPD, or lung infections, that may be affecting the patient's breathing.
                     Recommendation: Offer guidance on how to address these respiratory concerns, including pulmonary function tests, imaging studies, or other interventions.
                     Please only return the possible respiratory issues and the recommended next steps.
                     Patient's Report: {medical_report}
-                """
-            }
-            templates = templates[self.role]
-        return PromptTemplate.from_template(templates)
+                """)
+
+# Reports are template variables rather than f-string text so that
+# braces inside a specialist's answer are not parsed as placeholders
+register_prompt("Agents.MultidisciplinaryTeam", """
+                Act like a multidisciplinary team of healthcare professionals.
+                You will receive a medical report of a patient visited by a Cardiologist, Psychologist, and Pulmonologist.
+                Task: Review the patient's medical report from the Cardiologist, Psychologist, and Pulmonologist, analyze them and come up with a list of 3 possible health issues of the patient.
+                Just return a list of bullet points of 3 possible health issues of the patient and for each issue provide the reason.
+                
+                Cardiologist Report: {cardiologist_report}
+                Psychologist Report: {psychologist_report}
+                Pulmonologist Report: {pulmonologist_report}
+            """)
+
+
+class Agent:
+    def __init__(self, medical_report=None, role=None, extra_info=None, model_name="llama-3.3-70b-versatile"):
+        self.medical_report = medical_report
+        self.role = role
+        self.extra_info = extra_info
+        # Initialize the prompt based on role and other info
+        self.prompt_template = self.create_prompt_template()
+        # Initialize the model
+        self.model = get_chat_model(model_name, temperature=0)
+
+    def create_prompt_template(self):
+        return get_prompt(f"Agents.{self.role}")
     
+    def format_prompt(self):
+        inputs = {
+            "cardiologist_report": "",
+            "psychologist_report": "",
+            "pulmonologist_report": ""
+        }
+        inputs.update(self.extra_info or {})
+        return self.prompt_template.format(medical_report=self.medical_report, **inputs)
+
     def run(self):
         print(f"{self.role} is running...")
-        prompt = self.prompt_template.format(medical_report=self.medical_report)
+        prompt = self.format_prompt()
+        try:
+            return invoke_model(self.model, prompt, role=self.role)
+        except Exception as e:
+            print("Error occurred:", e)
+            return None
+
+    async def arun(self):
+        print(f"{self.role} is running...")
+        prompt = self.format_prompt()
         try:
-            response = self.model.invoke(prompt)
-            return response.content
+            return await ainvoke_model(self.model, prompt, role=self.role)
         except Exception as e:
             print("Error occurred:", e)
             return None
 
 # Define specialized agent classes
 class Cardiologist(Agent):
-    def __init__(self, medical_report):
-        super().__init__(medical_report, "Cardiologist")
+    def __init__(self, medical_report, model_name="llama-3.3-70b-versatile"):
+        super().__init__(medical_report, "Cardiologist", model_name=model_name)
 
 class Psychologist(Agent):
-    def __init__(self, medical_report):
-        super().__init__(medical_report, "Psychologist")
+    def __init__(self, medical_report, model_name="llama-3.3-70b-versatile"):
+        super().__init__(medical_report, "Psychologist", model_name=model_name)
 
 class Pulmonologist(Agent):
-    def __init__(self, medical_report):
-        super().__init__(medical_report, "Pulmonologist")
+    def __init__(self, medical_report, model_name="llama-3.3-70b-versatile"):
+        super().__init__(medical_report, "Pulmonologist", model_name=model_name)
 
 class MultidisciplinaryTeam(Agent):
-    def __init__(self, cardiologist_report, psychologist_report, pulmonologist_report):
+    def __init__(self, cardiologist_report, psychologist_report, pulmonologist_report, model_name="llama-3.3-70b-versatile"):
         extra_info = {
             "cardiologist_report": cardiologist_report,
             "psychologist_report": psychologist_report,
             "pulmonologist_report": pulmonologist_report
         }
-        super().__init__(role="MultidisciplinaryTeam", extra_info=extra_info)
+        super().__init__(role="MultidisciplinaryTeam", extra_info=extra_info, model_name=model_name)
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AnalysisJob:
+    """A background analysis made of named steps
+
+    Steps run concurrently on the runner's thread pool and are called with
+    the job, so a step can use ``job.result_of(name)`` to wait for a step
+    listed before it (steps start in order, so this cannot deadlock the pool).
+    Each records its wall time; a step that raises stores ``{"error": ...}``
+    as its result, the same shape agents return when a model call fails.
+    """
+
+    def __init__(self, key, step_names):
+        self.key = key
+        self.step_names = list(step_names)
+        self.results = {}
+        self.timings = {}
+        self.started = time.perf_counter()
+        self.finished = None
+        self._done = threading.Event()
+        self._step_done = {name: threading.Event() for name in self.step_names}
+        self._lock = threading.Lock()
+
+    def _run_step(self, name, fn):
+        start = time.perf_counter()
+        try:
+            result = fn(self)
+        except Exception as e:
+            result = {"error": str(e)}
+        with self._lock:
+            self.results[name] = result
+            self.timings[name] = time.perf_counter() - start
+            if len(self.results) == len(self.step_names):
+                self.finished = time.perf_counter()
+                self._done.set()
+        self._step_done[name].set()
+
+    def result_of(self, name, timeout=None):
+        """Result of step ``name``, waiting for it to finish"""
+        self._step_done[name].wait(timeout)
+        return self.results.get(name)
+
+    @property
+    def progress(self):
+        """Fraction of steps finished"""
+        return len(self.results) / len(self.step_names) if self.step_names else 1.0
+
+    @property
+    def pending(self):
+        return [name for name in self.step_names if name not in self.results]
+
+    @property
+    def elapsed(self):
+        """Wall time of the whole job so far (or in total once done)"""
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def failed(self):
+        return any(isinstance(r, dict) and "error" in r for r in self.results.values())
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block up to ``timeout`` seconds; True once every step has finished"""
+        return self._done.wait(timeout)
+
+
+class AnalysisRunner:
+    """Run analyses off the Streamlit script thread and cache them per input
+
+    ``submit`` returns the existing job when the same kind and payload were
+    submitted before (finished or still running) and did not fail, so
+    re-clicking an analyze button or rerunning the script costs nothing.
+    """
+
+    def __init__(self, max_workers=4, max_entries=128):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+        self.max_entries = max_entries
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind, payload):
+        raw = json.dumps([kind, payload], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def submit(self, kind, payload, steps):
+        """Start ``steps`` ({name: fn(job)}) for ``payload`` unless a cached job exists"""
+        key = self.make_key(kind, payload)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not (job.done() and job.failed):
+                self._jobs.move_to_end(key)
+                return job
+            job = AnalysisJob(key, steps)
+            self._jobs[key] = job
+            while len(self._jobs) > self.max_entries:
+                self._jobs.popitem(last=False)
+        for name, fn in steps.items():
+            self.executor.submit(job._run_step, name, fn)
+        return job
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_analysis_runner():
+    """Process-wide runner shared by every Streamlit session"""
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = AnalysisRunner()
+    return _runner
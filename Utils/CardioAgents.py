@@ -1,21 +1,83 @@
-from langchain_core.prompts import PromptTemplate
-from langchain_groq import ChatGroq
+from Utils.LLMClients import get_chat_model
+from Utils.Prompts import register_prompt, get_prompt
+from Utils.RateLimiter import URGENT, HIGH, NORMAL, LOW
+from Utils.ResponseParsing import (
+    ResponseParseError, parse_response, invoke_structured, ainvoke_structured,
+    stream_structured, astream_structured, RiskAssessmentResponse, ECGResponse, LipidPanelResponse, CardiacBiomarkerResponse,
+    ChestPainResponse, TreatmentPlanResponse
+)
 import json
 import numpy as np
+from Utils.RiskScoring import framingham_scores
+from Utils.RiskModels import get_risk_model, compare_models
 
 class CardioAgent:
     """Base class for cardiovascular assessment agents"""
     
     def __init__(self, model_name="llama-3.3-70b-versatile", temperature=0):
-        self.model = ChatGroq(temperature=temperature, model=model_name)
+        self.model = get_chat_model(model_name, temperature)
         self.response = None
         
-    def parse_json_response(self, response_text):
-        """Safely parse JSON from LLM response"""
+    def parse_json_response(self, response_text, schema=None):
+        """Safely parse JSON from LLM response (prose and code fences around it are skipped)"""
         try:
-            return json.loads(response_text)
-        except:
-            return {"raw_response": response_text, "error": "Failed to parse JSON"}
+            return parse_response(response_text, schema)
+        except ResponseParseError as e:
+            return {"raw_response": response_text, "error": f"Failed to parse JSON: {e}"}
+    
+    def invoke_json(self, formatted_prompt, priority=NORMAL, schema=None):
+        """Run a rendered prompt through the (cached, rate-limited) model in JSON mode
+
+        The reply is validated against ``schema``; an invalid reply is re-asked
+        within the retry budget before falling back to ``raw_response``.
+        """
+        try:
+            return invoke_structured(self.model, formatted_prompt, schema, role=type(self).__name__, priority=priority)
+        except ResponseParseError as e:
+            return {"raw_response": e.response, "error": f"Failed to parse JSON: {e}"}
+    
+    async def ainvoke_json(self, formatted_prompt, priority=NORMAL, schema=None):
+        """Async counterpart of invoke_json"""
+        try:
+            return await ainvoke_structured(self.model, formatted_prompt, schema,
+                                            role=type(self).__name__, priority=priority)
+        except ResponseParseError as e:
+            return {"raw_response": e.response, "error": f"Failed to parse JSON: {e}"}
+    
+    def stream_json(self, formatted_prompt, priority=NORMAL, schema=None, on_field=None):
+        """Streaming invoke_json: ``on_field(key, value)`` runs as each top-level section completes"""
+        try:
+            return stream_structured(self.model, formatted_prompt, schema, role=type(self).__name__,
+                                     priority=priority, on_field=on_field)
+        except ResponseParseError as e:
+            return {"raw_response": e.response, "error": f"Failed to parse JSON: {e}"}
+    
+    async def astream_json(self, formatted_prompt, priority=NORMAL, schema=None, on_field=None):
+        """Async counterpart of stream_json"""
+        try:
+            return await astream_structured(self.model, formatted_prompt, schema, role=type(self).__name__,
+                                            priority=priority, on_field=on_field)
+        except ResponseParseError as e:
+            return {"raw_response": e.response, "error": f"Failed to parse JSON: {e}"}
+
+
+register_prompt("CardioAgents.RiskAssessment", """
+            You are a cardiovascular risk assessment specialist. Analyze the patient data and provide a comprehensive risk assessment.
+            
+            Patient Data:
+            {patient_data}
+            
+            Provide your assessment in this JSON format:
+            {{
+                "overall_risk": "low/moderate/high/very_high",
+                "10_year_risk_percentage": 0-100,
+                "key_risk_factors": ["factor1", "factor2"],
+                "protective_factors": ["factor1", "factor2"],
+                "immediate_concerns": ["concern1", "concern2"],
+                "recommendations": ["recommendation1", "recommendation2"],
+                "confidence_score": 0.0-1.0
+            }}
+        """)
 
 
 class RiskCalculator(CardioAgent):
@@ -79,6 +141,28 @@ class RiskCalculator(CardioAgent):
             'risk_category': self._categorize_risk(risk_percentage)
         }
     
+    @staticmethod
+    def calculate_framingham_batch(data):
+        """Vectorized Framingham scoring for a cohort
+
+        Accepts a pandas DataFrame or a mapping of NumPy columns (age, gender,
+        systolic, total_cholesterol, hdl, smoking, diabetes) and returns
+        ``score``, ``risk_percentage`` and ``risk_category`` arrays matching
+        calculate_framingham_score row for row.
+        """
+        return framingham_scores(data)
+    
+    def calculate_risk(self, model='Framingham'):
+        """10-year risk with a registered model ('Framingham', 'ASCVD' or 'SCORE2')"""
+        if model == 'Framingham':
+            return self.calculate_framingham_score()
+        return get_risk_model(model).assess(self.patient_data)
+    
+    def compare_risk_models(self):
+        """Risk percentage from every registered model for this patient"""
+        row = {key: [value] for key, value in self.patient_data.items()}
+        return {model: round(float(risk[0]), 1) for model, risk in compare_models(row).items()}
+    
     def _categorize_risk(self, risk_percentage):
         """Categorize risk level"""
         if risk_percentage < 10:
@@ -90,41 +174,19 @@ class RiskCalculator(CardioAgent):
         else:
             return 'Very High'
     
+    def _get_ai_risk_assessment_prompt(self):
+        return get_prompt("CardioAgents.RiskAssessment").format(patient_data=json.dumps(self.patient_data, indent=2))
+    
     def get_ai_risk_assessment(self):
         """Get AI-powered risk assessment"""
-        prompt = PromptTemplate.from_template("""
-            You are a cardiovascular risk assessment specialist. Analyze the patient data and provide a comprehensive risk assessment.
-            
-            Patient Data:
-            {patient_data}
-            
-            Provide your assessment in this JSON format:
-            {{
-                "overall_risk": "low/moderate/high/very_high",
-                "10_year_risk_percentage": 0-100,
-                "key_risk_factors": ["factor1", "factor2"],
-                "protective_factors": ["factor1", "factor2"],
-                "immediate_concerns": ["concern1", "concern2"],
-                "recommendations": ["recommendation1", "recommendation2"],
-                "confidence_score": 0.0-1.0
-            }}
-        """)
-        
-        formatted_prompt = prompt.format(patient_data=json.dumps(self.patient_data, indent=2))
-        response = self.model.invoke(formatted_prompt)
-        return self.parse_json_response(response.content)
+        return self.invoke_json(self._get_ai_risk_assessment_prompt(), schema=RiskAssessmentResponse)
+    
+    async def aget_ai_risk_assessment(self):
+        """Get AI-powered risk assessment (async)"""
+        return await self.ainvoke_json(self._get_ai_risk_assessment_prompt(), schema=RiskAssessmentResponse)
 
 
-class ECGAnalyzer(CardioAgent):
-    """Analyze ECG data for abnormalities"""
-    
-    def __init__(self, ecg_data, model_name="llama-3.3-70b-versatile"):
-        super().__init__(model_name)
-        self.ecg_data = ecg_data
-        
-    def analyze(self):
-        """Analyze ECG data"""
-        prompt = PromptTemplate.from_template("""
+register_prompt("CardioAgents.ECGAnalysis", """
             You are an expert cardiologist specializing in ECG interpretation. Analyze the ECG data provided.
             
             ECG Data:
@@ -147,22 +209,28 @@ class ECGAnalyzer(CardioAgent):
                 "confidence_score": 0.0-1.0
             }}
         """)
-        
-        formatted_prompt = prompt.format(ecg_data=self.ecg_data)
-        response = self.model.invoke(formatted_prompt)
-        return self.parse_json_response(response.content)
 
 
-class LabAnalyzer(CardioAgent):
-    """Analyze cardiovascular-related lab results"""
+class ECGAnalyzer(CardioAgent):
+    """Analyze ECG data for abnormalities"""
     
-    def __init__(self, lab_data, model_name="llama-3.3-70b-versatile"):
+    def __init__(self, ecg_data, model_name="llama-3.3-70b-versatile"):
         super().__init__(model_name)
-        self.lab_data = lab_data
+        self.ecg_data = ecg_data
         
-    def analyze_lipid_panel(self):
-        """Analyze lipid panel results"""
-        prompt = PromptTemplate.from_template("""
+    def _analyze_prompt(self):
+        return get_prompt("CardioAgents.ECGAnalysis").format(ecg_data=self.ecg_data)
+    
+    def analyze(self):
+        """Analyze ECG data"""
+        return self.invoke_json(self._analyze_prompt(), schema=ECGResponse)
+    
+    async def aanalyze(self):
+        """Analyze ECG data (async)"""
+        return await self.ainvoke_json(self._analyze_prompt(), schema=ECGResponse)
+
+
+register_prompt("CardioAgents.LipidPanel", """
             You are a clinical pathologist specializing in cardiovascular biomarkers. Analyze the lipid panel.
             
             Lab Results:
@@ -196,14 +264,8 @@ class LabAnalyzer(CardioAgent):
                 "confidence_score": 0.0-1.0
             }}
         """)
-        
-        formatted_prompt = prompt.format(lab_data=json.dumps(self.lab_data, indent=2))
-        response = self.model.invoke(formatted_prompt)
-        return self.parse_json_response(response.content)
-    
-    def analyze_cardiac_biomarkers(self):
-        """Analyze cardiac biomarkers (troponin, BNP, etc.)"""
-        prompt = PromptTemplate.from_template("""
+
+register_prompt("CardioAgents.CardiacBiomarkers", """
             You are a cardiologist analyzing cardiac biomarkers. Evaluate the results for acute cardiac events.
             
             Biomarker Results:
@@ -232,22 +294,41 @@ class LabAnalyzer(CardioAgent):
                 "confidence_score": 0.0-1.0
             }}
         """)
-        
-        formatted_prompt = prompt.format(lab_data=json.dumps(self.lab_data, indent=2))
-        response = self.model.invoke(formatted_prompt)
-        return self.parse_json_response(response.content)
 
 
-class SymptomAnalyzer(CardioAgent):
-    """Analyze cardiovascular symptoms"""
+class LabAnalyzer(CardioAgent):
+    """Analyze cardiovascular-related lab results"""
     
-    def __init__(self, symptoms, model_name="llama-3.3-70b-versatile"):
+    def __init__(self, lab_data, model_name="llama-3.3-70b-versatile"):
         super().__init__(model_name)
-        self.symptoms = symptoms
+        self.lab_data = lab_data
         
-    def analyze_chest_pain(self):
-        """Analyze chest pain characteristics"""
-        prompt = PromptTemplate.from_template("""
+    def _analyze_lipid_panel_prompt(self):
+        return get_prompt("CardioAgents.LipidPanel").format(lab_data=json.dumps(self.lab_data, indent=2))
+    
+    def analyze_lipid_panel(self):
+        """Analyze lipid panel results"""
+        return self.invoke_json(self._analyze_lipid_panel_prompt(), schema=LipidPanelResponse)
+    
+    async def aanalyze_lipid_panel(self):
+        """Analyze lipid panel results (async)"""
+        return await self.ainvoke_json(self._analyze_lipid_panel_prompt(), schema=LipidPanelResponse)
+    
+    def _analyze_cardiac_biomarkers_prompt(self):
+        return get_prompt("CardioAgents.CardiacBiomarkers").format(lab_data=json.dumps(self.lab_data, indent=2))
+    
+    def analyze_cardiac_biomarkers(self):
+        """Analyze cardiac biomarkers (troponin, BNP, etc.)"""
+        return self.invoke_json(self._analyze_cardiac_biomarkers_prompt(), priority=HIGH,
+                                      schema=CardiacBiomarkerResponse)
+    
+    async def aanalyze_cardiac_biomarkers(self):
+        """Analyze cardiac biomarkers (troponin, BNP, etc.) (async)"""
+        return await self.ainvoke_json(self._analyze_cardiac_biomarkers_prompt(), priority=HIGH,
+                                            schema=CardiacBiomarkerResponse)
+
+
+register_prompt("CardioAgents.ChestPain", """
             You are an emergency cardiologist evaluating chest pain. Assess the likelihood of acute coronary syndrome.
             
             Symptom Description:
@@ -270,23 +351,28 @@ class SymptomAnalyzer(CardioAgent):
                 "confidence_score": 0.0-1.0
             }}
         """)
-        
-        formatted_prompt = prompt.format(symptoms=self.symptoms)
-        response = self.model.invoke(formatted_prompt)
-        return self.parse_json_response(response.content)
 
 
-class TreatmentAdvisor(CardioAgent):
-    """Provide treatment recommendations"""
+class SymptomAnalyzer(CardioAgent):
+    """Analyze cardiovascular symptoms"""
     
-    def __init__(self, patient_data, risk_assessment, model_name="llama-3.3-70b-versatile"):
+    def __init__(self, symptoms, model_name="llama-3.3-70b-versatile"):
         super().__init__(model_name)
-        self.patient_data = patient_data
-        self.risk_assessment = risk_assessment
+        self.symptoms = symptoms
         
-    def get_recommendations(self):
-        """Get comprehensive treatment recommendations"""
-        prompt = PromptTemplate.from_template("""
+    def _analyze_chest_pain_prompt(self):
+        return get_prompt("CardioAgents.ChestPain").format(symptoms=self.symptoms)
+    
+    def analyze_chest_pain(self):
+        """Analyze chest pain characteristics"""
+        return self.invoke_json(self._analyze_chest_pain_prompt(), priority=URGENT, schema=ChestPainResponse)
+    
+    async def aanalyze_chest_pain(self):
+        """Analyze chest pain characteristics (async)"""
+        return await self.ainvoke_json(self._analyze_chest_pain_prompt(), priority=URGENT, schema=ChestPainResponse)
+
+
+register_prompt("CardioAgents.TreatmentPlan", """
             You are a preventive cardiologist creating a comprehensive cardiovascular risk reduction plan.
             
             Patient Data:
@@ -333,47 +419,242 @@ class TreatmentAdvisor(CardioAgent):
                 "confidence_score": 0.0-1.0
             }}
         """)
+
+
+class TreatmentAdvisor(CardioAgent):
+    """Provide treatment recommendations"""
+    
+    def __init__(self, patient_data, risk_assessment, model_name="llama-3.3-70b-versatile"):
+        super().__init__(model_name)
+        self.patient_data = patient_data
+        self.risk_assessment = risk_assessment
         
-        formatted_prompt = prompt.format(
+    def _get_recommendations_prompt(self):
+        return get_prompt("CardioAgents.TreatmentPlan").format(
             patient_data=json.dumps(self.patient_data, indent=2),
             risk_assessment=json.dumps(self.risk_assessment, indent=2)
         )
-        response = self.model.invoke(formatted_prompt)
-        return self.parse_json_response(response.content)
+    
+    def get_recommendations(self):
+        """Get comprehensive treatment recommendations"""
+        return self.invoke_json(self._get_recommendations_prompt(), priority=LOW, schema=TreatmentPlanResponse)
+    
+    async def aget_recommendations(self):
+        """Get comprehensive treatment recommendations (async)"""
+        return await self.ainvoke_json(self._get_recommendations_prompt(), priority=LOW, schema=TreatmentPlanResponse)
+    
+    def stream_recommendations(self, on_section=None):
+        """Get treatment recommendations, calling ``on_section(name, value)`` as each section streams in"""
+        return self.stream_json(self._get_recommendations_prompt(), priority=LOW,
+                                schema=TreatmentPlanResponse, on_field=on_section)
+    
+    async def astream_recommendations(self, on_section=None):
+        """Get treatment recommendations with streamed sections (async)"""
+        return await self.astream_json(self._get_recommendations_prompt(), priority=LOW,
+                                       schema=TreatmentPlanResponse, on_field=on_section)
+
+
+# Metrics tracked by default, with the target each is compared against and the
+# direction that counts as better (-1: lower is better, +1: higher is better)
+PROGRESS_METRICS = ['systolic', 'diastolic', 'total_cholesterol', 'ldl', 'hdl', 'weight']
+PROGRESS_TARGETS = {
+    'systolic': (120, -1),
+    'diastolic': (80, -1),
+    'total_cholesterol': (200, -1),
+    'ldl': (100, -1),
+    'hdl': (60, 1),
+    'weight': (None, -1),
+    'cvd_risk': (10, -1)
+}
 
 
 class ProgressTracker:
-    """Track patient progress over time"""
+    """Track patient progress over time
+
+    Measurements are stored column-wise: one growable float64 array per metric
+    (NaN where a metric was not measured) sharing a datetime64 index, so
+    appends are amortized O(1) and trends are computed with array operations
+    even for years of home readings. With a ``store`` (a MeasurementStore),
+    every appended measurement is also written through for ``patient_id``.
+    """
+    
+    __slots__ = ('_dates', '_columns', '_size', '_sorted', 'store', 'patient_id')
     
-    def __init__(self):
-        self.history = []
+    def __init__(self, metrics=PROGRESS_METRICS, capacity=64, store=None, patient_id=None):
+        self._dates = np.empty(capacity, dtype='datetime64[s]')
+        self._columns = {metric: np.full(capacity, np.nan, dtype=np.float64) for metric in metrics}
+        self._size = 0
+        self._sorted = True
+        self.store = store
+        self.patient_id = patient_id
+    
+    def __len__(self):
+        return self._size
+    
+    @property
+    def metrics(self):
+        return list(self._columns)
+    
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._dates)
+        if needed <= capacity:
+            return
+        # Doubling from zero would never grow
+        capacity = max(capacity, 1)
+        while capacity < needed:
+            capacity *= 2
+        dates = np.empty(capacity, dtype='datetime64[s]')
+        dates[:self._size] = self._dates[:self._size]
+        self._dates = dates
+        for metric, column in self._columns.items():
+            grown = np.full(capacity, np.nan, dtype=np.float64)
+            grown[:self._size] = column[:self._size]
+            self._columns[metric] = grown
+    
+    def _column(self, metric):
+        if metric not in self._columns:
+            self._columns[metric] = np.full(len(self._dates), np.nan, dtype=np.float64)
+        return self._columns[metric]
     
     def add_measurement(self, date, measurements):
         """Add new measurements"""
-        self.history.append({
-            'date': date,
-            'measurements': measurements
-        })
+        self._reserve(1)
+        date = np.datetime64(date, 's')
+        if self._size and date < self._dates[self._size - 1]:
+            self._sorted = False
+        self._dates[self._size] = date
+        for metric, value in measurements.items():
+            if value is not None:
+                self._column(metric)[self._size] = value
+        self._size += 1
+        if self.store is not None:
+            self.store.add_measurement(self.patient_id, date, measurements)
+    
+    def add_measurements(self, dates, measurements):
+        """Append many readings at once from a date sequence and ``{metric: values}``"""
+        dates = np.asarray(dates, dtype='datetime64[s]')
+        n = len(dates)
+        if not n:
+            return
+        self._reserve(n)
+        if (self._size and dates[0] < self._dates[self._size - 1]) or np.any(dates[1:] < dates[:-1]):
+            self._sorted = False
+        self._dates[self._size:self._size + n] = dates
+        for metric, values in measurements.items():
+            self._column(metric)[self._size:self._size + n] = np.asarray(values, dtype=np.float64)
+        self._size += n
+        if self.store is not None:
+            self.store.append(self.patient_id, dates, measurements)
+    
+    def _ensure_sorted(self):
+        if self._sorted:
+            return
+        order = np.argsort(self._dates[:self._size], kind='stable')
+        self._dates[:self._size] = self._dates[:self._size][order]
+        for column in self._columns.values():
+            column[:self._size] = column[:self._size][order]
+        self._sorted = True
+    
+    @property
+    def dates(self):
+        self._ensure_sorted()
+        return self._dates[:self._size]
+    
+    def series(self, metric, start=None, end=None):
+        """Measured ``(dates, values)`` of one metric, optionally limited to ``[start, end]``"""
+        dates = self.dates
+        if metric not in self._columns:
+            return dates[:0], np.empty(0, dtype=np.float64)
+        values = self._columns[metric][:self._size]
+        mask = ~np.isnan(values)
+        if start is not None:
+            mask &= dates >= np.datetime64(start, 's')
+        if end is not None:
+            mask &= dates <= np.datetime64(end, 's')
+        return dates[mask], values[mask]
+    
+    @property
+    def history(self):
+        """Measurements as the list of ``{'date', 'measurements'}`` dicts used before"""
+        dates = self.dates
+        columns = {metric: column[:self._size].tolist() for metric, column in self._columns.items()}
+        return [
+            {
+                'date': date,
+                'measurements': {metric: values[i] for metric, values in columns.items() if values[i] == values[i]}
+            }
+            for i, date in enumerate(dates.tolist())
+        ]
+    
+    @staticmethod
+    def rolling_mean(values, window):
+        """Trailing mean over the last ``window`` readings (fewer at the start)"""
+        values = np.asarray(values, dtype=np.float64)
+        cumsum = np.concatenate(([0.0], np.cumsum(values)))
+        counts = np.minimum(np.arange(1, len(values) + 1), window)
+        ends = np.arange(1, len(values) + 1)
+        return (cumsum[ends] - cumsum[ends - counts]) / counts
     
-    def get_trends(self):
+    @staticmethod
+    def slope(dates, values):
+        """Least-squares slope of ``values`` per day"""
+        days = (dates - dates[0]) / np.timedelta64(1, 'D')
+        days = days - days.mean()
+        denominator = np.dot(days, days)
+        if denominator == 0:
+            return 0.0
+        return float(np.dot(days, values - values.mean()) / denominator)
+    
+    def metric_trend(self, metric, start=None, end=None, window=7, tolerance=0.01):
+        """Trend statistics of one metric, or None with fewer than two readings
+
+        The trend follows the least-squares fit: a fitted change within
+        ``tolerance`` of the baseline is stable, and a metric drifting the
+        wrong way while still on the right side of its target is also stable.
+        """
+        dates, values = self.series(metric, start, end)
+        if len(values) < 2:
+            return None
+        values = values.astype(np.float64)
+        target, direction = PROGRESS_TARGETS.get(metric, (None, -1))
+        slope = self.slope(dates, values)
+        span_days = (dates[-1] - dates[0]) / np.timedelta64(1, 'D')
+        fitted_change = slope * span_days
+        baseline, current = float(values[0]), float(values[-1])
+        recent_mean = float(values[-window:].mean())
+        at_target = None if target is None else bool((recent_mean - target) * direction >= 0)
+        
+        if abs(fitted_change) <= tolerance * max(abs(baseline), 1e-9):
+            trend = 'stable'
+        elif fitted_change * direction > 0:
+            trend = 'improving'
+        else:
+            trend = 'stable' if at_target else 'worsening'
+        
+        return {
+            'trend': trend,
+            'change': current - baseline,
+            'percent_change': (current - baseline) / baseline * 100 if baseline else None,
+            'current': current,
+            'baseline': baseline,
+            'recent_mean': recent_mean,
+            'slope_per_day': slope,
+            'readings': len(values),
+            'target': target,
+            'at_target': at_target
+        }
+    
+    def get_trends(self, start=None, end=None, window=7):
         """Calculate trends"""
-        if len(self.history) < 2:
+        if self._size < 2:
             return {"error": "Insufficient data for trend analysis"}
         
         trends = {}
-        metrics = ['systolic', 'diastolic', 'total_cholesterol', 'ldl', 'hdl', 'weight']
-        
-        for metric in metrics:
-            values = [h['measurements'].get(metric) for h in self.history if metric in h['measurements']]
-            if len(values) >= 2:
-                trend = 'improving' if values[-1] < values[0] else 'worsening' if values[-1] > values[0] else 'stable'
-                change = values[-1] - values[0]
-                trends[metric] = {
-                    'trend': trend,
-                    'change': change,
-                    'current': values[-1],
-                    'baseline': values[0]
-                }
+        for metric in self._columns:
+            trend = self.metric_trend(metric, start, end, window)
+            if trend is not None:
+                trends[metric] = trend
         
         return trends
     
@@ -381,11 +662,12 @@ class ProgressTracker:
         """Generate comprehensive progress report"""
         trends = self.get_trends()
         
+        dates = self.dates
         report = {
-            'total_measurements': len(self.history),
+            'total_measurements': self._size,
             'date_range': {
-                'start': self.history[0]['date'] if self.history else None,
-                'end': self.history[-1]['date'] if self.history else None
+                'start': dates[0].item() if self._size else None,
+                'end': dates[-1].item() if self._size else None
             },
             'trends': trends,
             'overall_progress': self._assess_overall_progress(trends)
@@ -395,7 +677,7 @@ class ProgressTracker:
     
     def _assess_overall_progress(self, trends):
         """Assess overall progress"""
-        if not trends:
+        if not trends or 'error' in trends:
             return "insufficient_data"
         
         improving_count = sum(1 for t in trends.values() if t['trend'] == 'improving')
@@ -0,0 +1,103 @@
+import numpy as np
+
+# Plot width assumed when the real container width is unknown, and how many
+# points per horizontal pixel are worth sending to the browser
+DEFAULT_PLOT_WIDTH = 1000
+POINTS_PER_PIXEL = 2
+
+
+def point_budget(width=DEFAULT_PLOT_WIDTH, points_per_pixel=POINTS_PER_PIXEL):
+    """Number of points a line plot of ``width`` pixels can actually show"""
+    return max(int(width * points_per_pixel), 4)
+
+
+def _numeric(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64, copy=False)
+
+
+def minmax_indices(y, n_out):
+    """Indices of the min and max of ``n_out // 2`` equal buckets, in order
+
+    Every local extreme wider than a bucket survives, so QRS spikes keep their
+    full height however far the trace is zoomed out.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    buckets = max(n_out // 2, 1)
+    size = -(-n // buckets)
+    padded = np.pad(y, (0, buckets * size - n), mode='edge').reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lo = offsets + padded.argmin(axis=1)
+    hi = offsets + padded.argmax(axis=1)
+    pairs = np.sort(np.stack([lo, hi], axis=1), axis=1).ravel()
+    pairs = np.minimum(pairs, n - 1)
+    keep = np.concatenate(([True], pairs[1:] != pairs[:-1]))
+    indices = pairs[keep]
+    # Always keep the end points so the visible range does not shrink
+    if indices[0] != 0:
+        indices = np.concatenate(([0], indices))
+    if indices[-1] != n - 1:
+        indices = np.concatenate((indices, [n - 1]))
+    return indices
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets selection of ``n_out`` points
+
+    Each bucket keeps the point forming the largest triangle with the point
+    kept in the previous bucket and the mean of the next bucket; the work
+    inside a bucket is vectorized.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = _numeric(x)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of each bucket, used as the third vertex for the bucket before it
+    counts = np.diff(edges)
+    x_means = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    y_means = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    x_means = np.append(x_means[1:], x[-1])
+    y_means = np.append(y_means[1:], y[-1])
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        xs, ys = x[lo:hi], y[lo:hi]
+        area = np.abs((x[previous] - x_means[bucket]) * (ys - y[previous])
+                      - (x[previous] - xs) * (y_means[bucket] - y[previous]))
+        previous = lo + int(area.argmax())
+        indices[bucket + 1] = previous
+    return indices
+
+
+def downsample(x, y, n_out=None, method='minmax'):
+    """``(x, y)`` reduced to about ``n_out`` points (default: the point budget)
+
+    ``method`` is 'minmax' (exact peaks, best for dense signals such as ECG)
+    or 'lttb' (visual shape, best for sparse trends). NaN readings are
+    dropped first; short series are returned unchanged.
+    """
+    n_out = point_budget() if n_out is None else n_out
+    x = np.asarray(x)
+    y = np.asarray(y)
+    finite = ~np.isnan(y.astype(np.float64, copy=False))
+    if not finite.all():
+        x, y = x[finite], y[finite]
+    if len(y) <= n_out:
+        return x, y
+    if method == 'lttb':
+        indices = lttb_indices(x, y, n_out)
+    elif method == 'minmax':
+        indices = minmax_indices(y, n_out)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return x[indices], y[indices]
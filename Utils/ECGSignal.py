@@ -0,0 +1,503 @@
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+
+def _remove_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+class ECGRecord:
+    """A single ECG lead read on demand
+
+    ``samples`` is any array-like of raw values (usually an ``np.memmap``, so
+    nothing is loaded until a window is read); physical values in mV are
+    ``(raw - baseline) / gain``. ``decoder`` replaces plain slicing for packed
+    formats such as WFDB 212. Files and directories in ``temp_paths`` (spooled
+    samples, saved uploads) belong to the record and are deleted when it is
+    closed or garbage collected.
+    """
+
+    def __init__(self, samples, sampling_rate, gain=1.0, baseline=0.0, units="mV", name="ecg",
+                 length=None, decoder=None, temp_paths=()):
+        self.samples = samples
+        self.sampling_rate = float(sampling_rate)
+        self.gain = float(gain) or 1.0
+        self.baseline = float(baseline)
+        self.units = units
+        self.name = name
+        self.length = len(samples) if length is None else length
+        self.decoder = decoder
+        self.temp_paths = list(temp_paths)
+        self._finalizer = weakref.finalize(self, _remove_paths, self.temp_paths)
+
+    def close(self):
+        """Delete the record's temporary files now; the record cannot be read afterwards"""
+        self._finalizer()
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def duration(self):
+        return self.length / self.sampling_rate
+
+    def read(self, start, stop):
+        """Physical samples [start, stop) as float32"""
+        start, stop = max(start, 0), min(stop, self.length)
+        raw = self.decoder(start, stop) if self.decoder else np.asarray(self.samples[start:stop])
+        return ((raw.astype(np.float32) - self.baseline) / self.gain).astype(np.float32, copy=False)
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def _is_number(token):
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+def load_ecg_csv(path, sampling_rate=None, column=None, gain=1.0, chunksize=1_000_000):
+    """Load a CSV/TXT waveform (one sample per row) as an ECGRecord
+
+    A header row is detected automatically. A column whose name contains
+    'time' or 'sec' gives the sampling rate; ``sampling_rate`` is only the
+    fallback for files without one. The lead is ``column`` (name or index) or
+    the first other column. Rows are
+    parsed in chunks and spooled to a float32 file that is memory-mapped, so
+    multi-hour recordings never sit in memory as text or float64.
+    """
+    import pandas as pd
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        first = f.readline()
+    delimiter = "," if "," in first else ";" if ";" in first else r"\s+"
+    tokens = [t for t in first.replace(";", ",").replace("\t", ",").replace(" ", ",").split(",") if t.strip()]
+    has_header = not all(_is_number(t) for t in tokens)
+
+    reader = pd.read_csv(path, sep=delimiter, header=0 if has_header else None, chunksize=chunksize,
+                         engine="python" if delimiter == r"\s+" else "c")
+    spool = tempfile.NamedTemporaryFile(suffix=".f32", delete=False)
+    time_head = None
+    lead_name = None
+    count = 0
+    try:
+        with spool:
+            for chunk in reader:
+                names = [str(c) for c in chunk.columns]
+                time_cols = [c for c, n in zip(chunk.columns, names) if "time" in n.lower() or "sec" in n.lower()]
+                if column is not None:
+                    lead = column if column in chunk.columns else chunk.columns[int(column)]
+                else:
+                    lead = next(c for c in chunk.columns if c not in time_cols)
+                lead_name = str(lead)
+                if time_cols and time_head is None:
+                    time_head = chunk[time_cols[0]].to_numpy(dtype=np.float64)[:1000]
+                values = chunk[lead].to_numpy(dtype=np.float32)
+                spool.write(values.tobytes())
+                count += len(values)
+    except Exception:
+        os.unlink(spool.name)
+        raise
+
+    if time_head is not None and len(time_head) >= 2:
+        sampling_rate = 1.0 / float(np.median(np.diff(time_head)))
+    elif sampling_rate is None:
+        os.unlink(spool.name)
+        raise ValueError("Sampling rate unknown: pass sampling_rate or include a time column")
+
+    if not count:
+        os.unlink(spool.name)
+        return ECGRecord(np.zeros(0, np.float32), sampling_rate, gain=gain, name=lead_name or os.path.basename(path))
+    samples = np.memmap(spool.name, dtype=np.float32, mode="r", shape=(count,))
+    return ECGRecord(samples, sampling_rate, gain=gain, name=lead_name or os.path.basename(path),
+                     temp_paths=[spool.name])
+
+
+def _parse_frequency(token):
+    return float(token.split("/")[0].split("(")[0])
+
+
+def read_wfdb_header(path):
+    """Parse a WFDB ``.hea`` file into (sampling_rate, n_samples, signals)"""
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    record = lines[0].split()
+    n_signals = int(record[1])
+    sampling_rate = _parse_frequency(record[2]) if len(record) > 2 else 250.0
+    n_samples = int(record[3]) if len(record) > 3 else None
+
+    signals = []
+    for line in lines[1:1 + n_signals]:
+        fields = line.split()
+        fmt = fields[1].split("x")[0].split(":")[0].split("+")[0]
+        gain_field = fields[2] if len(fields) > 2 else "200"
+        units = gain_field.split("/")[1] if "/" in gain_field else "mV"
+        gain_part = gain_field.split("/")[0]
+        gain = float(gain_part.split("(")[0]) or 200.0
+        adc_zero = int(fields[4]) if len(fields) > 4 else 0
+        baseline = float(gain_part.split("(")[1].rstrip(")")) if "(" in gain_part else adc_zero
+        signals.append({
+            "file": fields[0], "format": fmt, "gain": gain, "baseline": baseline,
+            "units": units, "description": " ".join(fields[8:]) if len(fields) > 8 else fields[0]
+        })
+    return sampling_rate, n_samples, signals
+
+
+def _decode_212(raw_bytes):
+    """Unpack WFDB format 212 (two 12-bit samples in three bytes)"""
+    b = raw_bytes.reshape(-1, 3).astype(np.int16)
+    first = b[:, 0] | ((b[:, 1] & 0x0F) << 8)
+    second = b[:, 2] | ((b[:, 1] & 0xF0) << 4)
+    samples = np.empty(len(b) * 2, dtype=np.int16)
+    samples[0::2] = first
+    samples[1::2] = second
+    samples[samples >= 2048] -= 4096
+    return samples
+
+
+def load_wfdb(header_path, lead=0):
+    """Open one lead of a WFDB record (formats 16, 80 and 212) via ``np.memmap``"""
+    sampling_rate, n_samples, signals = read_wfdb_header(header_path)
+    signal = signals[lead]
+    n_signals = sum(1 for s in signals if s["file"] == signal["file"])
+    channel = [s for s in signals if s["file"] == signal["file"]].index(signal)
+    dat_path = os.path.join(os.path.dirname(header_path), signal["file"])
+    fmt = signal["format"]
+
+    if fmt == "16":
+        frames = np.memmap(dat_path, dtype="<i2", mode="r")
+        frames = frames[:len(frames) // n_signals * n_signals].reshape(-1, n_signals)
+        samples, decoder, length = frames[:, channel], None, len(frames)
+    elif fmt == "80":
+        frames = np.memmap(dat_path, dtype=np.uint8, mode="r")
+        frames = frames[:len(frames) // n_signals * n_signals].reshape(-1, n_signals)
+        samples, length = frames[:, channel], len(frames)
+        decoder = lambda start, stop: samples[start:stop].astype(np.int16) - 128
+    elif fmt == "212":
+        packed = np.memmap(dat_path, dtype=np.uint8, mode="r")
+        total = len(packed) // 3 * 2
+        length = total // n_signals
+        samples = packed
+
+        def decoder(start, stop):
+            first, last = start * n_signals, stop * n_signals
+            pair_start, pair_stop = first // 2, (last + 1) // 2
+            values = _decode_212(np.asarray(packed[pair_start * 3:pair_stop * 3]))
+            values = values[first - pair_start * 2:][:last - first]
+            return values.reshape(-1, n_signals)[:, channel]
+    else:
+        raise ValueError(f"Unsupported WFDB format {fmt}")
+
+    if n_samples:
+        length = min(length, n_samples)
+    return ECGRecord(samples, sampling_rate, gain=signal["gain"], baseline=signal["baseline"],
+                     units=signal["units"], name=signal["description"], length=length, decoder=decoder)
+
+
+def load_ecg(path, sampling_rate=None, lead=0):
+    """Open ``path`` by extension: ``.hea``/``.dat`` as WFDB, anything else as CSV"""
+    stem, extension = os.path.splitext(path)
+    if extension.lower() in (".hea", ".dat"):
+        return load_wfdb(stem + ".hea", lead=lead)
+    return load_ecg_csv(path, sampling_rate=sampling_rate, column=lead if lead else None)
+
+
+WAVEFORM_EXTENSIONS = (".csv", ".txt", ".dat", ".hea")
+
+
+def load_uploaded_ecg(files, sampling_rate=None):
+    """ECGRecord from uploaded ``(file name, bytes)`` pairs
+
+    A WFDB upload needs both the ``.hea`` and ``.dat`` files; ``sampling_rate``
+    applies to CSV/TXT files without a time column. Returns None when
+    none of the files holds a numeric waveform (e.g. a text report). The
+    files are saved to a temporary directory that lives as long as the
+    returned record (a CSV upload is spooled, so its copy is removed at once).
+    """
+    files = [(name, data) for name, data in files if os.path.splitext(name)[1].lower() in WAVEFORM_EXTENSIONS]
+    if not files:
+        return None
+    directory = tempfile.mkdtemp(prefix="ecg_")
+    wfdb = None
+    try:
+        paths = {}
+        for name, data in files:
+            path = os.path.join(directory, os.path.basename(name))
+            with open(path, "wb") as out:
+                out.write(data)
+            paths[os.path.splitext(path)[1].lower()] = path
+
+        if ".hea" in paths:
+            wfdb = load_wfdb(paths[".hea"])
+            # The record memory-maps the saved .dat file, so it owns the directory
+            wfdb.temp_paths.append(directory)
+            return wfdb
+        for extension in (".csv", ".txt"):
+            if extension in paths:
+                try:
+                    return load_ecg_csv(paths[extension], sampling_rate=sampling_rate)
+                except (ValueError, StopIteration):
+                    # Free-text report rather than samples
+                    continue
+        return None
+    finally:
+        if wfdb is None:
+            _remove_paths([directory])
+
+
+# ---------------------------------------------------------------------------
+# Filtering and R-peak detection
+# ---------------------------------------------------------------------------
+
+def moving_average(x, width):
+    """Centered moving average of odd ``width`` samples via a cumulative sum"""
+    width = max(int(width) | 1, 1)
+    half = width // 2
+    padded = np.pad(x.astype(np.float64, copy=False), (half + 1, half), mode="edge")
+    cumsum = np.cumsum(padded)
+    return ((cumsum[width:] - cumsum[:-width]) / width).astype(np.float32)
+
+
+def qrs_band(x, sampling_rate):
+    """Approximate 5-15 Hz band-pass as the difference of two moving averages"""
+    return moving_average(x, sampling_rate / 15) - moving_average(x, sampling_rate / 5)
+
+
+def qrs_energy(x, sampling_rate):
+    """Pan-Tompkins style feature: band-pass, derivative, square, 150 ms integration"""
+    slope = np.gradient(qrs_band(x, sampling_rate))
+    return moving_average(slope * slope, 0.15 * sampling_rate)
+
+
+def _sliding_max(x, half_width):
+    padded = np.pad(x, half_width, mode="edge")
+    return np.lib.stride_tricks.sliding_window_view(padded, 2 * half_width + 1).max(axis=1)
+
+
+def detect_r_peaks(x, sampling_rate, refractory=0.2, threshold=0.3):
+    """R-peak sample indices within one window of signal
+
+    Candidates are maxima of the QRS energy above ``threshold`` times its
+    98th percentile, at least ``refractory`` seconds apart; each is then moved
+    to the largest deflection of the baseline-corrected signal within 100 ms.
+    """
+    if len(x) < sampling_rate:
+        return np.zeros(0, dtype=np.int64)
+    energy = qrs_energy(x, sampling_rate)
+    half = max(int(refractory * sampling_rate), 1)
+    level = threshold * np.percentile(energy, 98)
+    candidates = np.flatnonzero((energy >= _sliding_max(energy, half)) & (energy > level))
+    if len(candidates) == 0:
+        return candidates.astype(np.int64)
+    # Plateaus produce runs of equal maxima: keep the first of each run
+    candidates = candidates[np.concatenate(([True], np.diff(candidates) > half))]
+
+    corrected = x - moving_average(x, 0.75 * sampling_rate)
+    reach = int(0.1 * sampling_rate)
+    windows = np.clip(candidates[:, None] + np.arange(-reach, reach + 1), 0, len(x) - 1)
+    peaks = windows[np.arange(len(windows)), np.abs(corrected[windows]).argmax(axis=1)]
+    return np.unique(peaks).astype(np.int64)
+
+
+def iter_r_peaks(record, chunk_seconds=60.0, overlap_seconds=1.0):
+    """Yield R-peak indices chunk by chunk, so memory is bounded by one chunk"""
+    fs = record.sampling_rate
+    chunk = int(chunk_seconds * fs)
+    overlap = int(overlap_seconds * fs)
+    last = -1
+    for start in range(0, len(record), chunk):
+        lo = max(start - overlap, 0)
+        x = record.read(lo, start + chunk + overlap)
+        peaks = detect_r_peaks(x, fs) + lo
+        # Keep peaks owned by this chunk and drop re-detections across the seam
+        peaks = peaks[(peaks >= start) & (peaks < start + chunk) & (peaks > last + 0.2 * fs)]
+        if len(peaks):
+            last = peaks[-1]
+            yield peaks
+
+
+# ---------------------------------------------------------------------------
+# Interval measurement
+# ---------------------------------------------------------------------------
+
+def average_beat(record, peaks, before=0.3, after=0.6, max_beats=500):
+    """Mean beat, each baseline-corrected, over up to ``max_beats`` evenly spaced R peaks"""
+    fs = record.sampling_rate
+    pre, post = int(before * fs), int(after * fs)
+    usable = peaks[(peaks >= pre) & (peaks + post < len(record))]
+    if len(usable) == 0:
+        return None, pre
+    chosen = usable[np.linspace(0, len(usable) - 1, min(max_beats, len(usable))).astype(int)]
+    total = np.zeros(pre + post, dtype=np.float64)
+    for r in chosen:
+        beat = record.read(r - pre, r + post).astype(np.float64)
+        total += beat - np.median(beat)
+    return total / len(chosen), pre
+
+
+def _walk(values, start, step, stop, condition):
+    """First index from ``start`` towards ``stop`` where ``condition`` holds"""
+    index = start
+    while index != stop and not condition(values[index]):
+        index += step
+    return index
+
+
+def delineate_beat(template, r, sampling_rate, rr):
+    """QRS, P and T fiducial points (sample indices in ``template``)"""
+    fs = sampling_rate
+    slope = np.abs(np.gradient(template))
+    span = int(0.06 * fs)
+    upstroke = r - span + int(np.argmax(slope[r - span:r + 1]))
+    downstroke = r + int(np.argmax(slope[r:r + span + 1]))
+    steep = 0.1 * slope[r - span:r + span + 1].max()
+    qrs_on = _walk(slope, upstroke, -1, max(r - int(0.12 * fs), 0), lambda v: v < steep)
+    qrs_off = _walk(slope, downstroke, 1, min(r + int(0.12 * fs), len(template) - 1), lambda v: v < steep)
+    baseline = template[qrs_on]
+
+    points = {"qrs_on": qrs_on, "qrs_off": qrs_off, "r": r, "baseline": baseline}
+
+    p_lo, p_hi = max(r - int(0.3 * fs), 0), qrs_on - int(0.02 * fs)
+    if p_hi > p_lo:
+        p_peak = p_lo + int(np.argmax(template[p_lo:p_hi]))
+        p_amp = template[p_peak] - baseline
+        if p_amp > 0.05:
+            points["p_on"] = _walk(template, p_peak, -1, p_lo, lambda v: v - baseline < 0.1 * p_amp)
+
+    t_lo = qrs_off + int(0.06 * fs)
+    t_hi = min(r + int(min(0.6, 0.9 * rr) * fs), len(template))
+    if t_hi > t_lo:
+        segment = template[t_lo:t_hi] - baseline
+        t_peak = t_lo + int(np.argmax(np.abs(segment)))
+        t_amp = abs(template[t_peak] - baseline)
+        if t_amp > 0.05:
+            points["t_end"] = _walk(template, t_peak, 1, t_hi - 1, lambda v: abs(v - baseline) < 0.1 * t_amp)
+        points["st_level"] = template[min(qrs_off + int(0.06 * fs), len(template) - 1)] - baseline
+    return points
+
+
+def analyze_ecg(record, chunk_seconds=60.0, sex="Male"):
+    """Measured ECG features for a whole record
+
+    Returns heart rate, RR variability (SDNN, RMSSD, pNN50), PR, QRS, QT and
+    Bazett-corrected QTc in milliseconds, a rhythm label and a list of
+    problems in the ``{'area', 'description', 'severity'}`` shape the app uses.
+    """
+    fs = record.sampling_rate
+    peaks = np.concatenate(list(iter_r_peaks(record, chunk_seconds)) or [np.zeros(0, np.int64)])
+    result = {
+        "duration_s": round(record.duration, 1),
+        "sampling_rate": fs,
+        "beats": int(len(peaks))
+    }
+    undetermined = {"rhythm": "Undetermined", "heart_rate": None, "problems": [],
+                    "abnormalities": ["Too few beats detected to measure intervals"]}
+    if len(peaks) < 3:
+        result.update(undetermined)
+        return result
+
+    rr = np.diff(peaks) / fs
+    # Ignore physiologically impossible intervals from missed/extra detections
+    rr = rr[(rr > 0.25) & (rr < 2.5)]
+    if len(rr) == 0:
+        # e.g. a rate below 24 bpm: every interval is out of range
+        result.update(undetermined)
+        return result
+    rr_mean = float(np.mean(rr))
+    successive = np.abs(np.diff(rr))
+    result.update({
+        "heart_rate": round(60.0 / rr_mean),
+        "rr_mean_ms": round(rr_mean * 1000),
+        "sdnn_ms": round(float(np.std(rr)) * 1000, 1),
+        "rmssd_ms": round(float(np.sqrt(np.mean(successive ** 2))) * 1000, 1) if len(successive) else 0.0,
+        "pnn50": round(float(np.mean(successive > 0.05)) * 100, 1) if len(successive) else 0.0
+    })
+
+    template, r = average_beat(record, peaks, after=min(0.6, max(rr_mean, 0.3)))
+    if template is not None:
+        points = delineate_beat(template, r, fs, rr_mean)
+        to_ms = 1000.0 / fs
+        result["qrs_ms"] = round((points["qrs_off"] - points["qrs_on"]) * to_ms)
+        if "p_on" in points:
+            result["pr_ms"] = round((points["qrs_on"] - points["p_on"]) * to_ms)
+        if "t_end" in points:
+            qt = (points["t_end"] - points["qrs_on"]) * to_ms
+            result["qt_ms"] = round(qt)
+            result["qtc_ms"] = round(qt / np.sqrt(rr_mean))
+        result["st_deviation_mv"] = round(float(points.get("st_level", 0.0)), 3)
+
+    result.update(classify_rhythm(result, sex))
+    return result
+
+
+def classify_rhythm(measurements, sex="Male"):
+    """Rhythm label and problems from measured intervals"""
+    problems = []
+    hr = measurements["heart_rate"]
+    irregular = measurements["sdnn_ms"] / max(measurements["rr_mean_ms"], 1) > 0.15
+
+    if measurements.get("st_deviation_mv", 0) > 0.1:
+        problems.append({'area': 'Left Ventricle',
+                         'description': 'ST segment elevation detected - possible acute myocardial infarction',
+                         'severity': 'critical'})
+    if irregular:
+        problems.append({'area': 'Atria',
+                         'description': 'Irregular rhythm detected - possible atrial fibrillation',
+                         'severity': 'moderate'})
+    qtc_limit = 460 if sex == "Female" else 450
+    if measurements.get("qtc_ms", 0) > qtc_limit:
+        problems.append({'area': 'Ventricular Conduction',
+                         'description': 'Prolonged QT interval - increased risk of arrhythmia',
+                         'severity': 'high'})
+    if measurements.get("qrs_ms", 0) > 120:
+        problems.append({'area': 'Ventricular Conduction',
+                         'description': 'Wide QRS complex - possible bundle branch block',
+                         'severity': 'moderate'})
+    if measurements.get("pr_ms", 0) > 200:
+        problems.append({'area': 'AV Node',
+                         'description': 'Prolonged PR interval - possible first-degree AV block',
+                         'severity': 'moderate'})
+    if hr > 100:
+        problems.append({'area': 'SA Node', 'description': f'Tachycardia ({hr} bpm)', 'severity': 'moderate'})
+    elif hr < 50:
+        problems.append({'area': 'SA Node', 'description': f'Bradycardia ({hr} bpm)', 'severity': 'moderate'})
+
+    if irregular:
+        rhythm = 'Irregular Rhythm'
+    elif hr > 100:
+        rhythm = 'Sinus Tachycardia'
+    elif hr < 60:
+        rhythm = 'Sinus Bradycardia'
+    else:
+        rhythm = 'Normal Sinus Rhythm'
+    return {"rhythm": rhythm, "problems": problems,
+            "abnormalities": [p['description'] for p in problems]}
+
+
+def format_measurements(measurements):
+    """Measured values as a plain-text ECG report (the format the analyzers expect)"""
+    labels = [
+        ("Heart Rate", "heart_rate", "bpm"), ("PR Interval", "pr_ms", "ms"), ("QRS Duration", "qrs_ms", "ms"),
+        ("QT Interval", "qt_ms", "ms"), ("QTc (Bazett)", "qtc_ms", "ms"), ("SDNN", "sdnn_ms", "ms"),
+        ("RMSSD", "rmssd_ms", "ms"), ("ST Deviation", "st_deviation_mv", "mV")
+    ]
+    lines = [f"Recording: {measurements['duration_s']} s, {measurements['beats']} beats detected"]
+    lines += [f"{label}: {measurements[key]} {unit}" for label, key, unit in labels if measurements.get(key) is not None]
+    lines.append(f"Rhythm (automated): {measurements['rhythm']}")
+    lines += [f"Finding: {finding}" for finding in measurements["abnormalities"]]
+    return "\n".join(lines)
@@ -1,23 +1,13 @@
-from langchain_core.prompts import PromptTemplate
-from langchain_groq import ChatGroq
+from Utils.LLMClients import get_chat_model
+from Utils.Prompts import register_prompt, get_prompt
+from Utils.RateLimiter import NORMAL
+from Utils.ResponseParsing import (
+    ResponseParseError, parse_response, invoke_structured, ainvoke_structured,
+    stream_structured, astream_structured, SpecialistResponse, DrugInteractionResponse, LabResultResponse, MultidisciplinaryResponse
+)
 import json
 
-class MedicalAgent:
-    """Base class for all medical specialist agents"""
-    
-    def __init__(self, medical_report=None, role=None, extra_info=None, model_name="llama-3.3-70b-versatile", temperature=0):
-        self.medical_report = medical_report
-        self.role = role
-        self.extra_info = extra_info or {}
-        self.model = ChatGroq(temperature=temperature, model=model_name)
-        self.prompt_template = self.create_prompt_template()
-        self.response = None
-        self.confidence_score = 0.0
-        
-    def create_prompt_template(self):
-        """Create role-specific prompt templates"""
-        templates = {
-            "Cardiologist": """
+register_prompt("EnhancedAgents.Cardiologist", """
                 Act as an expert cardiologist. Analyze the patient's medical report with focus on cardiovascular health.
                 
                 Task: Review cardiac workup including ECG, blood tests, Holter monitor, echocardiogram, and any cardiac symptoms.
@@ -40,9 +30,9 @@ class MedicalAgent:
                 }}
                 
                 Medical Report: {medical_report}
-            """,
-            
-            "Psychologist": """
+            """)
+
+register_prompt("EnhancedAgents.Psychologist", """
                 Act as an expert clinical psychologist. Analyze the patient's mental health status.
                 
                 Task: Evaluate psychological and psychiatric aspects of the patient's condition.
@@ -66,9 +56,9 @@ class MedicalAgent:
                 }}
                 
                 Patient Report: {medical_report}
-            """,
-            
-            "Pulmonologist": """
+            """)
+
+register_prompt("EnhancedAgents.Pulmonologist", """
                 Act as an expert pulmonologist. Analyze the patient's respiratory system health.
                 
                 Task: Evaluate pulmonary function and respiratory symptoms.
@@ -91,9 +81,9 @@ class MedicalAgent:
                 }}
                 
                 Patient Report: {medical_report}
-            """,
-            
-            "Neurologist": """
+            """)
+
+register_prompt("EnhancedAgents.Neurologist", """
                 Act as an expert neurologist. Analyze the patient's neurological health.
                 
                 Task: Evaluate nervous system function and neurological symptoms.
@@ -117,9 +107,9 @@ class MedicalAgent:
                 }}
                 
                 Patient Report: {medical_report}
-            """,
-            
-            "Endocrinologist": """
+            """)
+
+register_prompt("EnhancedAgents.Endocrinologist", """
                 Act as an expert endocrinologist. Analyze the patient's hormonal and metabolic health.
                 
                 Task: Evaluate endocrine system function and metabolic conditions.
@@ -142,9 +132,9 @@ class MedicalAgent:
                 }}
                 
                 Patient Report: {medical_report}
-            """,
-            
-            "GeneralPractitioner": """
+            """)
+
+register_prompt("EnhancedAgents.GeneralPractitioner", """
                 Act as an experienced general practitioner. Provide a holistic overview of the patient's health.
                 
                 Task: Conduct comprehensive health assessment considering all body systems.
@@ -167,41 +157,96 @@ class MedicalAgent:
                 }}
                 
                 Patient Report: {medical_report}
-            """
-        }
+            """)
+
+class MedicalAgent:
+    """Base class for all medical specialist agents"""
+    
+    # Scheduling class used when the provider's rate limits are the bottleneck
+    priority = NORMAL
+    # Shape the JSON reply is validated against
+    schema = SpecialistResponse
+    
+    def __init__(self, medical_report=None, role=None, extra_info=None, model_name="llama-3.3-70b-versatile", temperature=0):
+        self.medical_report = medical_report
+        self.role = role
+        self.extra_info = extra_info or {}
+        self.model = get_chat_model(model_name, temperature)
+        self.prompt_template = self.create_prompt_template()
+        self.response = None
+        self.confidence_score = 0.0
         
-        template = templates.get(self.role, "")
-        return PromptTemplate.from_template(template)
+    def create_prompt_template(self):
+        """Shared role-specific prompt template"""
+        return get_prompt(f"EnhancedAgents.{self.role}")
+    
+    def format_prompt(self):
+        """Render the prompt template with this agent's inputs"""
+        return self.prompt_template.format(medical_report=self.medical_report)
+    
+    def parse_response(self, response):
+        """Store the raw response and parse the JSON object in it against ``schema``"""
+        self.response = response
+        try:
+            return self._accept(parse_response(response, self.schema))
+        except ResponseParseError as e:
+            return self._reject(e)
+    
+    def _accept(self, parsed):
+        self.confidence_score = parsed['confidence_score']
+        return parsed
+    
+    def _reject(self, error):
+        # No made-up confidence: an unusable reply scores 0
+        self.response = error.response
+        self.confidence_score = 0.0
+        return {"raw_response": error.response, "error": f"Failed to parse JSON: {error}", "confidence_score": 0.0}
     
     def run(self):
-        """Execute the agent analysis"""
+        """Execute the agent analysis (JSON mode, re-asked within the retry budget if invalid)"""
         try:
-            prompt = self.prompt_template.format(medical_report=self.medical_report)
-            response = self.model.invoke(prompt)
-            self.response = response.content
-            
-            # Try to parse JSON response
-            try:
-                parsed = json.loads(self.response)
-                self.confidence_score = parsed.get('confidence_score', 0.5)
-                return parsed
-            except:
-                # If not JSON, return as text
-                return {"raw_response": self.response, "confidence_score": 0.5}
-                
+            prompt = self.format_prompt()
+            return self._accept(invoke_structured(self.model, prompt, self.schema, role=self.role, priority=self.priority))
+        except ResponseParseError as e:
+            return self._reject(e)
+        except Exception as e:
+            return {"error": str(e), "confidence_score": 0.0}
+    
+    async def arun(self):
+        """Execute the agent analysis without blocking the event loop"""
+        try:
+            prompt = self.format_prompt()
+            return self._accept(await ainvoke_structured(self.model, prompt, self.schema,
+                                                         role=self.role, priority=self.priority))
+        except ResponseParseError as e:
+            return self._reject(e)
+        except Exception as e:
+            return {"error": str(e), "confidence_score": 0.0}
+    
+    def run_stream(self, on_field=None):
+        """Execute the analysis streaming, calling ``on_field(key, value)`` as each section completes"""
+        try:
+            prompt = self.format_prompt()
+            return self._accept(stream_structured(self.model, prompt, self.schema, role=self.role,
+                                                  priority=self.priority, on_field=on_field))
+        except ResponseParseError as e:
+            return self._reject(e)
+        except Exception as e:
+            return {"error": str(e), "confidence_score": 0.0}
+    
+    async def arun_stream(self, on_field=None):
+        """Async counterpart of run_stream"""
+        try:
+            prompt = self.format_prompt()
+            return self._accept(await astream_structured(self.model, prompt, self.schema, role=self.role,
+                                                         priority=self.priority, on_field=on_field))
+        except ResponseParseError as e:
+            return self._reject(e)
         except Exception as e:
             return {"error": str(e), "confidence_score": 0.0}
 
 
-class DrugInteractionChecker(MedicalAgent):
-    """Specialized agent for checking drug interactions"""
-    
-    def __init__(self, medications, model_name="llama-3.3-70b-versatile"):
-        self.medications = medications
-        super().__init__(role="DrugInteractionChecker", model_name=model_name)
-        
-    def create_prompt_template(self):
-        return PromptTemplate.from_template("""
+register_prompt("EnhancedAgents.DrugInteractionChecker", """
             Act as a clinical pharmacologist. Analyze potential drug interactions.
             
             Medications: {medications}
@@ -224,30 +269,22 @@ class DrugInteractionChecker(MedicalAgent):
                 "confidence_score": 0.0-1.0
             }}
         """)
-    
-    def run(self):
-        try:
-            prompt = self.prompt_template.format(medications=", ".join(self.medications))
-            response = self.model.invoke(prompt)
-            self.response = response.content
-            
-            try:
-                return json.loads(self.response)
-            except:
-                return {"raw_response": self.response, "confidence_score": 0.5}
-        except Exception as e:
-            return {"error": str(e)}
 
 
-class LabResultAnalyzer(MedicalAgent):
-    """Specialized agent for analyzing laboratory results"""
+class DrugInteractionChecker(MedicalAgent):
+    """Specialized agent for checking drug interactions"""
     
-    def __init__(self, lab_results, model_name="llama-3.3-70b-versatile"):
-        self.lab_results = lab_results
-        super().__init__(role="LabResultAnalyzer", model_name=model_name)
+    schema = DrugInteractionResponse
+    
+    def __init__(self, medications, model_name="llama-3.3-70b-versatile"):
+        self.medications = medications
+        super().__init__(role="DrugInteractionChecker", model_name=model_name)
         
-    def create_prompt_template(self):
-        return PromptTemplate.from_template("""
+    def format_prompt(self):
+        return self.prompt_template.format(medications=", ".join(self.medications))
+
+
+register_prompt("EnhancedAgents.LabResultAnalyzer", """
             Act as a clinical pathologist. Analyze laboratory test results.
             
             Lab Results: {lab_results}
@@ -271,30 +308,22 @@ class LabResultAnalyzer(MedicalAgent):
                 "confidence_score": 0.0-1.0
             }}
         """)
-    
-    def run(self):
-        try:
-            prompt = self.prompt_template.format(lab_results=self.lab_results)
-            response = self.model.invoke(prompt)
-            self.response = response.content
-            
-            try:
-                return json.loads(self.response)
-            except:
-                return {"raw_response": self.response, "confidence_score": 0.5}
-        except Exception as e:
-            return {"error": str(e)}
 
 
-class MultidisciplinaryTeam(MedicalAgent):
-    """Synthesizes insights from multiple specialists"""
+class LabResultAnalyzer(MedicalAgent):
+    """Specialized agent for analyzing laboratory results"""
     
-    def __init__(self, specialist_reports, model_name="llama-3.3-70b-versatile"):
-        self.specialist_reports = specialist_reports
-        super().__init__(role="MultidisciplinaryTeam", model_name=model_name)
+    schema = LabResultResponse
+    
+    def __init__(self, lab_results, model_name="llama-3.3-70b-versatile"):
+        self.lab_results = lab_results
+        super().__init__(role="LabResultAnalyzer", model_name=model_name)
         
-    def create_prompt_template(self):
-        return PromptTemplate.from_template("""
+    def format_prompt(self):
+        return self.prompt_template.format(lab_results=self.lab_results)
+
+
+register_prompt("EnhancedAgents.MultidisciplinaryTeam", """
             Act as a multidisciplinary medical team coordinator. Synthesize specialist assessments.
             
             Specialist Reports:
@@ -315,24 +344,24 @@ class MultidisciplinaryTeam(MedicalAgent):
                 "confidence_score": 0.0-1.0
             }}
         """)
+
+
+class MultidisciplinaryTeam(MedicalAgent):
+    """Synthesizes insights from multiple specialists"""
     
-    def run(self):
-        try:
-            reports_text = "\n\n".join([
-                f"{role}:\n{json.dumps(report, indent=2)}" 
-                for role, report in self.specialist_reports.items()
-            ])
-            
-            prompt = self.prompt_template.format(specialist_reports=reports_text)
-            response = self.model.invoke(prompt)
-            self.response = response.content
-            
-            try:
-                return json.loads(self.response)
-            except:
-                return {"raw_response": self.response, "confidence_score": 0.5}
-        except Exception as e:
-            return {"error": str(e)}
+    schema = MultidisciplinaryResponse
+    
+    def __init__(self, specialist_reports, model_name="llama-3.3-70b-versatile"):
+        self.specialist_reports = specialist_reports
+        super().__init__(role="MultidisciplinaryTeam", model_name=model_name)
+        
+    def format_prompt(self):
+        reports_text = "\n\n".join([
+            f"{role}:\n{json.dumps(report, indent=2)}" 
+            for role, report in self.specialist_reports.items()
+        ])
+        
+        return self.prompt_template.format(specialist_reports=reports_text)
 
 
 # Specialist class definitions
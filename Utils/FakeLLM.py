@@ -0,0 +1,353 @@
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, ClassVar
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from Utils import ResponseParsing
+from Utils.RateLimiter import RequestScheduler
+
+# Keys quoted in a prompt's JSON example, e.g. ``"overall_risk":``
+_PROMPT_KEY = re.compile(r'"(\w+)"\s*:')
+
+# Characters per streamed chunk (about four tokens)
+CHUNK_CHARS = 16
+
+# Bucket size standing in for "no limit" on the fake backend's own scheduler
+UNLIMITED_PER_MINUTE = 1e12
+
+# Values for fields the pages read, so fake replies render like real ones;
+# any other field gets a generic value of its declared type
+FIELD_SAMPLES = {
+    "overall_risk": "moderate",
+    "severity": "mild",
+    "overall_severity": "moderate",
+    "urgency": "routine",
+    "urgency_level": "routine",
+    "acute_event_risk": "low",
+    "acs_probability": "low",
+    "risk_assessment": "moderate",
+    "rhythm": "Normal sinus rhythm",
+    "heart_rate": 72,
+    "primary_diagnosis": "Essential hypertension",
+    "clinical_significance": "No acute abnormality; continue routine follow-up",
+    "intervals": {"pr_interval": "normal", "qrs_duration": "normal", "qt_interval": "normal"},
+    "total_cholesterol": {"value": 212, "status": "borderline", "target": "<200 mg/dL"},
+    "ldl_cholesterol": {"value": 134, "status": "borderline", "target": "<100 mg/dL"},
+    "hdl_cholesterol": {"value": 46, "status": "normal", "target": ">40 mg/dL"},
+    "triglycerides": {"value": 160, "status": "borderline", "target": "<150 mg/dL"},
+    "troponin": {"value": 0.01, "status": "normal", "interpretation": "No evidence of myocardial injury"},
+    "bnp_or_nt_probnp": {"value": 80, "status": "normal", "interpretation": "Heart failure unlikely"},
+    "crp": {"value": 2.1, "status": "normal", "interpretation": "Average cardiovascular risk"},
+    "pain_characteristics": {
+        "location": "retrosternal", "quality": "pressure", "radiation": "none",
+        "duration": "minutes", "triggers": ["exertion"]
+    },
+    "interactions": [{
+        "drugs": ["lisinopril", "spironolactone"], "severity": "moderate",
+        "description": "Additive risk of hyperkalemia", "recommendation": "Monitor potassium"
+    }],
+    "abnormal_values": [{
+        "test": "LDL cholesterol", "value": "134 mg/dL", "normal_range": "<100 mg/dL",
+        "significance": "Raises atherosclerotic risk"
+    }],
+    "lifestyle_modifications": {
+        "diet": ["Follow a DASH-style diet", "Limit sodium to 1,500 mg/day"],
+        "exercise": ["150 minutes of moderate activity per week"],
+        "smoking_cessation": ["Stay smoke-free"],
+        "stress_management": ["Daily 10-minute relaxation practice"],
+        "sleep": ["7-9 hours per night"]
+    },
+    "medications": {
+        "statins": {"recommended": True, "rationale": "LDL above target at moderate risk"},
+        "antihypertensives": {"recommended": False, "rationale": "Try lifestyle changes first"},
+        "antiplatelet": {"recommended": False, "rationale": "Bleeding risk outweighs benefit"}
+    },
+    "monitoring": {"frequency": "Every 3 months", "tests": ["Lipid panel", "Blood pressure"], "follow_up": "3 months"},
+    "goals": {
+        "blood_pressure": "<130/80", "ldl_cholesterol": "<100 mg/dL",
+        "weight": "BMI <25", "exercise": "150 min/week"
+    }
+}
+
+
+def _schemas():
+    """Every agent response schema defined in ResponseParsing"""
+    return [
+        value for value in vars(ResponseParsing).values()
+        if isinstance(value, type) and issubclass(value, ResponseParsing.AgentResponse)
+        and value is not ResponseParsing.AgentResponse
+    ]
+
+
+def match_schema(prompt):
+    """Response schema whose fields best match the JSON example in ``prompt`` (None if none fits)
+
+    A schema only qualifies when all of its required fields are quoted in
+    the prompt; ties go to the schema with more matching fields.
+    """
+    keys = set(_PROMPT_KEY.findall(prompt))
+    best, best_score = None, (0.0, 0)
+    for schema in _schemas():
+        fields = schema.model_fields
+        required = {name for name, field in fields.items() if field.is_required()}
+        if not required or not required <= keys:
+            continue
+        matched = len(keys & set(fields))
+        score = (matched / len(fields), matched)
+        if score > best_score:
+            best, best_score = schema, score
+    return best
+
+
+def _generic_value(name, annotation, role):
+    label = name.replace("_", " ")
+    if annotation is bool:
+        return False
+    if annotation in (int, float):
+        return 1
+    if annotation is list:
+        return [f"{role} {label} {i}" for i in (1, 2)]
+    if annotation is dict:
+        return {"summary": f"{role} {label}"}
+    return f"{role} {label}"
+
+
+def sample_response(schema, role="Fake", confidence=0.85):
+    """Schema-valid reply for ``schema`` as a dict"""
+    data = {}
+    for name, field in schema.model_fields.items():
+        if name == "confidence_score":
+            data[name] = round(confidence, 2)
+        elif name in FIELD_SAMPLES:
+            data[name] = FIELD_SAMPLES[name]
+        else:
+            data[name] = _generic_value(name, field.annotation, role)
+    return schema.model_validate(data).model_dump()
+
+
+class StubChatModel(BaseChatModel):
+    """Offline chat model that answers every prompt with a canned response"""
+
+    model_name: str = "stub"
+    temperature: float = 0
+    response: str = '{"confidence_score": 0.0}'
+    transport: Any = None
+    # Local backend: never counts against the provider's rate limits
+    rate_limited: ClassVar[bool] = False
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.transport is not None:
+            self.transport.request()
+        message = AIMessage(content=self.response)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._generate(messages, stop=stop, **kwargs)
+
+
+class FakeLLMError(Exception):
+    """Simulated provider failure; ``status_code`` is what the HTTP layer would report"""
+
+    def __init__(self, message, status_code=500):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline chat model with provider-like latency, failures and token usage
+
+    Prompts carrying one of the agents' JSON examples are answered with a
+    schema-valid object for that agent; other prompts (and calls without
+    JSON mode that match nothing) get a short prose report. Each call
+    sleeps for a first-token latency drawn from ``latency_distribution``
+    plus the reply's output tokens at ``tokens_per_second``, and fails with
+    a simulated 429 or server error at the configured rates. Calls go
+    through the model's own RequestScheduler rather than the process-wide
+    one sized for the real provider, so load tests measure the agents and
+    not the provider's limits; simulated 429s are still retried. Its limits
+    are unbounded unless ``requests_per_minute``/``tokens_per_minute`` are set.
+    """
+
+    model_name: str = "fake"
+    temperature: float = 0
+    latency: float = 0.5
+    latency_distribution: str = "lognormal"
+    latency_spread: float = 0.5
+    tokens_per_second: float = 250.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    malformed_rate: float = 0.0
+    completion_tokens: int | None = None
+    seed: int | None = None
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+    transport: Any = None
+    rate_limited: ClassVar[bool] = True
+
+    def model_post_init(self, context):
+        self._rng = random.Random(self.seed)
+        self._scheduler = RequestScheduler(
+            requests_per_minute=self.requests_per_minute or UNLIMITED_PER_MINUTE,
+            tokens_per_minute=self.tokens_per_minute or UNLIMITED_PER_MINUTE
+        )
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(
+            ("calls", "errors", "rate_limited", "malformed", "input_tokens", "output_tokens"), 0
+        )
+
+    @classmethod
+    def from_env(cls, model_name="fake", temperature=0, **overrides):
+        """Model configured from ``LLM_FAKE_*`` environment variables"""
+        env = os.environ.get
+        completion_tokens = env("LLM_FAKE_COMPLETION_TOKENS")
+        seed = env("LLM_FAKE_SEED")
+        requests_per_minute = env("LLM_FAKE_REQUESTS_PER_MINUTE")
+        tokens_per_minute = env("LLM_FAKE_TOKENS_PER_MINUTE")
+        settings = {
+            "latency": float(env("LLM_FAKE_LATENCY", 0.5)),
+            "latency_distribution": env("LLM_FAKE_LATENCY_DISTRIBUTION", "lognormal"),
+            "latency_spread": float(env("LLM_FAKE_LATENCY_SPREAD", 0.5)),
+            "tokens_per_second": float(env("LLM_FAKE_TOKENS_PER_SECOND", 250)),
+            "error_rate": float(env("LLM_FAKE_ERROR_RATE", 0)),
+            "rate_limit_rate": float(env("LLM_FAKE_RATE_LIMIT_RATE", 0)),
+            "malformed_rate": float(env("LLM_FAKE_MALFORMED_RATE", 0)),
+            "completion_tokens": int(completion_tokens) if completion_tokens else None,
+            "seed": int(seed) if seed else None,
+            "requests_per_minute": float(requests_per_minute) if requests_per_minute else None,
+            "tokens_per_minute": float(tokens_per_minute) if tokens_per_minute else None
+        }
+        settings.update(overrides)
+        return cls(model_name=model_name, temperature=temperature, **settings)
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    @property
+    def request_scheduler(self):
+        """Scheduler admitting this model's calls in place of the process-wide one"""
+        return self._scheduler
+
+    def stats(self):
+        """Call, failure and token counters since creation"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self._stats[name] += amount
+
+    def first_token_latency(self):
+        """One draw from the configured latency distribution, in seconds"""
+        with self._lock:
+            if self.latency_distribution == "fixed":
+                return self.latency
+            if self.latency_distribution == "uniform":
+                spread = self.latency * self.latency_spread
+                return max(self._rng.uniform(self.latency - spread, self.latency + spread), 0.0)
+            if self.latency_distribution == "exponential":
+                return self._rng.expovariate(1 / self.latency) if self.latency > 0 else 0.0
+            if self.latency_distribution == "lognormal":
+                # Median ``latency``, long right tail like real provider latencies
+                return self.latency * self._rng.lognormvariate(0, self.latency_spread)
+        raise ValueError(f"Unknown latency distribution: {self.latency_distribution}")
+
+    def _roll(self, rate):
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def _reply(self, messages, json_requested):
+        """(text, input_tokens, output_tokens) for a request, or raise a simulated failure"""
+        prompt = "\n".join(str(message.content) for message in messages)
+        self._count(calls=1)
+        if self.transport is not None:
+            self.transport.request()
+        if self._roll(self.rate_limit_rate):
+            self._count(rate_limited=1)
+            raise FakeLLMError("rate limit exceeded (simulated)", status_code=429)
+        if self._roll(self.error_rate):
+            self._count(errors=1)
+            raise FakeLLMError("service unavailable (simulated)", status_code=503)
+
+        role = self.model_name.title()
+        schema = match_schema(prompt)
+        with self._lock:
+            confidence = self._rng.uniform(0.6, 0.95)
+        if schema is not None:
+            text = json.dumps(sample_response(schema, role, confidence), indent=2)
+        elif json_requested:
+            text = json.dumps({"response": f"{role} assessment", "confidence_score": round(confidence, 2)})
+        else:
+            text = (
+                f"- Possible issue 1: findings consistent with a benign cause ({role})\n"
+                "- Possible issue 2: lifestyle-related risk factors\n"
+                "- Recommended next steps: routine follow-up and repeat testing in 3 months"
+            )
+        if self._roll(self.malformed_rate):
+            self._count(malformed=1)
+            text = f"Here is my assessment:\n{text[:len(text) // 2]}"
+
+        input_tokens = len(prompt) // 4
+        output_tokens = self.completion_tokens or max(len(text) // 4, 1)
+        self._count(input_tokens=input_tokens, output_tokens=output_tokens)
+        return text, input_tokens, output_tokens
+
+    def _usage(self, input_tokens, output_tokens):
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _result(self, text, input_tokens, output_tokens):
+        usage = self._usage(input_tokens, output_tokens)
+        message = AIMessage(content=text, usage_metadata=usage, response_metadata={
+            "model_name": self.model_name,
+            "token_usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                            "total_tokens": usage["total_tokens"]}
+        })
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage})
+
+    def _chunks(self, text, input_tokens, output_tokens):
+        """Streamed pieces of ``text`` with the generation time each one stands for"""
+        pieces = [text[i:i + CHUNK_CHARS] for i in range(0, len(text), CHUNK_CHARS)] or [""]
+        delay = output_tokens / self.tokens_per_second / len(pieces)
+        for index, piece in enumerate(pieces):
+            usage = self._usage(input_tokens, output_tokens) if index == len(pieces) - 1 else None
+            yield delay, ChatGenerationChunk(message=AIMessageChunk(content=piece, usage_metadata=usage))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay = self.first_token_latency()
+        text, input_tokens, output_tokens = self._reply(messages, "response_format" in kwargs)
+        time.sleep(delay + output_tokens / self.tokens_per_second)
+        return self._result(text, input_tokens, output_tokens)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        delay = self.first_token_latency()
+        text, input_tokens, output_tokens = self._reply(messages, "response_format" in kwargs)
+        await asyncio.sleep(delay + output_tokens / self.tokens_per_second)
+        return self._result(text, input_tokens, output_tokens)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_latency())
+        reply = self._reply(messages, "response_format" in kwargs)
+        for delay, chunk in self._chunks(*reply):
+            time.sleep(delay)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.first_token_latency())
+        reply = self._reply(messages, "response_format" in kwargs)
+        for delay, chunk in self._chunks(*reply):
+            await asyncio.sleep(delay)
+            yield chunk
@@ -0,0 +1,110 @@
+import functools
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+
+def _freeze(value):
+    """Hashable, order-independent description of a builder argument"""
+    if isinstance(value, (pd.Series, pd.Index)):
+        value = value.to_numpy()
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return ("ndarray", value.shape, _freeze(value.tolist()))
+        return ("ndarray", value.dtype.str, value.shape, hashlib.sha256(np.ascontiguousarray(value)).hexdigest())
+    if isinstance(value, dict):
+        return ("dict", tuple(sorted((repr(k), _freeze(v)) for k, v in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(v) for v in value))
+    if isinstance(value, np.generic):
+        value = value.item()
+    return repr(value)
+
+
+class FigureCache:
+    """LRU of serialized Plotly figures keyed by builder name and inputs
+
+    Figures are kept as JSON and rebuilt with validation turned off, which
+    skips both the builder and Plotly's property validation (the JSON came
+    from a validated figure). Every hit is a new Figure, so callers may
+    update it freely.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name, args, kwargs):
+        """Content hash of one builder call"""
+        frozen = (name, _freeze(list(args)), _freeze(kwargs))
+        return hashlib.sha256(repr(frozen).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Cached figure for ``key``, or None on a miss"""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return go.Figure(json.loads(payload), _validate=False)
+
+    def set(self, key, fig):
+        """Store the JSON of ``fig``"""
+        payload = fig.to_json()
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Hit/miss counters, entry count and cached JSON size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": sum(len(payload) for payload in self._entries.values())
+            }
+
+    def clear(self):
+        """Drop every cached figure and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+
+FIGURE_CACHE = FigureCache()
+
+
+def cached_figure(builder):
+    """Serve repeat calls of a figure builder from FIGURE_CACHE"""
+    name = f"{builder.__module__}.{builder.__qualname__}"
+
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        key = FIGURE_CACHE.make_key(name, args, kwargs)
+        fig = FIGURE_CACHE.get(key)
+        if fig is None:
+            fig = builder(*args, **kwargs)
+            FIGURE_CACHE.set(key, fig)
+        return fig
+
+    wrapper.uncached = builder
+    return wrapper
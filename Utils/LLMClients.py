@@ -0,0 +1,505 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+
+from Utils.RateLimiter import NORMAL, estimate_text_tokens, get_request_scheduler
+from Utils.ResponseCache import get_response_cache
+from Utils.Telemetry import get_telemetry
+
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+
+class StubTransport:
+    """In-process stand-in for a keep-alive HTTP connection pool"""
+
+    def __init__(self, max_keepalive=10):
+        self.max_keepalive = max_keepalive
+        self.connections_opened = 0
+        self.requests = 0
+        self._idle = 0
+        self._lock = threading.Lock()
+
+    def request(self):
+        """Borrow a connection for one request, opening one only if none is idle"""
+        with self._lock:
+            self.requests += 1
+            if self._idle:
+                self._idle -= 1
+            else:
+                self.connections_opened += 1
+        with self._lock:
+            if self._idle < self.max_keepalive:
+                self._idle += 1
+
+    def close(self):
+        with self._lock:
+            self._idle = 0
+
+
+class LoopLocalTransport:
+    """Async HTTP transport that keeps one shared connection pool per event loop
+
+    Async connections belong to the loop that opened them, and the app runs
+    a fresh loop per batch (``asyncio.run``), so pooling is per loop: every
+    client's calls within one run share a pool, and a later run never reuses
+    a connection from a closed loop. ``factory()`` builds a pool (an httpx
+    async transport).
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.pools_opened = 0
+        self._pools = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = self._pools[loop] = self.factory()
+                self.pools_opened += 1
+            return pool
+
+    async def handle_async_request(self, request):
+        return await self._pool().handle_async_request(request)
+
+    async def aclose(self):
+        pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+    def close(self):
+        # Pools of other loops cannot be closed from here; their connections go with the loop
+        with self._lock:
+            self._pools.clear()
+
+
+class ClientRegistry:
+    """Process-wide pool of chat clients keyed by (model_name, temperature)
+
+    Every agent hierarchy asks the registry for its model instead of building
+    its own ``ChatGroq``, so client construction happens once per key and all
+    clients of a backend share one keep-alive connection pool (sync calls)
+    and one LoopLocalTransport (async calls).
+
+    Model names may carry a backend prefix (``"stub:cardiology"``,
+    ``"fake:llama"``); names without a registered prefix go to
+    ``default_backend`` (env ``LLM_BACKEND``, default Groq), so setting
+    ``LLM_BACKEND=fake`` runs the whole app offline.
+    """
+
+    def __init__(self, max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0,
+                 default_backend=None):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.default_backend = default_backend or os.environ.get("LLM_BACKEND", "groq")
+        self.clients_created = 0
+        self._clients = {}
+        self._transports = {}
+        self._backends = {
+            "groq": self._create_groq_client,
+            "stub": self._create_stub_client,
+            "fake": self._create_fake_client
+        }
+        self._lock = threading.RLock()
+
+    def register_backend(self, prefix, factory):
+        """Register ``factory(model_name, temperature)`` for names starting with ``prefix:``"""
+        with self._lock:
+            self._backends[prefix] = factory
+
+    def resolve_backend(self, model_name):
+        """Split a model name into (backend, model) parts"""
+        prefix, sep, name = model_name.partition(":")
+        if sep and prefix in self._backends:
+            return prefix, name
+        if model_name in self._backends:
+            return model_name, model_name
+        return self.default_backend, model_name
+
+    def get(self, model_name=DEFAULT_MODEL, temperature=0):
+        """Return the shared client for (model_name, temperature), creating it once"""
+        key = (model_name, float(temperature))
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                backend, name = self.resolve_backend(model_name)
+                client = self._backends[backend](name, float(temperature))
+                self._clients[key] = client
+                self.clients_created += 1
+        return client
+
+    def _limits(self):
+        import httpx
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def transport(self, backend):
+        """Shared connection pool for a backend, created on first use"""
+        with self._lock:
+            transport = self._transports.get(backend)
+            if transport is None:
+                if backend == "groq":
+                    import httpx
+                    transport = httpx.Client(limits=self._limits())
+                else:
+                    transport = StubTransport(self.max_keepalive_connections)
+                self._transports[backend] = transport
+            return transport
+
+    def async_transport(self, backend):
+        """Shared LoopLocalTransport for a backend's async calls, created on first use"""
+        key = backend + ":async"
+        with self._lock:
+            transport = self._transports.get(key)
+            if transport is None:
+                import httpx
+                limits = self._limits()
+                transport = self._transports[key] = LoopLocalTransport(
+                    lambda: httpx.AsyncHTTPTransport(limits=limits)
+                )
+            return transport
+
+    def _create_groq_client(self, model_name, temperature):
+        import httpx
+        from langchain_groq import ChatGroq
+        return ChatGroq(temperature=temperature, model=model_name, http_client=self.transport("groq"),
+                        http_async_client=httpx.AsyncClient(transport=self.async_transport("groq")))
+
+    def _create_stub_client(self, model_name, temperature):
+        from Utils.FakeLLM import StubChatModel
+        return StubChatModel(model_name=model_name, temperature=temperature, transport=self.transport("stub"))
+
+    def _create_fake_client(self, model_name, temperature):
+        from Utils.FakeLLM import FakeChatModel
+        return FakeChatModel.from_env(model_name, temperature, transport=self.transport("fake"))
+
+    def stats(self):
+        """Client and connection counters, mainly for checking that pooling works"""
+        with self._lock:
+            stub = self._transports.get("stub")
+            fake = self._transports.get("fake")
+            return {
+                "clients": len(self._clients),
+                "clients_created": self.clients_created,
+                "stub_requests": stub.requests if stub else 0,
+                "stub_connections_opened": stub.connections_opened if stub else 0,
+                "fake_requests": fake.requests if fake else 0,
+                "fake_connections_opened": fake.connections_opened if fake else 0
+            }
+
+    def clear(self):
+        """Drop all cached clients and close their connection pools"""
+        with self._lock:
+            for transport in self._transports.values():
+                transport.close()
+            self._clients.clear()
+            self._transports.clear()
+            self.clients_created = 0
+
+
+_registry = ClientRegistry()
+
+
+def get_registry():
+    """The process-wide client registry"""
+    return _registry
+
+
+def get_chat_model(model_name=DEFAULT_MODEL, temperature=0):
+    """Shared chat client for (model_name, temperature)"""
+    return _registry.get(model_name, temperature)
+
+
+def prompt_template(template):
+    """langchain PromptTemplate for ``template``, importing langchain on first use"""
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate.from_template(template)
+
+
+def __getattr__(name):
+    # StubChatModel moved to FakeLLM so importing this module stays free of langchain
+    if name == "StubChatModel":
+        from Utils.FakeLLM import StubChatModel
+        return StubChatModel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def json_mode(model):
+    """``model`` bound to ask the provider for a single JSON object reply"""
+    return model.bind(response_format={"type": "json_object"})
+
+
+def model_identity(model):
+    """(model_name, temperature) of a chat client, as used for cache keys
+
+    Bound clients (e.g. from json_mode) are keyed apart from the plain client.
+    """
+    bound = getattr(model, "bound", None)
+    if bound is not None:
+        model_name, temperature = model_identity(bound)
+        response_format = getattr(model, "kwargs", {}).get("response_format")
+        if response_format:
+            model_name = f"{model_name}+{response_format.get('type')}"
+        return model_name, temperature
+    return getattr(model, "model_name", type(model).__name__), getattr(model, "temperature", None)
+
+
+def _cache_for(model, role, prompt, use_cache):
+    """Return (cache, key) for a cacheable call, or (None, None)"""
+    model_name, temperature = model_identity(model)
+    if not use_cache or temperature != 0:
+        return None, None
+    cache = get_response_cache()
+    return cache, cache.make_key(role, model_name, temperature, prompt)
+
+
+def remember_response(model, prompt, text, role=None):
+    """Cache ``text`` as the response to ``prompt`` (e.g. a corrected re-ask reply)"""
+    cache, key = _cache_for(model, role, prompt, True)
+    if cache is not None:
+        cache.set(key, text)
+
+
+def _scheduler_for(model):
+    """The model's own scheduler if it has one (e.g. the fake backend), else the process-wide one"""
+    client = getattr(model, "bound", model)
+    scheduler = getattr(client, "request_scheduler", None)
+    if scheduler is not None:
+        return scheduler
+    return get_request_scheduler() if getattr(client, "rate_limited", True) else None
+
+
+def _usage_tokens(prompt, text, usage):
+    """(prompt, completion) tokens of a call, estimated when the reply has no usage metadata"""
+    usage = usage or {}
+    return (usage.get("input_tokens", estimate_text_tokens(prompt)),
+            usage.get("output_tokens", estimate_text_tokens(text)))
+
+
+def _settle(scheduler, prompt, text="", usage=None):
+    """Return the unused part of the scheduler's token reservation for this call"""
+    if scheduler is not None:
+        scheduler.settle(prompt, sum(_usage_tokens(prompt, text, usage)))
+
+
+def _record(model, role, prompt, started, cache, text="", usage=None, retries=0, error=None, streamed=False):
+    """Report one call to the process-wide telemetry
+
+    Cache hits cost no tokens; provider replies without usage metadata are
+    estimated at ~4 characters per token.
+    """
+    if cache == "hit":
+        prompt_tokens = completion_tokens = 0
+    else:
+        prompt_tokens, completion_tokens = _usage_tokens(prompt, text, usage)
+    get_telemetry().record_call(
+        role, model_identity(model)[0], cache, time.perf_counter() - started,
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        retries=retries, error=error, streamed=streamed
+    )
+
+
+def invoke_model(model, prompt, role=None, use_cache=True, priority=NORMAL, accept=None):
+    """Send a rendered prompt to ``model`` and return the response text
+
+    Deterministic calls (temperature 0) go through the process-wide response
+    cache, so an identical (role, model, temperature, prompt) is only ever
+    sent to the provider once per cache lifetime. Calls that miss the cache
+    are admitted by the process-wide RequestScheduler in ``priority`` order
+    and retried on rate-limit errors. With ``accept``, only responses for
+    which ``accept(text)`` is true are cached. Every call is recorded in
+    the process-wide Telemetry.
+    """
+    started = time.perf_counter()
+    cache, key = _cache_for(model, role, prompt, use_cache)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            _record(model, role, prompt, started, "hit", cached)
+            return cached
+
+    attempts = 0
+
+    def call():
+        nonlocal attempts
+        attempts += 1
+        return model.invoke(prompt)
+
+    outcome = "off" if cache is None else "miss"
+    scheduler = _scheduler_for(model)
+    try:
+        message = scheduler.call(call, prompt, priority) if scheduler is not None else call()
+    except Exception as e:
+        _settle(scheduler, prompt)
+        _record(model, role, prompt, started, outcome, retries=max(attempts - 1, 0), error=e)
+        raise
+    text = message.content
+    _settle(scheduler, prompt, text, message.usage_metadata)
+    _record(model, role, prompt, started, outcome, text, message.usage_metadata, attempts - 1)
+
+    if cache is not None and (accept is None or accept(text)):
+        cache.set(key, text)
+    return text
+
+
+async def ainvoke_model(model, prompt, role=None, use_cache=True, priority=NORMAL, accept=None):
+    """Async counterpart of invoke_model built on the client's ``ainvoke``"""
+    started = time.perf_counter()
+    cache, key = _cache_for(model, role, prompt, use_cache)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            _record(model, role, prompt, started, "hit", cached)
+            return cached
+
+    attempts = 0
+
+    def call():
+        nonlocal attempts
+        attempts += 1
+        return model.ainvoke(prompt)
+
+    outcome = "off" if cache is None else "miss"
+    scheduler = _scheduler_for(model)
+    try:
+        message = await (scheduler.acall(call, prompt, priority) if scheduler is not None else call())
+    except Exception as e:
+        _settle(scheduler, prompt)
+        _record(model, role, prompt, started, outcome, retries=max(attempts - 1, 0), error=e)
+        raise
+    text = message.content
+    _settle(scheduler, prompt, text, message.usage_metadata)
+    _record(model, role, prompt, started, outcome, text, message.usage_metadata, attempts - 1)
+
+    if cache is not None and (accept is None or accept(text)):
+        cache.set(key, text)
+    return text
+
+
+def _first_chunk(stream):
+    """Pull the first chunk so connection and rate-limit errors surface inside the scheduler"""
+    stream = iter(stream)
+    return next(stream, None), stream
+
+
+async def _afirst_chunk(stream):
+    stream = stream.__aiter__()
+    try:
+        return await stream.__anext__(), stream
+    except StopAsyncIteration:
+        return None, stream
+
+
+def _merge_usage(total, chunk):
+    usage = getattr(chunk, "usage_metadata", None)
+    if not usage:
+        return total
+    if total is None:
+        return dict(usage)
+    return {name: total.get(name, 0) + usage.get(name, 0) for name in set(total) | set(usage)}
+
+
+def stream_model(model, prompt, role=None, use_cache=True, priority=NORMAL, accept=None):
+    """Yield the response text of ``model`` chunk by chunk as it is generated
+
+    Caching, admission, rate-limit retries and telemetry work as in
+    invoke_model; a cached response is yielded as a single chunk, and the
+    complete text is cached once the stream ends (subject to ``accept``).
+    """
+    started = time.perf_counter()
+    cache, key = _cache_for(model, role, prompt, use_cache)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            _record(model, role, prompt, started, "hit", cached, streamed=True)
+            yield cached
+            return
+
+    attempts = 0
+
+    def call():
+        nonlocal attempts
+        attempts += 1
+        return _first_chunk(model.stream(prompt))
+
+    outcome = "off" if cache is None else "miss"
+    parts = []
+    usage = None
+    scheduler = _scheduler_for(model)
+    try:
+        first, stream = scheduler.call(call, prompt, priority) if scheduler is not None else call()
+        if first is not None:
+            usage = _merge_usage(usage, first)
+            parts.append(first.content)
+            yield first.content
+        for chunk in stream:
+            usage = _merge_usage(usage, chunk)
+            parts.append(chunk.content)
+            yield chunk.content
+    except Exception as e:
+        _settle(scheduler, prompt, "".join(parts), usage)
+        _record(model, role, prompt, started, outcome, "".join(parts), usage,
+                max(attempts - 1, 0), error=e, streamed=True)
+        raise
+
+    text = "".join(parts)
+    _settle(scheduler, prompt, text, usage)
+    _record(model, role, prompt, started, outcome, text, usage, attempts - 1, streamed=True)
+    if cache is not None and (accept is None or accept(text)):
+        cache.set(key, text)
+
+
+async def astream_model(model, prompt, role=None, use_cache=True, priority=NORMAL, accept=None):
+    """Async counterpart of stream_model built on the client's ``astream``"""
+    started = time.perf_counter()
+    cache, key = _cache_for(model, role, prompt, use_cache)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            _record(model, role, prompt, started, "hit", cached, streamed=True)
+            yield cached
+            return
+
+    attempts = 0
+
+    def call():
+        nonlocal attempts
+        attempts += 1
+        return _afirst_chunk(model.astream(prompt))
+
+    outcome = "off" if cache is None else "miss"
+    parts = []
+    usage = None
+    scheduler = _scheduler_for(model)
+    try:
+        first, stream = await (scheduler.acall(call, prompt, priority) if scheduler is not None else call())
+        if first is not None:
+            usage = _merge_usage(usage, first)
+            parts.append(first.content)
+            yield first.content
+        async for chunk in stream:
+            usage = _merge_usage(usage, chunk)
+            parts.append(chunk.content)
+            yield chunk.content
+    except Exception as e:
+        _settle(scheduler, prompt, "".join(parts), usage)
+        _record(model, role, prompt, started, outcome, "".join(parts), usage,
+                max(attempts - 1, 0), error=e, streamed=True)
+        raise
+
+    text = "".join(parts)
+    _settle(scheduler, prompt, text, usage)
+    _record(model, role, prompt, started, outcome, text, usage, attempts - 1, streamed=True)
+    if cache is not None and (accept is None or accept(text)):
+        cache.set(key, text)
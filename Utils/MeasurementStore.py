@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+DEFAULT_STORE_PATH = os.path.join("data", "measurements.sqlite")
+
+
+def _timestamp(date):
+    return int(np.datetime64(date, 's').astype(np.int64))
+
+
+class MeasurementStore:
+    """Longitudinal patient measurements in SQLite (WAL mode)
+
+    Readings are stored one row per (patient, metric, timestamp) in a
+    WITHOUT ROWID table whose primary key doubles as the range index, so a
+    date window for one patient is read straight from the index and the
+    history of thousands of patients never has to be loaded at once.
+    Re-recording a metric at the same timestamp replaces the old value.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS measurements ("
+            "patient_id TEXT NOT NULL, metric TEXT NOT NULL, ts INTEGER NOT NULL, value REAL NOT NULL, "
+            "PRIMARY KEY (patient_id, metric, ts)) WITHOUT ROWID"
+        )
+        # Covering index for whole-visit window reads across metrics
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS measurements_patient_ts ON measurements (patient_id, ts, metric, value)"
+        )
+        self._db.commit()
+
+    def append(self, patient_id, dates, measurements):
+        """Bulk insert ``{metric: values}`` aligned with ``dates`` in one transaction (NaN/None skipped)"""
+        timestamps = np.asarray(dates, dtype='datetime64[s]').astype(np.int64).tolist()
+        rows = [
+            (patient_id, metric, ts, float(value))
+            for metric, values in measurements.items()
+            for ts, value in zip(timestamps, np.asarray(values, dtype=np.float64).tolist())
+            if value == value
+        ]
+        with self._lock:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO measurements (patient_id, metric, ts, value) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+        return len(rows)
+
+    def add_measurement(self, patient_id, date, measurements):
+        """Record one visit's measurements"""
+        return self.append(patient_id, [np.datetime64(date, 's')], {
+            metric: [np.nan if value is None else value] for metric, value in measurements.items()
+        })
+
+    def _window(self, start, end):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(_timestamp(start))
+        if end is not None:
+            clauses.append("ts <= ?")
+            params.append(_timestamp(end))
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+    def series(self, patient_id, metric, start=None, end=None):
+        """``(dates, values)`` of one metric for ``[start, end]``, oldest first"""
+        window, params = self._window(start, end)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT ts, value FROM measurements WHERE patient_id = ? AND metric = ?{window} ORDER BY ts",
+                [patient_id, metric] + params
+            ).fetchall()
+        data = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        return data[:, 0].astype(np.int64).astype('datetime64[s]'), data[:, 1].astype(np.float64)
+
+    def load(self, patient_id, start=None, end=None, metrics=None):
+        """ProgressTracker holding only the ``[start, end]`` window of a patient
+
+        The tracker stays bound to the store, so measurements added to it are
+        written through.
+        """
+        window, params = self._window(start, end)
+        query = f"SELECT ts, metric, value FROM measurements WHERE patient_id = ?{window}"
+        params = [patient_id] + params
+        if metrics:
+            query += f" AND metric IN ({', '.join('?' * len(metrics))})"
+            params += list(metrics)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY ts", params).fetchall()
+
+        # Imported here so recording measurements does not load the agent stack
+        from Utils.CardioAgents import ProgressTracker
+        tracker = ProgressTracker()
+        if rows:
+            timestamps, names, values = zip(*rows)
+            dates, rows_index = np.unique(np.array(timestamps, dtype=np.int64), return_inverse=True)
+            names = np.array(names)
+            values = np.array(values, dtype=np.float64)
+            columns = {}
+            for metric in np.unique(names).tolist():
+                selected = names == metric
+                column = np.full(len(dates), np.nan, dtype=np.float64)
+                column[rows_index[selected]] = values[selected]
+                columns[metric] = column
+            tracker.add_measurements(dates.astype('datetime64[s]'), columns)
+        tracker.store = self
+        tracker.patient_id = patient_id
+        return tracker
+
+    def date_range(self, patient_id):
+        """First and last measurement time of a patient as datetimes (None when empty)"""
+        with self._lock:
+            first, last = self._db.execute(
+                "SELECT MIN(ts), MAX(ts) FROM measurements WHERE patient_id = ?", (patient_id,)
+            ).fetchone()
+        if first is None:
+            return None, None
+        return np.datetime64(first, 's').item(), np.datetime64(last, 's').item()
+
+    def count(self, patient_id=None):
+        """Number of stored readings (for one patient or overall)"""
+        with self._lock:
+            if patient_id is None:
+                return self._db.execute("SELECT COUNT(*) FROM measurements").fetchone()[0]
+            return self._db.execute(
+                "SELECT COUNT(*) FROM measurements WHERE patient_id = ?", (patient_id,)
+            ).fetchone()[0]
+
+    def patients(self):
+        """IDs of all patients with stored measurements"""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT patient_id FROM measurements ORDER BY patient_id")]
+
+    def delete(self, patient_id):
+        """Remove every reading of a patient"""
+        with self._lock:
+            with self._db:
+                self._db.execute("DELETE FROM measurements WHERE patient_id = ?", (patient_id,))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_measurement_store():
+    """Process-wide measurement store at ``MEASUREMENT_DB_PATH`` (default data/measurements.sqlite)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MeasurementStore(os.environ.get("MEASUREMENT_DB_PATH", DEFAULT_STORE_PATH))
+    return _store
+
+
+def set_measurement_store(store):
+    """Replace the process-wide store (None restores the environment default)"""
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+from Utils.RateLimiter import QueueWait, track_queue_wait
+
+
+def _timeout_result(name, timeout):
+    return {"error": f"{name} timed out after {timeout}s", "confidence_score": 0.0}
+
+
+class AsyncOrchestrator:
+    """Fan agent calls out on one event loop with a shared concurrency limit
+
+    Every call made through the orchestrator waits for a slot on a semaphore of
+    ``max_concurrency`` in-flight requests and is cancelled after ``timeout``
+    seconds, so hundreds of consultations can share a worker without one OS
+    thread per request. Time the call spends queued in the RequestScheduler
+    (or backing off after a 429) does not count against ``timeout``: only
+    slow model calls time out, not calls held back by the rate limits.
+    """
+
+    def __init__(self, max_concurrency=16, timeout=60.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._semaphore = None
+        self._loop = None
+
+    @property
+    def semaphore(self):
+        """Concurrency limit bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def call(self, name, make_coro, timeout=None):
+        """Await ``make_coro()`` under the concurrency limit and timeout
+
+        A timed-out call yields an ``{"error": ...}`` dict, matching the shape
+        agents already return when the model call fails.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        async with self.semaphore:
+            queue_wait = QueueWait()
+            with track_queue_wait(queue_wait):
+                task = asyncio.ensure_future(make_coro())
+            started = time.monotonic()
+            try:
+                while True:
+                    remaining = timeout - (time.monotonic() - started - queue_wait.seconds())
+                    if remaining <= 0:
+                        break
+                    done, _ = await asyncio.wait({task}, timeout=remaining)
+                    if done:
+                        return task.result()
+            finally:
+                if not task.done():
+                    task.cancel()
+                    await asyncio.wait({task})
+            return _timeout_result(name, timeout)
+
+    async def run_agents(self, agents, on_result=None):
+        """Run ``{name: agent}`` concurrently via ``agent.arun()``
+
+        ``on_result(name, result)`` is called as each agent finishes.
+        """
+        async def run_one(name, agent):
+            result = await self.call(name, agent.arun)
+            if on_result is not None:
+                on_result(name, result)
+            return name, result
+
+        results = await asyncio.gather(*(run_one(name, agent) for name, agent in agents.items()))
+        return dict(results)
+
+    def run(self, agents, on_result=None):
+        """Blocking entry point for scripts: run_agents on a fresh event loop"""
+        return asyncio.run(self.run_agents(agents, on_result=on_result))
+
+
+def succeeded(result):
+    """True for a usable agent result (text or a dict without an error)"""
+    return result is not None and not (isinstance(result, dict) and "error" in result)
+
+
+def _task_succeeded(task):
+    return task.done() and not task.cancelled() and task.exception() is None and succeeded(task.result())
+
+
+class ConsultationScheduler:
+    """Run specialist fan-outs and team syntheses as dependent tasks
+
+    Each patient's synthesis is a task that depends on its specialists. It
+    starts as soon as ``quorum`` specialists have answered successfully, or
+    ``quorum_timeout`` seconds after the fan-out began, whichever comes first;
+    stragglers are cancelled so they stop holding concurrency slots. Many
+    patients run at once over one AsyncOrchestrator, so the synthesis for one
+    patient overlaps the specialists of the next.
+    """
+
+    def __init__(self, orchestrator=None, quorum=None, quorum_timeout=None, max_patients=8):
+        self.orchestrator = orchestrator or AsyncOrchestrator()
+        self.quorum = quorum
+        self.quorum_timeout = quorum_timeout
+        self.max_patients = max_patients
+
+    async def gather_reports(self, specialists):
+        """Specialist results available once the quorum or deadline is reached"""
+        loop = asyncio.get_running_loop()
+        tasks = {
+            name: asyncio.create_task(self.orchestrator.call(name, agent.arun))
+            for name, agent in specialists.items()
+        }
+        needed = len(tasks) if self.quorum is None else min(self.quorum, len(tasks))
+        deadline = None if self.quorum_timeout is None else loop.time() + self.quorum_timeout
+
+        pending = set(tasks.values())
+        answered = 0
+        while pending and answered < needed:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            answered += sum(1 for task in done if _task_succeeded(task))
+
+        for task in pending:
+            task.cancel()
+        return {name: task.result() for name, task in tasks.items() if _task_succeeded(task)}
+
+    async def consult(self, specialists, make_team):
+        """Return (reports, synthesis) for one patient
+
+        ``make_team(reports)`` builds the synthesizing agent from whichever
+        specialist reports made the quorum.
+        """
+        reports = await self.gather_reports(specialists)
+        if not reports:
+            return reports, {"error": "No specialist report available", "confidence_score": 0.0}
+        team = make_team(reports)
+        return reports, await self.orchestrator.call(type(team).__name__, team.arun)
+
+    async def run(self, patients, build, on_result=None):
+        """Consult every patient, interleaving up to ``max_patients`` at a time
+
+        ``patients`` is an iterable of (patient_id, payload) and
+        ``build(patient_id, payload)`` returns the (specialists, make_team)
+        pair for that patient. Returns ``{patient_id: (reports, synthesis)}``.
+        """
+        patients = iter(patients)
+        results = {}
+
+        async def worker():
+            for patient_id, payload in patients:
+                specialists, make_team = build(patient_id, payload)
+                results[patient_id] = await self.consult(specialists, make_team)
+                if on_result is not None:
+                    on_result(patient_id, results[patient_id])
+
+        await asyncio.gather(*(worker() for _ in range(self.max_patients)))
+        return results
@@ -0,0 +1,160 @@
+import os
+import string
+import threading
+
+from Utils.LLMClients import prompt_template
+
+# Templates shipped with the agent modules: name -> {version: text}
+BUILTIN_PROMPTS = {}
+
+BUILTIN_VERSION = "1"
+
+_formatter = string.Formatter()
+
+
+class PromptError(ValueError):
+    """A template that does not parse or does not take the inputs its agent passes"""
+
+
+def template_variables(template):
+    """Placeholder names of an f-string style template (``{{``/``}}`` are literal braces)"""
+    try:
+        return frozenset(field for _, field, _, _ in _formatter.parse(template) if field is not None)
+    except ValueError as e:
+        raise PromptError(f"Malformed template: {e}") from None
+
+
+def _version_key(version):
+    # Numeric parts compare as numbers so that "10" sorts after "9"
+    return tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in version.split("."))
+
+
+def register_prompt(name, template, version=BUILTIN_VERSION):
+    """Ship ``template`` as ``version`` of prompt ``name``; returns ``name``"""
+    template_variables(template)
+    BUILTIN_PROMPTS.setdefault(name, {})[version] = template
+    return name
+
+
+class PromptRegistry:
+    """Versioned prompt templates, each parsed once and shared by every agent
+
+    Templates come from register_prompt (the agent modules' built-ins) and
+    from ``<name>@<version>.txt`` files in ``directory``. The highest version
+    of a prompt is used unless ``pins`` maps its name to another version, so
+    a new wording can be dropped in as a file and rolled back by pinning.
+    Every version must take the same inputs as the built-in one.
+    """
+
+    def __init__(self, directory=None, pins=None):
+        self.directory = directory
+        self.pins = dict(pins or {})
+        self._files = self._load(directory) if directory else {}
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load(directory):
+        files = {}
+        for filename in sorted(os.listdir(directory)):
+            stem, extension = os.path.splitext(filename)
+            if extension != ".txt" or "@" not in stem:
+                continue
+            name, version = stem.rsplit("@", 1)
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                template = f.read()
+            try:
+                template_variables(template)
+            except PromptError as e:
+                raise PromptError(f"{filename}: {e}") from None
+            files.setdefault(name, {})[version] = template
+        return files
+
+    def versions(self, name):
+        """All versions of ``name``, oldest first"""
+        return sorted({**BUILTIN_PROMPTS.get(name, {}), **self._files.get(name, {})}, key=_version_key)
+
+    def active_version(self, name):
+        versions = self.versions(name)
+        if not versions:
+            raise KeyError(f"Unknown prompt: {name}")
+        version = self.pins.get(name, versions[-1])
+        if version not in versions:
+            raise KeyError(f"Prompt {name} has no version {version} (available: {', '.join(versions)})")
+        return version
+
+    def template(self, name, version=None):
+        """Raw text of ``version`` (default: the active version) of ``name``"""
+        version = version or self.active_version(name)
+        template = self._files.get(name, {}).get(version)
+        if template is None:
+            template = BUILTIN_PROMPTS.get(name, {}).get(version)
+        if template is None:
+            raise KeyError(f"Prompt {name} has no version {version}")
+        return template
+
+    def get(self, name, version=None):
+        """Parsed PromptTemplate for ``name``, built on first use and then shared"""
+        key = (name, version or self.active_version(name))
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            with self._lock:
+                compiled = self._compiled.get(key)
+                if compiled is None:
+                    compiled = self._compiled[key] = self._compile(*key)
+        return compiled
+
+    def _compile(self, name, version):
+        template = self.template(name, version)
+        builtin = BUILTIN_PROMPTS.get(name, {}).get(BUILTIN_VERSION)
+        if builtin is not None and template_variables(template) != template_variables(builtin):
+            expected = ", ".join(sorted(template_variables(builtin))) or "none"
+            found = ", ".join(sorted(template_variables(template))) or "none"
+            raise PromptError(f"Prompt {name}@{version} takes {found}; its agent passes {expected}")
+        return prompt_template(template)
+
+    def clear(self):
+        """Drop the parsed templates (e.g. after editing BUILTIN_PROMPTS)"""
+        with self._lock:
+            self._compiled.clear()
+
+
+def _parse_pins(text):
+    pins = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, version = item.partition("=")
+        pins[name.strip()] = version.strip()
+    return pins
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry():
+    """Process-wide registry configured from the environment
+
+    ``LLM_PROMPTS_DIR`` adds template files; ``LLM_PROMPT_VERSIONS`` pins
+    versions, e.g. ``EnhancedAgents.Cardiologist=1,CardioAgents.ECGAnalysis=2``.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PromptRegistry(
+                    directory=os.environ.get("LLM_PROMPTS_DIR") or None,
+                    pins=_parse_pins(os.environ.get("LLM_PROMPT_VERSIONS", ""))
+                )
+    return _registry
+
+
+def set_prompt_registry(registry):
+    """Replace the process-wide registry (None restores the environment default)"""
+    global _registry
+    with _registry_lock:
+        _registry = registry
+
+
+def get_prompt(name, version=None):
+    """Shared parsed template for prompt ``name``"""
+    return get_prompt_registry().get(name, version)
@@ -0,0 +1,293 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+# Priority classes, lower runs first
+URGENT = 0
+HIGH = 1
+NORMAL = 2
+LOW = 3
+
+
+class QueueWait:
+    """Running total of the time calls spent queued in a RequestScheduler"""
+
+    def __init__(self):
+        self.total = 0.0
+        self.since = None
+
+    def start(self):
+        self.since = time.monotonic()
+
+    def stop(self):
+        if self.since is not None:
+            self.total += time.monotonic() - self.since
+            self.since = None
+
+    def seconds(self):
+        """Queued time so far, including a wait still in progress"""
+        return self.total + (time.monotonic() - self.since if self.since is not None else 0.0)
+
+
+# QueueWait charged by the scheduler calls made inside a track_queue_wait block
+_queue_wait = contextvars.ContextVar("llm_queue_wait", default=None)
+
+
+@contextlib.contextmanager
+def track_queue_wait(queue_wait):
+    """Add the admission waits and rate-limit backoffs of scheduler calls inside the block to ``queue_wait``
+
+    Tasks created inside the block inherit it, as they copy the context.
+    """
+    token = _queue_wait.set(queue_wait)
+    try:
+        yield queue_wait
+    finally:
+        _queue_wait.reset(token)
+
+
+@contextlib.contextmanager
+def _waiting():
+    """Charge the time spent in the block to the tracked QueueWait, if any"""
+    queue_wait = _queue_wait.get()
+    if queue_wait is None:
+        yield
+        return
+    queue_wait.start()
+    try:
+        yield
+    finally:
+        queue_wait.stop()
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` per second"""
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until ``amount`` tokens are available (0 if they are now)"""
+        # A request larger than the bucket only needs a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+
+def estimate_tokens(prompt, completion_tokens=1024):
+    """Rough token count for a request: ~4 characters per prompt token plus the reply budget"""
+    return len(prompt) // 4 + completion_tokens
+
+
+def estimate_text_tokens(text):
+    """Rough token count of a prompt or reply already sent (~4 characters per token)"""
+    return len(text) // 4
+
+
+def is_rate_limit_error(error):
+    """True for provider 429 / rate-limit errors"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text or "rate_limit" in text
+
+
+class RequestScheduler:
+    """Admit model calls within requests-per-minute and tokens-per-minute budgets
+
+    Callers queue by priority class (URGENT before HIGH before NORMAL before
+    LOW, FIFO within a class); the head of the queue is admitted once both
+    buckets can cover it. Admission reserves the prompt plus
+    ``completion_tokens`` for the reply; ``settle`` gives back whatever the
+    call did not actually use, so the token budget tracks real usage rather
+    than the worst case. Rate-limit errors from the provider are retried with
+    exponential backoff plus full jitter so that many workers do not retry in
+    lockstep. Works from threads and from any number of event loops.
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=12000, max_retries=4,
+                 base_delay=1.0, max_delay=30.0, completion_tokens=1024):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.completion_tokens = completion_tokens
+        self.retries = 0
+        self.rate_limited = 0
+        self._queue = []
+        self._counter = itertools.count()
+        self._lock = threading.Condition()
+
+    def _try_admit(self, ticket, cost):
+        """Admit ``ticket`` if it heads the queue and the budget allows; else return the wait"""
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        if self._queue[0] is not ticket:
+            return None
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(cost))
+        if wait > 0:
+            return wait
+        heapq.heappop(self._queue)
+        self.requests.tokens -= 1
+        self.tokens.tokens -= min(cost, self.tokens.capacity)
+        self._lock.notify_all()
+        return 0.0
+
+    def _reserved(self, prompt):
+        return min(estimate_tokens(prompt, self.completion_tokens), self.tokens.capacity)
+
+    def _refund(self, amount):
+        with self._lock:
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + amount)
+            self._lock.notify_all()
+
+    def settle(self, prompt, used_tokens):
+        """Reconcile the reservation made for ``prompt`` with the tokens the call actually used
+
+        The unused part goes back into the token bucket; a call that used more
+        than was reserved leaves the bucket in debt until it refills.
+        """
+        self._refund(self._reserved(prompt) - used_tokens)
+
+    def _enqueue(self, priority):
+        ticket = [priority, next(self._counter)]
+        heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def acquire(self, priority=NORMAL, cost=1):
+        """Block the calling thread until the request is admitted"""
+        with _waiting(), self._lock:
+            ticket = self._enqueue(priority)
+            while True:
+                wait = self._try_admit(ticket, cost)
+                if wait == 0.0:
+                    return
+                self._lock.wait(timeout=wait)
+
+    async def aacquire(self, priority=NORMAL, cost=1):
+        """Wait on the event loop until the request is admitted"""
+        with self._lock:
+            ticket = self._enqueue(priority)
+        try:
+            with _waiting():
+                while True:
+                    with self._lock:
+                        wait = self._try_admit(ticket, cost)
+                    if wait == 0.0:
+                        return
+                    # Not at the head of the queue: poll again shortly
+                    await asyncio.sleep(wait if wait is not None else 0.05)
+        except asyncio.CancelledError:
+            with self._lock:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._lock.notify_all()
+            raise
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff delay for retry ``attempt`` (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _should_retry(self, error, attempt):
+        if not is_rate_limit_error(error) or attempt >= self.max_retries:
+            return False
+        with self._lock:
+            self.rate_limited += 1
+            self.retries += 1
+            # The provider says we are over budget: drain the request bucket
+            # so queued callers wait for a refill instead of piling on
+            self.requests.tokens = min(self.requests.tokens, 0.0)
+        return True
+
+    def call(self, fn, prompt="", priority=NORMAL):
+        """Run ``fn()`` once admitted, retrying rate-limit errors with jittered backoff
+
+        Call ``settle(prompt, used_tokens)`` once the reply's usage is known.
+        """
+        cost = estimate_tokens(prompt, self.completion_tokens)
+        attempt = 0
+        while True:
+            self.acquire(priority, cost)
+            try:
+                return fn()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                # A rejected request consumed none of its reservation
+                self._refund(min(cost, self.tokens.capacity))
+                with _waiting():
+                    time.sleep(self.backoff(attempt))
+                attempt += 1
+
+    async def acall(self, make_coro, prompt="", priority=NORMAL):
+        """Async counterpart of call; ``make_coro()`` creates a fresh awaitable per attempt"""
+        cost = estimate_tokens(prompt, self.completion_tokens)
+        attempt = 0
+        while True:
+            await self.aacquire(priority, cost)
+            try:
+                return await make_coro()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                self._refund(min(cost, self.tokens.capacity))
+                with _waiting():
+                    await asyncio.sleep(self.backoff(attempt))
+                attempt += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": len(self._queue),
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "request_tokens": self.requests.tokens,
+                "token_budget": self.tokens.tokens
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler():
+    """Process-wide scheduler sized from ``LLM_REQUESTS_PER_MINUTE`` / ``LLM_TOKENS_PER_MINUTE``
+
+    ``LLM_COMPLETION_TOKENS`` sets the reply budget reserved per call until
+    its real usage is known.
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler(
+                    requests_per_minute=float(os.environ.get("LLM_REQUESTS_PER_MINUTE", 30)),
+                    tokens_per_minute=float(os.environ.get("LLM_TOKENS_PER_MINUTE", 12000)),
+                    completion_tokens=int(os.environ.get("LLM_COMPLETION_TOKENS", 1024))
+                )
+    return _scheduler
+
+
+def set_request_scheduler(scheduler):
+    """Replace the process-wide scheduler (None restores the environment default)"""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import os
+
+from Utils import Agents, EnhancedAgents
+from Utils.Orchestrator import AsyncOrchestrator, ConsultationScheduler, succeeded
+
+PIPELINES = ("basic", "enhanced")
+
+
+def iter_reports(directory):
+    """Yield (patient_id, path) for every ``.txt`` report in ``directory``, in name order"""
+    with os.scandir(directory) as entries:
+        names = sorted(entry.name for entry in entries if entry.is_file() and entry.name.endswith(".txt"))
+    for name in names:
+        yield os.path.splitext(name)[0], os.path.join(directory, name)
+
+
+def _write_atomic(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class Checkpoint:
+    """Append-only log of finished and failed reports so an interrupted run can resume
+
+    A report counts as done when its content digest matches the logged one and
+    its result file still exists; edited reports are therefore re-diagnosed.
+    Failed reports are logged with their error in ``failed`` and retried on
+    the next run; the latest entry for a patient wins.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        self.failed = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Partial line left by a crash mid-write
+                        continue
+                    self._apply(record)
+
+    def _apply(self, record):
+        patient_id = record["patient_id"]
+        if record.get("status", "done") == "done":
+            self.done[patient_id] = record["digest"]
+            self.failed.pop(patient_id, None)
+        else:
+            self.failed[patient_id] = record.get("error")
+            self.done.pop(patient_id, None)
+
+    def is_done(self, patient_id, digest, output_path):
+        return self.done.get(patient_id) == digest and os.path.exists(output_path)
+
+    def record(self, patient_id, digest, status="done", error=None):
+        record = {"patient_id": patient_id, "digest": digest}
+        if status != "done":
+            record.update(status=status, error=error)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self._apply(record)
+
+
+class ReportPipeline:
+    """Diagnose a directory of medical reports, one result file per patient
+
+    ``pipeline="basic"`` runs the Cardiologist/Psychologist/Pulmonologist →
+    MultidisciplinaryTeam chain from Utils.Agents and writes text results in
+    the format of Results/final_diagnosis.txt; ``"enhanced"`` uses the
+    EnhancedAgents equivalents and writes JSON. At most ``max_patients``
+    reports are in progress at once and all model calls share one
+    AsyncOrchestrator limit of ``max_concurrency``. With ``quorum`` and/or
+    ``quorum_timeout`` the team synthesis starts before every specialist has
+    answered (see ConsultationScheduler).
+    """
+
+    def __init__(self, output_dir="Results", pipeline="basic", model_name="llama-3.3-70b-versatile",
+                 max_patients=4, max_concurrency=12, timeout=120.0, quorum=None, quorum_timeout=None):
+        if pipeline not in PIPELINES:
+            raise ValueError(f"Unknown pipeline '{pipeline}', expected one of {PIPELINES}")
+        self.output_dir = output_dir
+        self.pipeline = pipeline
+        self.model_name = model_name
+        self.max_patients = max_patients
+        self.scheduler = ConsultationScheduler(
+            AsyncOrchestrator(max_concurrency=max_concurrency, timeout=timeout),
+            quorum=quorum,
+            quorum_timeout=quorum_timeout,
+            max_patients=max_patients
+        )
+        os.makedirs(output_dir, exist_ok=True)
+        self.checkpoint = Checkpoint(os.path.join(output_dir, ".checkpoint.jsonl"))
+
+    def output_path(self, patient_id):
+        extension = ".txt" if self.pipeline == "basic" else ".json"
+        return os.path.join(self.output_dir, patient_id + extension)
+
+    def build_basic(self, report):
+        """Specialists and team factory for the Utils.Agents chain"""
+        specialists = {
+            "cardiologist_report": Agents.Cardiologist(report, model_name=self.model_name),
+            "psychologist_report": Agents.Psychologist(report, model_name=self.model_name),
+            "pulmonologist_report": Agents.Pulmonologist(report, model_name=self.model_name)
+        }
+
+        def make_team(reports):
+            return Agents.MultidisciplinaryTeam(
+                reports.get("cardiologist_report", "Not available"),
+                reports.get("psychologist_report", "Not available"),
+                reports.get("pulmonologist_report", "Not available"),
+                model_name=self.model_name
+            )
+
+        return specialists, make_team
+
+    def build_enhanced(self, report):
+        """Specialists and team factory for the EnhancedAgents chain"""
+        specialists = {
+            name: cls(report, model_name=self.model_name)
+            for name, cls in [
+                ("Cardiologist", EnhancedAgents.Cardiologist),
+                ("Psychologist", EnhancedAgents.Psychologist),
+                ("Pulmonologist", EnhancedAgents.Pulmonologist)
+            ]
+        }
+        return specialists, lambda reports: EnhancedAgents.MultidisciplinaryTeam(reports, model_name=self.model_name)
+
+    async def diagnose(self, report):
+        """Result file contents for one report, or None if the synthesis failed"""
+        build = self.build_basic if self.pipeline == "basic" else self.build_enhanced
+        reports, synthesis = await self.scheduler.consult(*build(report))
+        if not succeeded(synthesis):
+            return None
+        if self.pipeline == "basic":
+            return "### Final Diagnosis:\n\n" + synthesis
+        return json.dumps({"specialist_reports": reports, "final_diagnosis": synthesis}, indent=2)
+
+    async def process(self, patient_id, path):
+        """Diagnose one report unless the checkpoint says it is already done
+
+        Any error reading, diagnosing or writing the report is logged to the
+        checkpoint as a failure instead of aborting the rest of the batch.
+        """
+        digest = None
+        try:
+            with open(path, encoding="utf-8") as f:
+                report = f.read()
+            digest = hashlib.sha256(report.encode("utf-8")).hexdigest()
+            output_path = self.output_path(patient_id)
+            if self.checkpoint.is_done(patient_id, digest, output_path):
+                return "skipped"
+
+            result = await self.diagnose(report)
+            if result is None:
+                self.checkpoint.record(patient_id, digest, "failed", "Team synthesis failed")
+                return "failed"
+
+            _write_atomic(output_path, result)
+        except Exception as e:
+            self.checkpoint.record(patient_id, digest, "failed", f"{type(e).__name__}: {e}")
+            return "failed"
+        self.checkpoint.record(patient_id, digest)
+        return "done"
+
+    async def arun(self, input_dir, on_result=None):
+        """Process every report in ``input_dir``; returns counts per status
+
+        ``on_result(patient_id, status)`` is called as each report finishes.
+        """
+        reports = iter_reports(input_dir)
+        summary = {"done": 0, "skipped": 0, "failed": 0}
+
+        async def worker():
+            # The shared generator is advanced without awaiting, so workers
+            # never receive the same report twice
+            for patient_id, path in reports:
+                status = await self.process(patient_id, path)
+                summary[status] += 1
+                if on_result is not None:
+                    on_result(patient_id, status)
+
+        await asyncio.gather(*(worker() for _ in range(self.max_patients)))
+        return summary
+
+    def run(self, input_dir, on_result=None):
+        """Blocking entry point for scripts"""
+        return asyncio.run(self.arun(input_dir, on_result=on_result))
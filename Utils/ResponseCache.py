@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "llm_responses.sqlite")
+
+
+class ResponseCache:
+    """Two-tier cache of LLM responses keyed by a hash of the request
+
+    The memory tier is an LRU of ``max_entries`` responses. The optional SQLite
+    tier at ``path`` survives restarts (and Streamlit reruns across workers) and
+    is pruned to ``max_disk_entries`` by last access. Entries older than
+    ``ttl`` seconds are treated as misses in both tiers.
+    """
+
+    def __init__(self, max_entries=512, ttl=7 * 24 * 3600, path=None, max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._disk_entries = 0
+        if path:
+            self._open_disk(path)
+
+    @staticmethod
+    def make_key(role, model_name, temperature, prompt):
+        """Content hash identifying one rendered request"""
+        payload = json.dumps([role, model_name, temperature, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _open_disk(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+        self._disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key):
+        """Cached response text for ``key``, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._expired(created, now):
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, value, created)
+                        self.hits += 1
+                        self.disk_hits += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._disk_entries -= 1
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """Store a response in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                exists = self._db.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                if exists is None:
+                    self._disk_entries += 1
+                self._prune_disk(now)
+                self._db.commit()
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _prune_disk(self, now):
+        if self.ttl is not None:
+            cursor = self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            self._disk_entries -= max(cursor.rowcount, 0)
+        excess = self._disk_entries - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed LIMIT ?)", (excess,)
+            )
+            self._disk_entries -= excess
+            self.evictions += excess
+
+    def stats(self):
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_entries
+            }
+
+    def clear(self):
+        """Empty both tiers and reset the counters"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+            self._disk_entries = 0
+            self.hits = self.misses = self.disk_hits = self.evictions = 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide response cache configured from the environment
+
+    ``LLM_CACHE_PATH`` sets the SQLite file (an empty value keeps the cache in
+    memory only), ``LLM_CACHE_TTL`` the entry lifetime in seconds and
+    ``LLM_CACHE_SIZE`` the number of in-memory entries.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_entries=int(os.environ.get("LLM_CACHE_SIZE", 512)),
+                    ttl=float(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600)),
+                    path=os.environ.get("LLM_CACHE_PATH", DEFAULT_CACHE_PATH) or None
+                )
+    return _cache
+
+
+def set_response_cache(cache):
+    """Replace the process-wide cache (None restores the environment default)"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
@@ -0,0 +1,455 @@
+import json
+import os
+import re
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+from Utils.LLMClients import (
+    ainvoke_model, astream_model, invoke_model, json_mode, remember_response, stream_model
+)
+from Utils.RateLimiter import NORMAL
+from Utils.Telemetry import call_context, get_telemetry
+
+# Times a reply that fails to parse or validate is sent back to the model,
+# with the error, before the caller gets a ResponseParseError
+MAX_REASKS = int(os.environ.get("LLM_MAX_REASKS", 1))
+
+# Characters that can change nesting: braces, string quotes and escapes
+_STRUCTURAL = re.compile(r'[{}"\\]')
+# First number in a free-text value such as "72 bpm"
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_DECODER = json.JSONDecoder()
+
+
+class ResponseParseError(ValueError):
+    """A model reply without a usable JSON object; ``response`` holds the reply"""
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+def extract_json(text):
+    """First balanced JSON object in ``text`` that parses
+
+    Prose, code fences and anything after the object are ignored. The scan
+    jumps between structural characters and never revisits input: a
+    balanced candidate that fails to parse is skipped, not re-scanned.
+    """
+    stripped = text.strip()
+    if stripped.startswith("{") and stripped.endswith("}"):
+        try:
+            value = json.loads(stripped)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+
+    depth = 0
+    start = None
+    in_string = False
+    escaped_at = -1
+    for match in _STRUCTURAL.finditer(text):
+        char, position = match.group(), match.start()
+        if depth == 0:
+            if char == "{":
+                depth, start = 1, position
+            continue
+        if in_string:
+            if position == escaped_at:
+                continue
+            if char == "\\":
+                escaped_at = position + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                try:
+                    value = json.loads(text[start:position + 1])
+                    if isinstance(value, dict):
+                        return value
+                except ValueError:
+                    pass
+    raise ResponseParseError("No JSON object found in the response", text)
+
+
+class IncrementalJSONParser:
+    """Top-level fields of a streamed JSON object, emitted as each one completes
+
+    ``feed`` scans only the newly arrived text, tracking nesting and string
+    state across chunks; whenever a field of the outer object closes (at a
+    depth-1 comma or the final brace) its key and decoded value are
+    returned. Text before the object (prose, a code fence) is skipped.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+        self.done = False
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._field_start = None
+
+    def _close_field(self, end):
+        segment = self.text[self._field_start:end].strip()
+        self._field_start = end + 1
+        if not segment:
+            return None
+        try:
+            key, offset = _DECODER.raw_decode(segment)
+            rest = segment[offset:].lstrip()
+            if not isinstance(key, str) or not rest.startswith(":"):
+                return None
+            value = json.loads(rest[1:])
+        except ValueError:
+            return None
+        self.fields[key] = value
+        return key, value
+
+    def feed(self, chunk):
+        """Add streamed text; returns the ``(key, value)`` fields it completed"""
+        self.text += chunk
+        completed = []
+        text = self.text
+        for position in range(self._position, len(text)):
+            if self.done:
+                break
+            char = text[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._field_start = position + 1
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.done = True
+                    field = self._close_field(position)
+                    if field:
+                        completed.append(field)
+            elif char == "," and self._depth == 1:
+                field = self._close_field(position)
+                if field:
+                    completed.append(field)
+        self._position = len(text)
+        return completed
+
+
+class AgentResponse(BaseModel):
+    """Fields shared by every agent reply; keys outside the schema are kept"""
+
+    model_config = ConfigDict(extra="allow")
+
+    confidence_score: float = Field(0.0, ge=0, le=1)
+
+    @field_validator("confidence_score", mode="before")
+    @classmethod
+    def _fraction(cls, value):
+        # Models sometimes answer "85%" or 85 for 0.85
+        if isinstance(value, str):
+            value = value.strip().rstrip("%")
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return value
+        return value / 100 if 1 < value <= 100 else value
+
+
+class RiskAssessmentResponse(AgentResponse):
+    overall_risk: str
+    key_risk_factors: list = []
+    protective_factors: list = []
+    immediate_concerns: list = []
+    recommendations: list = []
+
+
+class ECGResponse(AgentResponse):
+    rhythm: str
+    heart_rate: float | None = None
+    intervals: dict = {}
+    abnormalities: list = []
+    severity: str
+    clinical_significance: str = ""
+    urgent_findings: list = []
+    recommendations: list = []
+
+    @field_validator("heart_rate", mode="before")
+    @classmethod
+    def _rate(cls, value):
+        # Models sometimes answer "72 bpm" or "unknown"; the waveform needs a number or None
+        if isinstance(value, bool) or value is None:
+            return None
+        if isinstance(value, str):
+            match = _NUMBER.search(value)
+            return float(match.group()) if match else None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+
+class LipidPanelResponse(AgentResponse):
+    total_cholesterol: dict = {}
+    ldl_cholesterol: dict = {}
+    hdl_cholesterol: dict = {}
+    triglycerides: dict = {}
+    risk_assessment: str
+    recommendations: list = []
+    treatment_needed: bool = False
+
+
+class CardiacBiomarkerResponse(AgentResponse):
+    troponin: dict = {}
+    bnp_or_nt_probnp: dict = {}
+    crp: dict = {}
+    acute_event_risk: str
+    urgent_action_needed: bool = False
+    recommendations: list = []
+
+
+class ChestPainResponse(AgentResponse):
+    pain_characteristics: dict = {}
+    acs_probability: str
+    differential_diagnoses: list = []
+    urgency_level: str
+    immediate_actions: list = []
+    recommended_tests: list = []
+
+
+class TreatmentPlanResponse(AgentResponse):
+    lifestyle_modifications: dict = {}
+    medications: dict = {}
+    monitoring: dict = {}
+    goals: dict = {}
+    priority_actions: list
+
+
+class SpecialistResponse(AgentResponse):
+    findings: list
+    possible_conditions: list = []
+    severity: str
+    immediate_concerns: list = []
+
+
+class DrugInteractionResponse(AgentResponse):
+    interactions: list
+    warnings: list = []
+    safe_combinations: list = []
+    monitoring_required: list = []
+
+
+class LabResultResponse(AgentResponse):
+    abnormal_values: list
+    patterns: list = []
+    possible_conditions: list = []
+    follow_up_tests: list = []
+    urgency: str
+
+
+class MultidisciplinaryResponse(AgentResponse):
+    primary_diagnosis: str
+    differential_diagnoses: list = []
+    consensus_findings: list = []
+    conflicting_opinions: list = []
+    integrated_treatment_plan: list = []
+    priority_actions: list = []
+    follow_up_plan: list = []
+    overall_severity: str
+
+
+def _describe(error):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in issue['loc']) or 'response'}: {issue['msg']}"
+        for issue in error.errors()
+    )
+
+
+def parse_response(text, schema=None):
+    """JSON object in a model reply, validated against ``schema`` when given
+
+    Schema defaults fill in optional fields the model left out. Raises
+    ResponseParseError when there is no object or it does not validate.
+    """
+    data = extract_json(text or "")
+    if schema is None:
+        return data
+    try:
+        return schema.model_validate(data).model_dump()
+    except ValidationError as e:
+        raise ResponseParseError(_describe(e), text) from e
+
+
+def reask_prompt(prompt, response, error):
+    """Original prompt plus the rejected reply and why it was rejected"""
+    return (
+        f"{prompt}\n\n"
+        f"Your previous reply could not be used ({error}):\n{response}\n\n"
+        "Reply again with only the corrected JSON object in the requested format, "
+        "without prose or code fences."
+    )
+
+
+def _accepts(schema):
+    def accept(text):
+        try:
+            parse_response(text, schema)
+            return True
+        except ResponseParseError:
+            return False
+    return accept
+
+
+def _schema_name(schema):
+    return schema.__name__ if schema is not None else ""
+
+
+def _record_parse(role, schema, reasks, failed=False):
+    outcome = "failed" if failed else "reasked" if reasks else "ok"
+    get_telemetry().record_parse(role, _schema_name(schema), outcome, reasks)
+
+
+def _parse_with_reasks(send, prompt, text, schema, role, max_reasks):
+    """``(parsed, reasks)`` for reply ``text``, re-asking via ``send(request)`` while it fails to validate"""
+    for attempt in range(max_reasks + 1):
+        try:
+            parsed = parse_response(text, schema)
+        except ResponseParseError as e:
+            if attempt == max_reasks:
+                _record_parse(role, schema, attempt, failed=True)
+                raise
+            text = send(reask_prompt(prompt, text, e))
+            continue
+        _record_parse(role, schema, attempt)
+        return parsed, attempt
+
+
+async def _aparse_with_reasks(send, prompt, text, schema, role, max_reasks):
+    """Async counterpart of _parse_with_reasks; ``send`` is a coroutine function"""
+    for attempt in range(max_reasks + 1):
+        try:
+            parsed = parse_response(text, schema)
+        except ResponseParseError as e:
+            if attempt == max_reasks:
+                _record_parse(role, schema, attempt, failed=True)
+                raise
+            text = await send(reask_prompt(prompt, text, e))
+            continue
+        _record_parse(role, schema, attempt)
+        return parsed, attempt
+
+
+def invoke_structured(model, prompt, schema=None, role=None, priority=NORMAL, max_reasks=None):
+    """Ask ``model`` for a JSON object matching ``schema`` and return it as a dict
+
+    The provider is asked for JSON mode. Only replies that validate are
+    cached; a failing reply is sent back with the error, up to
+    ``max_reasks`` (default MAX_REASKS) times, before ResponseParseError.
+    A corrected reply is also cached for the original prompt, so the next
+    identical request costs no round trip at all.
+    """
+    max_reasks = MAX_REASKS if max_reasks is None else max_reasks
+    model = json_mode(model)
+    accept = _accepts(schema)
+
+    def send(request):
+        return invoke_model(model, request, role=role, priority=priority, accept=accept)
+
+    with call_context(schema=_schema_name(schema)):
+        parsed, reasks = _parse_with_reasks(send, prompt, send(prompt), schema, role, max_reasks)
+    if reasks:
+        remember_response(model, prompt, json.dumps(parsed), role)
+    return parsed
+
+
+async def ainvoke_structured(model, prompt, schema=None, role=None, priority=NORMAL, max_reasks=None):
+    """Async counterpart of invoke_structured"""
+    max_reasks = MAX_REASKS if max_reasks is None else max_reasks
+    model = json_mode(model)
+    accept = _accepts(schema)
+
+    async def send(request):
+        return await ainvoke_model(model, request, role=role, priority=priority, accept=accept)
+
+    with call_context(schema=_schema_name(schema)):
+        parsed, reasks = await _aparse_with_reasks(send, prompt, await send(prompt), schema, role, max_reasks)
+    if reasks:
+        remember_response(model, prompt, json.dumps(parsed), role)
+    return parsed
+
+
+def _notify(on_field, fields):
+    if on_field is not None:
+        for key, value in fields:
+            on_field(key, value)
+
+
+def _finish_stream(model, prompt, parser, parsed, reasks, role, on_field):
+    """Announce the fields ``on_field`` has not seen yet and return ``parsed``
+
+    After a re-ask the streamed fields were from the rejected reply, so all
+    fields are announced again and the corrected reply is cached for the
+    original prompt.
+    """
+    if reasks:
+        remember_response(model, prompt, json.dumps(parsed), role)
+        _notify(on_field, parsed.items())
+    else:
+        _notify(on_field, [(key, value) for key, value in parsed.items() if key not in parser.fields])
+    return parsed
+
+
+def stream_structured(model, prompt, schema=None, role=None, priority=NORMAL, on_field=None, max_reasks=None):
+    """Streaming invoke_structured: ``on_field(key, value)`` fires as each top-level field completes
+
+    The whole reply is validated once the stream ends. Streaming runs
+    without JSON mode (providers such as Groq do not stream in JSON mode);
+    an invalid reply is re-asked in JSON mode like invoke_structured, and
+    the corrected fields are announced when it returns.
+    """
+    max_reasks = MAX_REASKS if max_reasks is None else max_reasks
+    accept = _accepts(schema)
+    json_model = json_mode(model)
+
+    def send(request):
+        return invoke_model(json_model, request, role=role, priority=priority, accept=accept)
+
+    parser = IncrementalJSONParser()
+    with call_context(schema=_schema_name(schema)):
+        for chunk in stream_model(model, prompt, role=role, priority=priority, accept=accept):
+            _notify(on_field, parser.feed(chunk))
+        parsed, reasks = _parse_with_reasks(send, prompt, parser.text, schema, role, max_reasks)
+    return _finish_stream(model, prompt, parser, parsed, reasks, role, on_field)
+
+
+async def astream_structured(model, prompt, schema=None, role=None, priority=NORMAL, on_field=None, max_reasks=None):
+    """Async counterpart of stream_structured"""
+    max_reasks = MAX_REASKS if max_reasks is None else max_reasks
+    accept = _accepts(schema)
+    json_model = json_mode(model)
+
+    async def send(request):
+        return await ainvoke_model(json_model, request, role=role, priority=priority, accept=accept)
+
+    parser = IncrementalJSONParser()
+    with call_context(schema=_schema_name(schema)):
+        async for chunk in astream_model(model, prompt, role=role, priority=priority, accept=accept):
+            _notify(on_field, parser.feed(chunk))
+        parsed, reasks = await _aparse_with_reasks(send, prompt, parser.text, schema, role, max_reasks)
+    return _finish_stream(model, prompt, parser, parsed, reasks, role, on_field)
@@ -0,0 +1,345 @@
+import numpy as np
+
+from Utils.RiskScoring import (
+    FRAMINGHAM_DEFAULTS, FRAMINGHAM_LOOKUP, AGE_EDGES, AGE_POINTS_MALE, AGE_POINTS_FEMALE,
+    CHOLESTEROL_EDGES, CHOLESTEROL_POINTS, HDL_EDGES, HDL_POINTS, SYSTOLIC_EDGES, SYSTOLIC_POINTS,
+    _bin_codes, _column, _column_length, _equals, framingham_scores
+)
+
+# Patient fields every model may read, with the fallbacks used when absent
+RISK_MODEL_DEFAULTS = dict(FRAMINGHAM_DEFAULTS, ethnicity='Caucasian', hypertension=False)
+
+MG_DL_PER_MMOL_L = 38.67
+
+
+class RiskModel:
+    """A 10-year cardiovascular risk model that scores a whole cohort at once
+
+    Subclasses set the descriptive attributes shown in the app. Scoring is
+    split into additive factor contributions (points or terms of the linear
+    predictor): ``groups`` maps each contribution to the patient fields it
+    reads, on top of the ``strata`` fields (sex, race) every group reads.
+    ``contributions`` computes some or all groups and ``risk`` turns their sum
+    into percentages, so a what-if change to one factor only recomputes the
+    groups that read it. Data is a pandas DataFrame or a mapping of columns
+    keyed like the patient dict. ``categories`` is a list of (upper bound,
+    label, css class) bands.
+    """
+
+    key = None
+    name = None
+    description = None
+    best_for = None
+    factors = []
+    interpretation = {}
+    categories = []
+    groups = {}
+    strata = ()
+
+    def contributions(self, data, groups=None):
+        """``{group: array}`` for ``groups`` (all by default)"""
+        raise NotImplementedError
+
+    def risk(self, total, data):
+        """Risk percentages from summed contributions"""
+        raise NotImplementedError
+
+    @property
+    def fields(self):
+        """Every patient field the model reads; changing any other has no effect"""
+        return set(self.strata).union(*self.groups.values())
+
+    def predict(self, data):
+        """Risk percentage for every row as a float array"""
+        return self.risk(sum(self.contributions(data).values()), data)
+
+    def columns(self, data, *names):
+        """Columns of ``data`` as arrays, with RISK_MODEL_DEFAULTS for missing fields"""
+        n = _column_length(data)
+        return [_column(data, name, n, RISK_MODEL_DEFAULTS) for name in names]
+
+    def categorize(self, risk_percentage):
+        """Category label for every risk value"""
+        edges = [upper for upper, _, _ in self.categories[:-1]]
+        labels = np.array([label for _, label, _ in self.categories], dtype=object)
+        return labels[np.digitize(np.asarray(risk_percentage), edges)]
+
+    def category(self, risk_percentage):
+        """(label, css class) for one risk value"""
+        for upper, label, css_class in self.categories:
+            if upper is None or risk_percentage < upper:
+                return label, css_class
+
+    def assess(self, patient_data):
+        """Score one patient dict"""
+        risk = float(self.predict({k: [v] for k, v in patient_data.items()})[0])
+        return {
+            'model': self.key,
+            'risk_percentage': round(risk, 1),
+            'risk_category': self.category(risk)[0]
+        }
+
+    def info(self):
+        """Description entry for the app's model picker"""
+        return {
+            'name': self.name,
+            'description': self.description,
+            'best_for': self.best_for,
+            'factors': self.factors,
+            'interpretation': self.interpretation
+        }
+
+
+class FraminghamModel(RiskModel):
+    """The simplified Framingham points score used by RiskCalculator"""
+
+    key = 'Framingham'
+    name = 'Framingham Risk Score'
+    description = 'Predicts 10-year risk of cardiovascular disease. Developed from the Framingham Heart Study.'
+    best_for = 'General population, ages 30-74'
+    factors = ['Age', 'Gender', 'Total Cholesterol', 'HDL', 'Blood Pressure', 'Smoking', 'Diabetes']
+    interpretation = {
+        'low': '<10% - Low risk, continue healthy lifestyle',
+        'moderate': '10-20% - Moderate risk, lifestyle changes recommended',
+        'high': '20-30% - High risk, medication may be needed',
+        'very_high': '>30% - Very high risk, aggressive treatment required'
+    }
+    categories = [(10, 'Low', 'risk-low'), (20, 'Moderate', 'risk-moderate'),
+                  (30, 'High', 'risk-high'), (None, 'Very High', 'risk-critical')]
+    groups = {
+        'age': ('age', 'gender'), 'cholesterol': ('total_cholesterol',), 'hdl': ('hdl',),
+        'blood_pressure': ('systolic',), 'smoking': ('smoking',), 'diabetes': ('diabetes',)
+    }
+
+    def contributions(self, data, groups=None):
+        """Points per factor, read from the same bin tables as the lookup engine"""
+        result = {}
+        for group in groups or self.groups:
+            if group == 'age':
+                age, gender = self.columns(data, 'age', 'gender')
+                codes = _bin_codes(age, AGE_EDGES, 0)
+                result[group] = np.where(_equals(gender, 'Male'), AGE_POINTS_MALE[codes], AGE_POINTS_FEMALE[codes])
+            elif group == 'cholesterol':
+                result[group] = CHOLESTEROL_POINTS[_bin_codes(*self.columns(data, 'total_cholesterol'), CHOLESTEROL_EDGES, 0)]
+            elif group == 'hdl':
+                result[group] = HDL_POINTS[_bin_codes(*self.columns(data, 'hdl'), HDL_EDGES, 2)]
+            elif group == 'blood_pressure':
+                result[group] = SYSTOLIC_POINTS[_bin_codes(*self.columns(data, 'systolic'), SYSTOLIC_EDGES, 0)]
+            elif group == 'smoking':
+                result[group] = 2 * _equals(*self.columns(data, 'smoking'), 'Current')
+            elif group == 'diabetes':
+                result[group] = 2 * self.columns(data, 'diabetes')[0].astype(bool)
+        return result
+
+    def risk(self, total, data):
+        return np.minimum(np.asarray(total) * 2, 50).astype(np.float64)
+
+    def predict(self, data):
+        # Full scoring is a single gather from the precomputed table
+        return framingham_scores(data)['risk_percentage'].astype(np.float64)
+
+    def assess(self, patient_data):
+        result = FRAMINGHAM_LOOKUP.score(patient_data)
+        return dict(result, model=self.key, risk_percentage=float(result['risk_percentage']))
+
+
+# Goff et al. 2013 ACC/AHA Pooled Cohort Equations: coefficients for
+# ln(age), ln(age)^2, ln(TC), ln(age)*ln(TC), ln(HDL), ln(age)*ln(HDL),
+# ln(treated SBP), ln(age)*ln(treated SBP), ln(untreated SBP),
+# ln(age)*ln(untreated SBP), smoker, ln(age)*smoker, diabetes;
+# then baseline 10-year survival and the mean of the linear predictor
+PCE_STRATA = [('Female', 'white'), ('Female', 'black'), ('Male', 'white'), ('Male', 'black')]
+PCE_COEFFICIENTS = {
+    ('Female', 'white'): ([-29.799, 4.884, 13.540, -3.114, -13.578, 3.149, 2.019, 0.0, 1.957, 0.0, 7.574, -1.665, 0.661],
+                          0.9665, -29.18),
+    ('Female', 'black'): ([17.114, 0.0, 0.940, 0.0, -18.920, 4.475, 29.291, -6.432, 27.820, -6.087, 0.691, 0.0, 0.874],
+                          0.9533, 86.61),
+    ('Male', 'white'): ([12.344, 0.0, 11.853, -2.664, -7.990, 1.769, 1.797, 0.0, 1.764, 0.0, 7.837, -1.795, 0.658],
+                        0.9144, 61.18),
+    ('Male', 'black'): ([2.469, 0.0, 0.302, 0.0, -0.307, 0.0, 1.916, 0.0, 1.809, 0.0, 0.549, 0.0, 0.645],
+                        0.8954, 19.54)
+}
+
+
+class PooledCohortEquations(RiskModel):
+    """ACC/AHA Pooled Cohort Equations for 10-year hard ASCVD risk
+
+    African American patients use the African American equations and everyone
+    else the white equations, as the guideline recommends. Hypertension is
+    taken to mean treated blood pressure. Inputs are clipped to the ranges the
+    equations were derived on (age 40-79, TC 130-320, HDL 20-100, SBP 90-200).
+    """
+
+    key = 'ASCVD'
+    name = 'ASCVD Risk Calculator'
+    description = 'Estimates 10-year risk of atherosclerotic cardiovascular disease. ACC/AHA guideline.'
+    best_for = 'Adults 40-79 without existing CVD'
+    factors = ['Age', 'Gender', 'Race', 'Total Cholesterol', 'HDL', 'Blood Pressure', 'Diabetes', 'Smoking', 'Treatment']
+    interpretation = {
+        'low': '<5% - Low risk, lifestyle modifications',
+        'borderline': '5-7.5% - Borderline risk, consider risk enhancers',
+        'intermediate': '7.5-20% - Intermediate risk, statin therapy recommended',
+        'high': '>20% - High risk, high-intensity statin therapy'
+    }
+    categories = [(5, 'Low', 'risk-low'), (7.5, 'Borderline', 'risk-moderate'),
+                  (20, 'Intermediate', 'risk-high'), (None, 'High', 'risk-critical')]
+
+    groups = {
+        'age': ('age',), 'cholesterol': ('age', 'total_cholesterol'), 'hdl': ('age', 'hdl'),
+        'blood_pressure': ('age', 'systolic', 'hypertension'), 'smoking': ('age', 'smoking'),
+        'diabetes': ('diabetes',)
+    }
+    strata = ('gender', 'ethnicity')
+
+    # Coefficient columns per group, rows in PCE_STRATA order
+    _coefficients = np.array([PCE_COEFFICIENTS[stratum][0] for stratum in PCE_STRATA])
+    _baseline = np.array([PCE_COEFFICIENTS[stratum][1] for stratum in PCE_STRATA])
+    _mean = np.array([PCE_COEFFICIENTS[stratum][2] for stratum in PCE_STRATA])
+
+    def stratum(self, data):
+        """Index into PCE_STRATA for every row"""
+        gender, ethnicity = self.columns(data, 'gender', 'ethnicity')
+        return np.where(_equals(gender, 'Female'), 0, 2) + _equals(ethnicity, 'African American')
+
+    def contributions(self, data, groups=None):
+        stratum = self.stratum(data)
+
+        def term(index, values):
+            return self._coefficients[:, index][stratum] * values
+
+        age, = self.columns(data, 'age')
+        ln_age = np.log(np.clip(age.astype(np.float64), 40, 79))
+        result = {}
+        for group in groups or self.groups:
+            if group == 'age':
+                result[group] = term(0, ln_age) + term(1, ln_age ** 2)
+            elif group == 'cholesterol':
+                ln_tc = np.log(np.clip(self.columns(data, 'total_cholesterol')[0].astype(np.float64), 130, 320))
+                result[group] = term(2, ln_tc) + term(3, ln_age * ln_tc)
+            elif group == 'hdl':
+                ln_hdl = np.log(np.clip(self.columns(data, 'hdl')[0].astype(np.float64), 20, 100))
+                result[group] = term(4, ln_hdl) + term(5, ln_age * ln_hdl)
+            elif group == 'blood_pressure':
+                systolic, treated = self.columns(data, 'systolic', 'hypertension')
+                ln_sbp = np.log(np.clip(systolic.astype(np.float64), 90, 200))
+                treated = treated.astype(bool)
+                result[group] = np.where(treated, term(6, ln_sbp) + term(7, ln_age * ln_sbp),
+                                         term(8, ln_sbp) + term(9, ln_age * ln_sbp))
+            elif group == 'smoking':
+                smoker = _equals(*self.columns(data, 'smoking'), 'Current').astype(np.float64)
+                result[group] = term(10, smoker) + term(11, ln_age * smoker)
+            elif group == 'diabetes':
+                result[group] = term(12, self.columns(data, 'diabetes')[0].astype(np.float64))
+        return result
+
+    def risk(self, total, data):
+        stratum = self.stratum(data)
+        risk = 1 - self._baseline[stratum] ** np.exp(total - self._mean[stratum])
+        return np.clip(risk * 100, 0, 100)
+
+
+# SCORE2 (SCORE2 working group, Eur Heart J 2021): coefficients for age,
+# smoking, SBP, total cholesterol, HDL and their interactions with age, on
+# centred variables; then baseline survival and regional recalibration scales
+SCORE2_STRATA = ['Male', 'Female']
+SCORE2_COEFFICIENTS = {
+    'Male': ([0.3742, 0.6012, 0.2777, 0.1458, -0.2698, -0.0755, -0.0255, -0.0281, 0.0426], 0.9605),
+    'Female': ([0.4648, 0.7744, 0.3131, 0.1002, -0.2606, -0.1088, -0.0277, -0.0226, 0.0613], 0.9776)
+}
+SCORE2_REGIONS = {
+    'low': {'Male': (-0.5699, 0.7476), 'Female': (-0.7380, 0.7019)},
+    'moderate': {'Male': (-0.1565, 0.8009), 'Female': (-0.3143, 0.7701)},
+    'high': {'Male': (0.3207, 0.9360), 'Female': (0.5710, 0.9369)},
+    'very_high': {'Male': (0.5836, 0.8294), 'Female': (0.9412, 0.8329)}
+}
+
+
+class Score2(RiskModel):
+    """ESC SCORE2 10-year risk of fatal and non-fatal CVD, recalibrated for a risk region"""
+
+    key = 'SCORE2'
+    name = 'SCORE2 (European)'
+    description = 'European cardiovascular risk assessment. Predicts 10-year risk of CVD death and events.'
+    best_for = 'European populations, ages 40-69'
+    factors = ['Age', 'Gender', 'Smoking', 'Systolic BP', 'Total Cholesterol', 'HDL']
+    interpretation = {
+        'low': '<5% - Low risk, healthy lifestyle',
+        'moderate': '5-10% - Moderate risk, lifestyle intervention',
+        'high': '10-15% - High risk, consider drug therapy',
+        'very_high': '>15% - Very high risk, intensive treatment'
+    }
+    categories = [(5, 'Low', 'risk-low'), (10, 'Moderate', 'risk-moderate'),
+                  (15, 'High', 'risk-high'), (None, 'Very High', 'risk-critical')]
+
+    def __init__(self, region='moderate'):
+        if region not in SCORE2_REGIONS:
+            raise ValueError(f"Unknown SCORE2 region '{region}', expected one of {list(SCORE2_REGIONS)}")
+        self.region = region
+
+    groups = {
+        'age': ('age',), 'smoking': ('age', 'smoking'), 'blood_pressure': ('age', 'systolic'),
+        'cholesterol': ('age', 'total_cholesterol'), 'hdl': ('age', 'hdl')
+    }
+    strata = ('gender',)
+
+    _coefficients = np.array([SCORE2_COEFFICIENTS[sex][0] for sex in SCORE2_STRATA])
+    _baseline = np.array([SCORE2_COEFFICIENTS[sex][1] for sex in SCORE2_STRATA])
+
+    def stratum(self, data):
+        """Index into SCORE2_STRATA for every row"""
+        return _equals(*self.columns(data, 'gender'), 'Female').astype(np.intp)
+
+    def contributions(self, data, groups=None):
+        stratum = self.stratum(data)
+
+        def term(index, values):
+            return self._coefficients[:, index][stratum] * values
+
+        c_age = (self.columns(data, 'age')[0].astype(np.float64) - 60) / 5
+        result = {}
+        for group in groups or self.groups:
+            if group == 'age':
+                result[group] = term(0, c_age)
+            elif group == 'smoking':
+                smoker = _equals(*self.columns(data, 'smoking'), 'Current').astype(np.float64)
+                result[group] = term(1, smoker) + term(5, c_age * smoker)
+            elif group == 'blood_pressure':
+                c_sbp = (self.columns(data, 'systolic')[0].astype(np.float64) - 120) / 20
+                result[group] = term(2, c_sbp) + term(6, c_age * c_sbp)
+            elif group == 'cholesterol':
+                c_tc = self.columns(data, 'total_cholesterol')[0].astype(np.float64) / MG_DL_PER_MMOL_L - 6
+                result[group] = term(3, c_tc) + term(7, c_age * c_tc)
+            elif group == 'hdl':
+                c_hdl = (self.columns(data, 'hdl')[0].astype(np.float64) / MG_DL_PER_MMOL_L - 1.3) / 0.5
+                result[group] = term(4, c_hdl) + term(8, c_age * c_hdl)
+        return result
+
+    def risk(self, total, data):
+        stratum = self.stratum(data)
+        uncalibrated = 1 - self._baseline[stratum] ** np.exp(total)
+        scales = np.array([SCORE2_REGIONS[self.region][sex] for sex in SCORE2_STRATA])[stratum]
+        risk = 1 - np.exp(-np.exp(scales[:, 0] + scales[:, 1] * np.log(-np.log(1 - uncalibrated))))
+        return np.clip(risk * 100, 0, 100)
+
+
+RISK_MODEL_REGISTRY = {model.key: model for model in (FraminghamModel(), PooledCohortEquations(), Score2())}
+
+
+def get_risk_model(key):
+    """Registered model for ``key`` ('Framingham', 'ASCVD' or 'SCORE2')"""
+    return RISK_MODEL_REGISTRY[key]
+
+
+def risk_model_info():
+    """``{key: description}`` for every registered model, for the model picker"""
+    return {key: model.info() for key, model in RISK_MODEL_REGISTRY.items()}
+
+
+def compare_models(data, keys=None):
+    """Risk percentages from several models over the same patients
+
+    Each model scores every row in one vectorized pass; returns
+    ``{key: risk array}`` in registry order.
+    """
+    keys = keys or list(RISK_MODEL_REGISTRY)
+    return {key: RISK_MODEL_REGISTRY[key].predict(data) for key in keys}
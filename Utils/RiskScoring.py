@@ -0,0 +1,294 @@
+import bisect
+import itertools
+
+import numpy as np
+
+# Defaults mirror the ``.get`` fallbacks in RiskCalculator.calculate_framingham_score
+FRAMINGHAM_DEFAULTS = {
+    'age': 50,
+    'gender': 'Male',
+    'systolic': 120,
+    'total_cholesterol': 200,
+    'hdl': 50,
+    'smoking': 'Never',
+    'diabetes': False
+}
+
+RISK_CATEGORIES = np.array(['Low', 'Moderate', 'High', 'Very High'], dtype=object)
+RISK_CATEGORY_EDGES = [10, 20, 30]
+
+
+def _column(data, name, n, defaults=FRAMINGHAM_DEFAULTS):
+    """Return a column as an array, broadcasting the scalar default when absent"""
+    if name in data:
+        values = np.asarray(data[name])
+        if values.ndim == 0:
+            values = np.full(n, values.item(), dtype=values.dtype)
+        return values
+    default = defaults[name]
+    return np.full(n, default, dtype=object if isinstance(default, str) else None)
+
+
+def _column_length(data):
+    """Number of patients in a DataFrame or mapping of columns"""
+    if hasattr(data, 'index') and hasattr(data, 'columns'):
+        return len(data.index)
+    for name in FRAMINGHAM_DEFAULTS:
+        if name in data and np.ndim(data[name]) > 0:
+            return len(data[name])
+    return 1
+
+
+def _equals(values, label):
+    """Elementwise ``values == label`` that is False for non-string columns"""
+    if values.dtype.kind not in 'OUS':
+        return np.zeros(values.shape, dtype=bool)
+    return values == label
+
+
+def categorize_risk(risk_percentage):
+    """Vectorized counterpart of RiskCalculator._categorize_risk"""
+    codes = np.digitize(np.asarray(risk_percentage), RISK_CATEGORY_EDGES)
+    return RISK_CATEGORIES[codes]
+
+
+# Bin edges and the points awarded per bin, i.e. the if/elif ladders of the
+# scalar method flattened into lookup tables for np.digitize
+AGE_EDGES = [40, 50, 60, 70]
+AGE_POINTS_MALE = np.array([0, 2, 5, 8, 11])
+AGE_POINTS_FEMALE = np.array([0, 3, 6, 9, 12])
+CHOLESTEROL_EDGES = [200, 240, 280]
+CHOLESTEROL_POINTS = np.array([0, 1, 2, 3])
+HDL_EDGES = [35, 45, 60]
+HDL_POINTS = np.array([2, 1, 0, -1])
+SYSTOLIC_EDGES = [130, 140, 160]
+SYSTOLIC_POINTS = np.array([0, 1, 2, 3])
+
+
+def _bin_codes(values, edges, missing_code):
+    """np.digitize that maps NaN to the bin the scalar comparisons fall through to"""
+    codes = np.digitize(values, edges)
+    if values.dtype.kind == 'f':
+        codes[np.isnan(values)] = missing_code
+    return codes
+
+
+def framingham_points(data):
+    """Simplified Framingham points for every row of ``data``"""
+    n = _column_length(data)
+    age = _column(data, 'age', n)
+    male = _equals(_column(data, 'gender', n), 'Male')
+    systolic = _column(data, 'systolic', n)
+    cholesterol = _column(data, 'total_cholesterol', n)
+    hdl = _column(data, 'hdl', n)
+    smoking = _equals(_column(data, 'smoking', n), 'Current')
+    diabetes = _column(data, 'diabetes', n).astype(bool)
+
+    age_codes = _bin_codes(age, AGE_EDGES, 0)
+    points = np.where(male, AGE_POINTS_MALE[age_codes], AGE_POINTS_FEMALE[age_codes])
+    points += CHOLESTEROL_POINTS[_bin_codes(cholesterol, CHOLESTEROL_EDGES, 0)]
+    # HDL: a missing value fails every comparison, which is the 45-60 band
+    points += HDL_POINTS[_bin_codes(hdl, HDL_EDGES, 2)]
+    points += SYSTOLIC_POINTS[_bin_codes(systolic, SYSTOLIC_EDGES, 0)]
+    points += 2 * smoking + 2 * diabetes
+
+    return points.astype(np.int64, copy=False)
+
+
+def framingham_scores(data):
+    """Score a whole cohort at once
+
+    ``data`` is a pandas DataFrame or a mapping of NumPy columns using the same
+    keys as the scalar patient dict. Returns ``score``, ``risk_percentage`` and
+    ``risk_category`` arrays that match RiskCalculator.calculate_framingham_score
+    row for row.
+    """
+    return FRAMINGHAM_LOOKUP.scores(data)
+
+
+# One representative value inside each bin, in bin-code order; evaluating the
+# point system on these fills the lookup table
+AGE_REPRESENTATIVES = [30, 45, 55, 65, 75]
+CHOLESTEROL_REPRESENTATIVES = [180, 220, 260, 300]
+HDL_REPRESENTATIVES = [30, 40, 50, 70]
+SYSTOLIC_REPRESENTATIVES = [120, 135, 150, 170]
+
+# Trailing axis of the lookup table
+POINTS, RISK, CATEGORY = 0, 1, 2
+
+
+def build_framingham_table():
+    """int8 table of (points, risk %, category code) for every combination of bins
+
+    Axes are male, age bin, cholesterol bin, HDL bin, SBP bin, smoker,
+    diabetic, then the three values, i.e. shape (2, 5, 4, 4, 4, 2, 2, 3).
+    """
+    grid = np.meshgrid(
+        [False, True], AGE_REPRESENTATIVES, CHOLESTEROL_REPRESENTATIVES, HDL_REPRESENTATIVES,
+        SYSTOLIC_REPRESENTATIVES, [False, True], [False, True], indexing='ij'
+    )
+    male, age, cholesterol, hdl, systolic, smoking, diabetes = (axis.ravel() for axis in grid)
+    points = framingham_points({
+        'gender': np.where(male, 'Male', 'Female').astype(object),
+        'age': age, 'total_cholesterol': cholesterol, 'hdl': hdl, 'systolic': systolic,
+        'smoking': np.where(smoking, 'Current', 'Never').astype(object), 'diabetes': diabetes
+    })
+    risk = np.minimum(points * 2, 50)
+    category = np.digitize(risk, RISK_CATEGORY_EDGES)
+    table = np.stack([points, risk, category], axis=-1).astype(np.int8)
+    return table.reshape(grid[0].shape + (3,))
+
+
+def _scalar_code(value, edges, missing_code):
+    """bisect counterpart of _bin_codes for one value"""
+    if value != value:
+        return missing_code
+    return bisect.bisect_right(edges, value)
+
+
+def _integer_codes(edges, limit):
+    """Bin code of every integer in [0, limit), the common case for form inputs"""
+    return [bisect.bisect_right(edges, value) for value in range(limit)]
+
+
+AGE_CODES = _integer_codes(AGE_EDGES, 131)
+CHOLESTEROL_CODES = _integer_codes(CHOLESTEROL_EDGES, 1000)
+HDL_CODES = _integer_codes(HDL_EDGES, 300)
+SYSTOLIC_CODES = _integer_codes(SYSTOLIC_EDGES, 400)
+
+
+class FraminghamLookup:
+    """Framingham scoring as a single gather from a precomputed table
+
+    Inputs are reduced to bin codes (the same comparisons as the branching
+    code) and one index into the table yields points, risk and category
+    together. ``score`` serves one patient dict without NumPy overhead;
+    ``scores`` serves a cohort.
+    """
+
+    def __init__(self, table=None):
+        self.table = build_framingham_table() if table is None else np.asarray(table, dtype=np.int8)
+        # Nested lists index faster than a NumPy array for single lookups
+        self._rows = self.table.tolist()
+        self._labels = RISK_CATEGORIES.tolist()
+        # Flat views for batch gathers
+        self._shape = self.table.shape[:-1]
+        self._points = self.table[..., POINTS].ravel().astype(np.int64)
+        self._risk = self.table[..., RISK].ravel().astype(np.int64)
+        self._category = RISK_CATEGORIES[self.table[..., CATEGORY].ravel()]
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(path))
+
+    def save(self, path):
+        np.save(path, self.table)
+
+    def score(self, patient_data):
+        """Same result as RiskCalculator.calculate_framingham_score for one patient"""
+        get = patient_data.get
+        age = get('age', 50)
+        cholesterol = get('total_cholesterol', 200)
+        hdl = get('hdl', 50)
+        systolic = get('systolic', 120)
+        # Integer inputs use precomputed code lists; anything else goes through bisect
+        a = AGE_CODES[age] if type(age) is int and 0 <= age < 131 else _scalar_code(age, AGE_EDGES, 0)
+        c = (CHOLESTEROL_CODES[cholesterol] if type(cholesterol) is int and 0 <= cholesterol < 1000
+             else _scalar_code(cholesterol, CHOLESTEROL_EDGES, 0))
+        h = HDL_CODES[hdl] if type(hdl) is int and 0 <= hdl < 300 else _scalar_code(hdl, HDL_EDGES, 2)
+        s = (SYSTOLIC_CODES[systolic] if type(systolic) is int and 0 <= systolic < 400
+             else _scalar_code(systolic, SYSTOLIC_EDGES, 0))
+
+        points, risk, category = self._rows[get('gender', 'Male') == 'Male'][a][c][h][s][
+            get('smoking', 'Never') == 'Current'][bool(get('diabetes', False))]
+        return {
+            'score': points,
+            'risk_percentage': risk,
+            'risk_category': self._labels[category]
+        }
+
+    def codes(self, data):
+        """Index arrays into the table for every row of ``data``"""
+        n = _column_length(data)
+        return (
+            _equals(_column(data, 'gender', n), 'Male').astype(np.intp),
+            _bin_codes(_column(data, 'age', n), AGE_EDGES, 0),
+            _bin_codes(_column(data, 'total_cholesterol', n), CHOLESTEROL_EDGES, 0),
+            _bin_codes(_column(data, 'hdl', n), HDL_EDGES, 2),
+            _bin_codes(_column(data, 'systolic', n), SYSTOLIC_EDGES, 0),
+            _equals(_column(data, 'smoking', n), 'Current').astype(np.intp),
+            _column(data, 'diabetes', n).astype(bool).astype(np.intp)
+        )
+
+    def gather(self, codes):
+        """Score, risk and category arrays for precomputed ``codes``
+
+        What-if loops can keep the codes of unchanged factors and pay only for
+        the ones they vary plus this gather.
+        """
+        flat = np.ravel_multi_index(codes, self._shape)
+        return {
+            'score': self._points.take(flat),
+            'risk_percentage': self._risk.take(flat),
+            'risk_category': self._category.take(flat)
+        }
+
+    def scores(self, data):
+        """Cohort counterpart of ``score``: arrays of score, risk and category"""
+        return self.gather(self.codes(data))
+
+
+FRAMINGHAM_LOOKUP = FraminghamLookup()
+
+
+def _boundary_values(edges, low, high):
+    """Every edge, its neighbours on both sides, the extremes and NaN"""
+    values = [low, high, float('nan')]
+    for edge in edges:
+        values += [edge - 1, edge - 0.5, edge, edge + 0.5]
+    return values
+
+
+def validate_framingham_lookup(lookup=None, samples=100000, seed=0):
+    """Compare a lookup table with the branching RiskCalculator code
+
+    Checks every combination of boundary values (each bin edge, just below
+    and above it, extremes and missing values) for all genders, smoking
+    statuses and diabetes flags, plus ``samples`` random patients, through
+    both ``score`` and ``scores``. Returns counts and the first mismatches.
+    """
+    from Utils.CardioAgents import RiskCalculator
+
+    lookup = lookup or FRAMINGHAM_LOOKUP
+    # The reference method needs no model, so skip building a chat client
+    reference = RiskCalculator.__new__(RiskCalculator)
+
+    grid = itertools.product(
+        ['Male', 'Female', 'Other'], _boundary_values(AGE_EDGES, 20, 95),
+        _boundary_values(CHOLESTEROL_EDGES, 100, 400), _boundary_values(HDL_EDGES, 10, 120),
+        _boundary_values(SYSTOLIC_EDGES, 80, 230), ['Never', 'Former', 'Current'], [False, True]
+    )
+    keys = ['gender', 'age', 'total_cholesterol', 'hdl', 'systolic', 'smoking', 'diabetes']
+    patients = [dict(zip(keys, values)) for values in grid]
+
+    rng = np.random.default_rng(seed)
+    for _ in range(samples):
+        patients.append({
+            'gender': ['Male', 'Female'][rng.integers(2)], 'age': int(rng.integers(20, 95)),
+            'total_cholesterol': float(rng.uniform(100, 400)), 'hdl': float(rng.uniform(10, 120)),
+            'systolic': float(rng.uniform(80, 230)), 'smoking': ['Never', 'Former', 'Current'][rng.integers(3)],
+            'diabetes': bool(rng.integers(2))
+        })
+
+    batch = lookup.scores({key: np.array([p[key] for p in patients], dtype=object if key in ('gender', 'smoking') else None)
+                           for key in keys})
+    mismatches = []
+    for i, patient in enumerate(patients):
+        reference.patient_data = patient
+        expected = reference.calculate_framingham_score()
+        scalar = lookup.score(patient)
+        vector = {key: batch[key][i] for key in batch}
+        if any(expected[key] != scalar[key] or expected[key] != vector[key] for key in expected):
+            mismatches.append({'patient': patient, 'expected': expected, 'scalar': scalar})
+
+    return {'checked': len(patients), 'mismatches': len(mismatches), 'examples': mismatches[:10]}
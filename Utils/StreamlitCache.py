@@ -0,0 +1,40 @@
+import copy
+
+import streamlit as st
+
+
+@st.cache_resource(show_spinner=False, max_entries=256)
+def _cached_agent(class_path, _cls, args, kwargs):
+    return _cls(*copy.deepcopy(args), **copy.deepcopy(dict(kwargs)))
+
+
+def get_agent(cls, *args, **kwargs):
+    """Agent built once per class and inputs, then reused across reruns and sessions
+
+    Inputs are deep-copied, so later edits to the session-state dicts passed in
+    cannot change an agent that is already cached under the old values.
+    """
+    class_path = f"{cls.__module__}.{cls.__qualname__}"
+    return _cached_agent(class_path, cls, args, tuple(sorted(kwargs.items())))
+
+
+# Plotly builders keep their own JSON cache (Utils.FigureCache), which restores
+# a figure faster than st.cache_data can unpickle one; only the 3D heart HTML
+# goes through Streamlit's cache
+FIGURE_BUILDERS = (
+    "create_risk_gauge", "create_ecg_waveform", "create_ecg_trace", "create_3d_heart_model",
+    "create_lipid_panel_chart", "create_trend_chart", "create_risk_factor_radar",
+    "create_whatif_tornado", "create_whatif_heatmap"
+)
+
+
+def __getattr__(name):
+    # Builders are resolved on first use so plotly is only imported by pages that draw
+    if name not in FIGURE_BUILDERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from Utils import VisualHelpers
+    builder = getattr(VisualHelpers, name)
+    if name == "create_3d_heart_model":
+        builder = st.cache_data(show_spinner=False, max_entries=128)(builder)
+    globals()[name] = builder
+    return builder
@@ -0,0 +1,306 @@
+import bisect
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Upper bounds (seconds) of the call latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# USD per million (prompt, completion) tokens, for cost estimates
+TOKEN_PRICES = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "mixtral-8x7b-32768": (0.24, 0.24)
+}
+
+# Labels attached to every call recorded inside a call_context block
+_context = contextvars.ContextVar("llm_call_labels", default={})
+
+
+@contextlib.contextmanager
+def call_context(**labels):
+    """Attach ``labels`` (e.g. schema) to the calls recorded inside the block"""
+    token = _context.set({**_context.get(), **labels})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def estimate_cost(model_name, prompt_tokens, completion_tokens):
+    """USD cost of a call at TOKEN_PRICES (0 for unpriced models such as stub/fake)"""
+    prompt_price, completion_price = TOKEN_PRICES.get(model_name.split("+")[0], (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+
+class InMemoryExporter:
+    """Keeps every exported record in ``records``; for tests and notebooks"""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def export(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+
+class JSONLinesExporter:
+    """Appends each record to a JSON Lines file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}"
+
+
+class Telemetry:
+    """Per-call records and aggregates for every model call
+
+    ``record_call`` is invoked by the LLMClients call paths with the role,
+    model, cache outcome, latency (including time queued for the rate
+    limiter), retries, token usage and error of each call; ``record_parse``
+    by ResponseParsing with the outcome of schema validation. Aggregates
+    are exposed in Prometheus text format; individual records go to the
+    registered exporters and a bounded in-memory window used for
+    percentiles.
+    """
+
+    CALL_LABELS = ("role", "model", "schema", "cache")
+    PARSE_LABELS = ("role", "schema", "outcome")
+
+    def __init__(self, max_records=10000, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.exporters = []
+        self._records = deque(maxlen=max_records)
+        self._calls = {}
+        self._parses = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter):
+        """Send every new call and parse record to ``exporter.export(record)``"""
+        with self._lock:
+            self.exporters.append(exporter)
+        return exporter
+
+    def remove_exporter(self, exporter):
+        with self._lock:
+            self.exporters.remove(exporter)
+
+    def _export(self, record):
+        for exporter in list(self.exporters):
+            exporter.export(record)
+
+    def record_call(self, role, model, cache, latency, prompt_tokens=0, completion_tokens=0,
+                    retries=0, error=None, streamed=False):
+        """Record one model call (``cache`` is 'hit', 'miss' or 'off') and return the record"""
+        labels = _context.get()
+        record = {
+            "type": "call",
+            "time": time.time(),
+            "role": role or "",
+            "model": model,
+            "schema": labels.get("schema", ""),
+            "cache": cache,
+            "latency": latency,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens),
+            "retries": retries,
+            "error": type(error).__name__ if error is not None else None,
+            "streamed": streamed
+        }
+        key = tuple(record[name] for name in self.CALL_LABELS)
+        with self._lock:
+            stats = self._calls.get(key)
+            if stats is None:
+                stats = self._calls[key] = {
+                    "count": 0, "latency_sum": 0.0, "buckets": [0] * (len(self.buckets) + 1),
+                    "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "retries": 0
+                }
+            stats["count"] += 1
+            stats["latency_sum"] += latency
+            stats["buckets"][bisect.bisect_left(self.buckets, latency)] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["cost_usd"] += record["cost_usd"]
+            stats["retries"] += retries
+            if error is not None:
+                error_key = key[:3] + (record["error"],)
+                self._errors[error_key] = self._errors.get(error_key, 0) + 1
+            self._records.append(record)
+        self._export(record)
+        return record
+
+    def record_parse(self, role, schema, outcome, reasks=0):
+        """Record a structured reply that parsed first time ('ok'), after re-asks ('reasked') or not at all ('failed')"""
+        record = {"type": "parse", "time": time.time(), "role": role or "", "schema": schema or "",
+                  "outcome": outcome, "reasks": reasks}
+        key = (record["role"], record["schema"], outcome)
+        with self._lock:
+            self._parses[key] = self._parses.get(key, 0) + 1
+        self._export(record)
+        return record
+
+    def records(self):
+        """Recent call records, oldest first"""
+        with self._lock:
+            return list(self._records)
+
+    def summary(self, by="role"):
+        """Per-``by`` (e.g. role, model, schema) calls, hit rate, latency percentiles, tokens and cost
+
+        Percentiles cover provider calls (cache misses) in the recent-record window.
+        """
+        import numpy as np
+
+        groups = {}
+        for record in self.records():
+            groups.setdefault(record[by], []).append(record)
+        summary = {}
+        for name, records in sorted(groups.items()):
+            latencies = np.array([r["latency"] for r in records if r["cache"] != "hit"])
+            summary[name] = {
+                "calls": len(records),
+                "cache_hit_rate": sum(r["cache"] == "hit" for r in records) / len(records),
+                "errors": sum(r["error"] is not None for r in records),
+                "retries": sum(r["retries"] for r in records),
+                "p50_latency": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                "p95_latency": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+                "prompt_tokens": sum(r["prompt_tokens"] for r in records),
+                "completion_tokens": sum(r["completion_tokens"] for r in records),
+                "cost_usd": sum(r["cost_usd"] for r in records)
+            }
+        return summary
+
+    def prometheus_text(self):
+        """All aggregates in the Prometheus text exposition format"""
+        with self._lock:
+            calls = {key: dict(stats, buckets=list(stats["buckets"])) for key, stats in self._calls.items()}
+            parses = dict(self._parses)
+            errors = dict(self._errors)
+
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family("llm_calls_total", "counter", "Model calls by role, model, response schema and cache outcome")
+        for key, stats in sorted(calls.items()):
+            lines.append(f"llm_calls_total{_labels(self.CALL_LABELS, key)} {stats['count']}")
+
+        family("llm_call_latency_seconds", "histogram", "Model call latency including rate-limit queueing")
+        for key, stats in sorted(calls.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), stats["buckets"]):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"llm_call_latency_seconds_bucket{_labels(self.CALL_LABELS, key, le)} {cumulative}")
+            lines.append(f"llm_call_latency_seconds_sum{_labels(self.CALL_LABELS, key)} {stats['latency_sum']}")
+            lines.append(f"llm_call_latency_seconds_count{_labels(self.CALL_LABELS, key)} {stats['count']}")
+
+        family("llm_tokens_total", "counter", "Prompt and completion tokens")
+        for key, stats in sorted(calls.items()):
+            for kind in ("prompt", "completion"):
+                labels = _labels(self.CALL_LABELS, key, f'kind="{kind}"')
+                lines.append(f"llm_tokens_total{labels} {stats[kind + '_tokens']}")
+
+        family("llm_cost_usd_total", "counter", "Estimated spend at TOKEN_PRICES")
+        for key, stats in sorted(calls.items()):
+            lines.append(f"llm_cost_usd_total{_labels(self.CALL_LABELS, key)} {stats['cost_usd']}")
+
+        family("llm_retries_total", "counter", "Rate-limit retries")
+        for key, stats in sorted(calls.items()):
+            lines.append(f"llm_retries_total{_labels(self.CALL_LABELS, key)} {stats['retries']}")
+
+        family("llm_errors_total", "counter", "Model calls that raised, by exception type")
+        for key, count in sorted(errors.items()):
+            lines.append(f"llm_errors_total{_labels(('role', 'model', 'schema', 'error'), key)} {count}")
+
+        family("llm_parse_total", "counter", "Structured replies by validation outcome")
+        for key, count in sorted(parses.items()):
+            lines.append(f"llm_parse_total{_labels(self.PARSE_LABELS, key)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        """Drop all records and aggregates (exporters stay registered)"""
+        with self._lock:
+            self._records.clear()
+            self._calls.clear()
+            self._parses.clear()
+            self._errors.clear()
+
+
+def serve_metrics(port=9464, telemetry=None, host="0.0.0.0"):
+    """Serve ``/metrics`` in Prometheus format from a daemon thread; returns the server"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = (telemetry or get_telemetry()).prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry():
+    """Process-wide telemetry; records also go to ``LLM_TELEMETRY_PATH`` (JSON Lines) when set"""
+    global _telemetry
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                telemetry = Telemetry(max_records=int(os.environ.get("LLM_TELEMETRY_RECORDS", 10000)))
+                path = os.environ.get("LLM_TELEMETRY_PATH")
+                if path:
+                    telemetry.add_exporter(JSONLinesExporter(path))
+                _telemetry = telemetry
+    return _telemetry
+
+
+def set_telemetry(telemetry):
+    """Replace the process-wide telemetry (None restores the environment default)"""
+    global _telemetry
+    with _telemetry_lock:
+        _telemetry = telemetry
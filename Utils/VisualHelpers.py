@@ -1,8 +1,37 @@
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
 import numpy as np
 import pandas as pd
 
+from Utils.Downsample import DEFAULT_PLOT_WIDTH, downsample, point_budget
+from Utils.FigureCache import cached_figure
+
+# Shared chart look, built once on top of Plotly's default template and
+# registered as 'cardio'. Builders apply it to their own figures and only set
+# what differs from it; figures built elsewhere keep Plotly's default.
+CARDIO_TEMPLATE = go.layout.Template(pio.templates['plotly'])
+CARDIO_TEMPLATE.layout.update(
+    font=dict(family="Poppins", size=14),
+    plot_bgcolor='rgba(255,255,255,0.95)',
+    paper_bgcolor='rgba(0,0,0,0)',
+    margin=dict(l=50, r=20, t=60, b=50)
+)
+pio.templates['cardio'] = CARDIO_TEMPLATE
+
+def _apply_template(fig, name):
+    """Attach registered template ``name`` to ``fig``
+
+    Registered templates are already valid, so this skips re-validation the
+    way Plotly does for its default template (~1 ms instead of ~15 ms).
+    """
+    fig.layout._validate = False
+    try:
+        fig.layout.template = pio.templates[name]
+    finally:
+        fig.layout._validate = True
+
+@cached_figure
 def create_risk_gauge(risk_value, risk_model='Framingham'):
     """Create animated risk gauge based on model"""
     
@@ -61,46 +90,113 @@ def create_risk_gauge(risk_value, risk_model='Framingham'):
         }
     ))
     
+    _apply_template(fig, 'cardio')
     fig.update_layout(
         height=500,
-        font={'color': "#2c3e50", 'family': "Poppins"},
-        paper_bgcolor='rgba(0,0,0,0)',
+        font={'color': "#2c3e50", 'size': 12},
         plot_bgcolor='rgba(0,0,0,0)',
         margin=dict(l=20, r=20, t=80, b=20)
     )
     
     return fig
 
-def create_ecg_waveform(duration=4, heart_rate=72, abnormalities=None):
-    """Create realistic ECG waveform with optional abnormalities"""
-    
-    samples = 1000
-    t = np.linspace(0, duration, samples)
-    
-    # Normal ECG components
-    ecg = np.zeros(samples)
+# Synthetic beat morphology: (amplitude, offset from beat onset in s, variance) per wave
+ECG_WAVES = {
+    'p_wave': (0.15, 0.1, 0.001),
+    'qrs': (1.0, 0.2, 0.0005),
+    't_wave': (0.3, 0.4, 0.002)
+}
+# Every wave has decayed below 1e-6 mV by 0.6 s after the onset
+ECG_BEAT_SECONDS = 0.6
+
+
+def ecg_beat_template(sampling_rate=250, dtype=np.float32):
+    """One P-QRS-T beat sampled at ``sampling_rate`` Hz"""
+    offsets = np.arange(int(np.ceil(ECG_BEAT_SECONDS * sampling_rate))) / sampling_rate
+    template = np.zeros(len(offsets))
+    for amplitude, center, variance in ECG_WAVES.values():
+        template += amplitude * np.exp(-((offsets - center)**2) / variance)
+    return template.astype(dtype)
+
+
+def _render_ecg_window(start, stop, beats, heart_rate, sampling_rate, template, dtype):
+    """Samples [start, stop) of a train of ``beats`` beats, touching only samples near each beat"""
+    window = np.zeros(stop - start, dtype=dtype)
+    samples_per_beat = 60 * sampling_rate / heart_rate
+    # Only the beats whose template overlaps the window
+    first = max(int(np.ceil((start - len(template)) / samples_per_beat)), 0)
+    last = min(int(np.floor((stop - 1) / samples_per_beat)), beats - 1)
+    onsets = np.rint(np.arange(first, last + 1) * samples_per_beat).astype(np.int64) - start
+
+    # One vectorized pass per template sample; onsets are sorted and distinct,
+    # so each pass is a plain fancy-indexed add and the total work is O(samples)
+    for k, value in enumerate(template):
+        positions = onsets + k
+        lo = np.searchsorted(positions, 0)
+        hi = np.searchsorted(positions, len(window))
+        window[positions[lo:hi]] += value
+    return window
+
+
+def iter_ecg_chunks(duration=4, heart_rate=72, sampling_rate=250, abnormalities=None, seed=None,
+                    chunk_seconds=60, dtype=np.float32):
+    """Yield a synthetic ECG in consecutive chunks of ``chunk_seconds``
+
+    Memory stays bounded by the chunk size, so Holter-length traces (hours at
+    250-1000 Hz) can be streamed to disk or a downsampler. Concatenating the
+    chunks gives exactly generate_ecg_signal with the same arguments.
+    """
+    total = int(round(duration * sampling_rate))
+    chunk = max(int(chunk_seconds * sampling_rate), 1)
+    template = ecg_beat_template(sampling_rate, dtype)
     beats = int(heart_rate * duration / 60)
-    
-    for beat in range(beats):
-        beat_time = beat * 60 / heart_rate
-        beat_idx = int(beat_time * samples / duration)
-        
-        # P wave
-        p_wave = 0.15 * np.exp(-((t - beat_time - 0.1)**2) / 0.001)
-        # QRS complex
-        qrs = 1.0 * np.exp(-((t - beat_time - 0.2)**2) / 0.0005)
-        # T wave
-        t_wave = 0.3 * np.exp(-((t - beat_time - 0.4)**2) / 0.002)
-        
-        ecg += p_wave + qrs + t_wave
-    
-    # Add abnormalities if specified
-    if abnormalities:
+    rng = np.random.default_rng(seed)
+    abnormalities = abnormalities or []
+
+    for start in range(0, total, chunk):
+        stop = min(start + chunk, total)
+        ecg = _render_ecg_window(start, stop, beats, heart_rate, sampling_rate, template, dtype)
         if 'irregular' in abnormalities:
-            ecg += 0.1 * np.random.randn(samples)
+            ecg += 0.1 * rng.standard_normal(stop - start, dtype=np.float64).astype(dtype)
         if 'elevated_st' in abnormalities:
             ecg += 0.2
+        yield ecg
+
+
+def generate_ecg_signal(duration=4, heart_rate=72, sampling_rate=250, abnormalities=None, seed=None,
+                        dtype=np.float32):
+    """Synthetic Lead II samples built from one beat template
+
+    The template is rendered once and added at every beat onset, so the cost
+    is O(samples) instead of evaluating every wave over the whole trace for
+    each beat. Beat onsets are rounded to the nearest sample. ``seed`` makes
+    the 'irregular' noise reproducible.
+    """
+    chunks = list(iter_ecg_chunks(duration, heart_rate, sampling_rate, abnormalities, seed,
+                                  chunk_seconds=duration, dtype=dtype))
+    return np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtype)
+
+
+@cached_figure
+def create_ecg_waveform(duration=4, heart_rate=72, abnormalities=None, sampling_rate=250, seed=None):
+    """Create realistic ECG waveform with optional abnormalities"""
     
+    ecg = generate_ecg_signal(duration, heart_rate, sampling_rate, abnormalities, seed)
+    return create_ecg_trace(ecg, sampling_rate)
+
+
+@cached_figure
+def create_ecg_trace(ecg, sampling_rate=250, start=0.0, width=DEFAULT_PLOT_WIDTH):
+    """Plot recorded or synthetic ECG samples on the standard ECG grid
+
+    Long recordings are min/max downsampled to the point budget of a plot
+    ``width`` pixels wide, which keeps every QRS peak.
+    """
+
+    t = start + np.arange(len(ecg)) / sampling_rate
+    span = len(ecg) / sampling_rate
+    t, ecg = downsample(t, ecg, point_budget(width), method='minmax')
+
     fig = go.Figure()
     
     fig.add_trace(go.Scatter(
@@ -113,12 +209,12 @@ def create_ecg_waveform(duration=4, heart_rate=72, abnormalities=None):
         fillcolor='rgba(231, 76, 60, 0.1)'
     ))
     
-    # Add grid
+    # Add grid (0.2 s boxes only while they stay readable)
     fig.update_xaxes(
         showgrid=True,
         gridwidth=1,
         gridcolor='rgba(231, 76, 60, 0.2)',
-        dtick=0.2
+        dtick=0.2 if span <= 20 else None
     )
     fig.update_yaxes(
         showgrid=True,
@@ -127,16 +223,13 @@ def create_ecg_waveform(duration=4, heart_rate=72, abnormalities=None):
         dtick=0.2
     )
     
+    _apply_template(fig, 'cardio')
     fig.update_layout(
         title="<b>ECG Trace (Lead II)</b>",
         xaxis_title="Time (seconds)",
         yaxis_title="Amplitude (mV)",
         height=400,
-        showlegend=False,
-        font=dict(family="Poppins", size=14),
-        plot_bgcolor='rgba(255,255,255,0.95)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        margin=dict(l=50, r=20, t=60, b=50)
+        showlegend=False
     )
     
     return fig
@@ -191,6 +284,7 @@ def create_3d_heart_model(problems=None):
     
     return heart_html
 
+@cached_figure
 def create_lipid_panel_chart(lab_data):
     """Create beautiful lipid panel visualization"""
     
@@ -227,22 +321,23 @@ def create_lipid_panel_chart(lab_data):
             line=dict(color="#3498db", width=3, dash="dash")
         )
     
+    _apply_template(fig, 'cardio')
     fig.update_layout(
         title="<b>Lipid Panel Results</b>",
         yaxis_title="mg/dL",
         height=450,
         showlegend=False,
-        font=dict(family="Poppins", size=14),
-        plot_bgcolor='rgba(255,255,255,0.95)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        margin=dict(l=50, r=20, t=80, b=50),
+        margin=dict(t=80),
         hovermode='x unified'
     )
     
     return fig
 
-def create_trend_chart(dates, values, metric_name, target=None):
-    """Create animated trend chart"""
+@cached_figure
+def create_trend_chart(dates, values, metric_name, target=None, width=DEFAULT_PLOT_WIDTH):
+    """Create animated trend chart (long histories are LTTB-downsampled to the plot width)"""
+    
+    dates, values = downsample(dates, values, point_budget(width), method='lttb')
     
     fig = go.Figure()
     
@@ -250,7 +345,7 @@ def create_trend_chart(dates, values, metric_name, target=None):
     fig.add_trace(go.Scatter(
         x=dates,
         y=values,
-        mode='lines+markers',
+        mode='lines+markers' if len(values) <= 200 else 'lines',
         name=metric_name,
         line=dict(color='#667eea', width=4),
         marker=dict(size=12, color='#764ba2', line=dict(color='white', width=2)),
@@ -270,20 +365,18 @@ def create_trend_chart(dates, values, metric_name, target=None):
             annotation_position="right"
         )
     
+    _apply_template(fig, 'cardio')
     fig.update_layout(
         title=f"<b>{metric_name} Trend</b>",
         xaxis_title="Date",
         yaxis_title=metric_name,
         height=400,
-        font=dict(family="Poppins", size=14),
-        plot_bgcolor='rgba(255,255,255,0.95)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        margin=dict(l=50, r=20, t=60, b=50),
         hovermode='x unified'
     )
     
     return fig
 
+@cached_figure
 def create_risk_factor_radar(patient_data):
     """Create radar chart for risk factors"""
     
@@ -318,6 +411,7 @@ def create_risk_factor_radar(patient_data):
         name='Risk Factors'
     ))
     
+    _apply_template(fig, 'cardio')
     fig.update_layout(
         polar=dict(
             radialaxis=dict(
@@ -334,9 +428,64 @@ def create_risk_factor_radar(patient_data):
         showlegend=False,
         title="<b>Risk Factor Profile</b>",
         height=450,
-        font=dict(family="Poppins", size=14),
-        paper_bgcolor='rgba(0,0,0,0)',
         margin=dict(l=80, r=80, t=80, b=80)
     )
     
     return fig
+
+@cached_figure
+def create_whatif_tornado(base_risk, risks, risk_model='Framingham'):
+    """Tornado chart of risk change per single modification, largest effect on top"""
+    
+    ordered = sorted(risks.items(), key=lambda item: abs(item[1] - base_risk))
+    labels = [label for label, _ in ordered]
+    changes = [risk - base_risk for _, risk in ordered]
+    colors = ['#2ecc71' if change < 0 else '#e74c3c' if change > 0 else '#95a5a6' for change in changes]
+    
+    fig = go.Figure(go.Bar(
+        x=changes,
+        y=labels,
+        orientation='h',
+        marker_color=colors,
+        text=[f"{risk:.1f}% ({change:+.1f})" for (_, risk), change in zip(ordered, changes)],
+        textposition='outside',
+        hovertemplate="<b>%{y}</b><br>Change: %{x:+.1f} points<extra></extra>"
+    ))
+    
+    fig.add_vline(x=0, line_color="#2c3e50", line_width=2)
+    
+    _apply_template(fig, 'cardio')
+    fig.update_layout(
+        title=f"<b>What-If: Risk Change from {base_risk:.1f}% ({risk_model})</b>",
+        xaxis_title="Change in 10-year risk (percentage points)",
+        height=max(300, 60 * len(labels) + 120),
+        showlegend=False,
+        margin=dict(r=80)
+    )
+    
+    return fig
+
+@cached_figure
+def create_whatif_heatmap(risk_matrix, x_labels, y_labels, x_title, y_title, risk_model='Framingham'):
+    """Heatmap of 10-year risk over a two-factor grid of modifications"""
+    
+    fig = go.Figure(go.Heatmap(
+        z=risk_matrix,
+        x=x_labels,
+        y=y_labels,
+        colorscale=[[0, '#2ecc71'], [0.5, '#f39c12'], [1, '#e74c3c']],
+        text=[[f"{risk:.1f}%" for risk in row] for row in risk_matrix],
+        texttemplate="%{text}",
+        colorbar=dict(title="Risk %"),
+        hovertemplate=f"{x_title}: %{{x}}<br>{y_title}: %{{y}}<br>Risk: %{{z:.1f}}%<extra></extra>"
+    ))
+    
+    _apply_template(fig, 'cardio')
+    fig.update_layout(
+        title=f"<b>What-If Risk Map ({risk_model})</b>",
+        xaxis_title=x_title,
+        yaxis_title=y_title,
+        height=450
+    )
+    
+    return fig
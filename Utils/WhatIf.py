@@ -0,0 +1,118 @@
+import itertools
+import numbers
+
+import numpy as np
+
+from Utils.RiskModels import RISK_MODEL_DEFAULTS, get_risk_model
+
+# Single-factor goals shown in the tornado chart; numbers are added to the
+# patient's value, anything else replaces it
+WHAT_IF_PRESETS = {
+    'SBP −10 mmHg': {'systolic': -10},
+    'SBP −20 mmHg': {'systolic': -20},
+    'Total cholesterol −40 mg/dL': {'total_cholesterol': -40},
+    'HDL +10 mg/dL': {'hdl': 10},
+    'Quit smoking': {'smoking': 'Former'},
+    'Diabetes in remission': {'diabetes': False}
+}
+
+
+def apply_change(value, change):
+    """New field value: numeric changes are deltas, the rest are replacements
+
+    A delta to an unknown (None) value leaves it unknown.
+    """
+    if isinstance(change, numbers.Number) and not isinstance(change, bool):
+        return None if value is None else value + change
+    return change
+
+
+def modification_grid(axes):
+    """Every combination of ``{field: [change, ...]}``; a None change keeps the base value"""
+    fields = list(axes)
+    return [
+        {field: change for field, change in zip(fields, changes) if change is not None}
+        for changes in itertools.product(*(axes[field] for field in fields))
+    ]
+
+
+class WhatIfSimulator:
+    """Risk of a base patient under many modifications at once
+
+    The base patient's factor contributions are computed once. ``simulate``
+    lays the scenarios out as columns (unchanged fields stay broadcast views
+    of the base value), recomputes only the contribution groups that read a
+    modified field and sums them with the cached base contributions, so a
+    grid of scenarios is one vectorized pass over just the changed factors.
+    """
+
+    def __init__(self, patient_data, model='Framingham'):
+        self.model = get_risk_model(model)
+        self.patient_data = dict(patient_data)
+        self.base = {field: np.asarray([value]) for field, value in self.patient_data.items()}
+        self.base_contributions = self.model.contributions(self.base)
+        self.base_risk = float(self.model.risk(sum(self.base_contributions.values()), self.base)[0])
+
+    def _base_value(self, field):
+        """The patient's value of ``field``, else the models' default (None if neither has one)"""
+        if field in self.patient_data:
+            return self.patient_data[field]
+        return RISK_MODEL_DEFAULTS.get(field)
+
+    def _columns(self, scenarios):
+        n = len(scenarios)
+        changed = set().union(*scenarios) if scenarios else set()
+        columns = {field: np.broadcast_to(values, (n,)) for field, values in self.base.items() if field not in changed}
+        for field in changed:
+            base_value = self._base_value(field)
+            columns[field] = np.array([apply_change(base_value, s[field]) if field in s else base_value
+                                       for s in scenarios])
+        return columns, changed
+
+    def simulate(self, scenarios):
+        """Risk percentage for every modification dict in ``scenarios``"""
+        if not scenarios:
+            return np.zeros(0)
+        columns, changed = self._columns(scenarios)
+        n = len(scenarios)
+        if changed & set(self.model.strata):
+            return self.model.predict(columns)
+
+        stale = [group for group, fields in self.model.groups.items() if changed & set(fields)]
+        total = sum(np.broadcast_to(value, (n,)) for group, value in self.base_contributions.items() if group not in stale)
+        if stale:
+            total = total + sum(self.model.contributions(columns, stale).values())
+        return self.model.risk(total, columns)
+
+    def _changes_patient(self, change):
+        return any(apply_change(self._base_value(field), value) != self._base_value(field)
+                   for field, value in change.items())
+
+    def unmodelled(self, modifications=None):
+        """Labels of modifications that would change the patient but only in fields the model ignores"""
+        modifications = WHAT_IF_PRESETS if modifications is None else modifications
+        return [label for label, change in modifications.items()
+                if self._changes_patient(change) and not set(change) & self.model.fields]
+
+    def tornado(self, modifications=None):
+        """``{label: risk}`` for each single modification (defaults to WHAT_IF_PRESETS)
+
+        Modifications that would not change the patient (e.g. quitting when
+        not a smoker) are left out, as are those the model does not score
+        (e.g. diabetes under SCORE2), which would otherwise look like they
+        bring no benefit; see ``unmodelled``.
+        """
+        modifications = WHAT_IF_PRESETS if modifications is None else modifications
+        relevant = {
+            label: change for label, change in modifications.items()
+            if self._changes_patient(change) and set(change) & self.model.fields
+        }
+        risks = self.simulate(list(relevant.values()))
+        return dict(zip(relevant, risks.tolist()))
+
+    def heatmap(self, x_field, x_changes, y_field, y_changes, extra=None):
+        """Risk matrix (rows: ``y_changes``, columns: ``x_changes``) on top of ``extra`` changes"""
+        extra = extra or {}
+        scenarios = [dict(extra, **scenario) for scenario in
+                     modification_grid({y_field: list(y_changes), x_field: list(x_changes)})]
+        return self.simulate(scenarios).reshape(len(y_changes), len(x_changes))
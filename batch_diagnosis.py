@@ -0,0 +1,58 @@
+"""
+Batch diagnosis over a directory of medical reports
+Writes one result file per patient and resumes where a previous run stopped
+
+Example:
+    python batch_diagnosis.py "Medical Reports" --output Results --patients 4
+"""
+
+import argparse
+from dotenv import load_dotenv
+from Utils.ReportPipeline import ReportPipeline, PIPELINES
+
+# Load API key
+load_dotenv(dotenv_path='apikey.env')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the specialist → team pipeline over every report in a directory")
+    parser.add_argument("input_dir", nargs="?", default="Medical Reports", help="directory of .txt reports")
+    parser.add_argument("--output", default="Results", help="directory for per-patient results")
+    parser.add_argument("--pipeline", choices=PIPELINES, default="basic",
+                        help="basic: Utils.Agents (text), enhanced: Utils.EnhancedAgents (JSON)")
+    parser.add_argument("--model", default="llama-3.3-70b-versatile", help="model name (e.g. fake:test to run offline)")
+    parser.add_argument("--patients", type=int, default=4, help="reports processed in parallel")
+    parser.add_argument("--concurrency", type=int, default=12, help="model calls in flight")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per model call")
+    parser.add_argument("--quorum", type=int, default=None,
+                        help="start the team synthesis once this many specialists have answered")
+    parser.add_argument("--quorum-timeout", type=float, default=None,
+                        help="start the team synthesis after this many seconds regardless")
+    args = parser.parse_args()
+
+    pipeline = ReportPipeline(
+        output_dir=args.output,
+        pipeline=args.pipeline,
+        model_name=args.model,
+        max_patients=args.patients,
+        max_concurrency=args.concurrency,
+        timeout=args.timeout,
+        quorum=args.quorum,
+        quorum_timeout=args.quorum_timeout
+    )
+
+    icons = {"done": "✅", "skipped": "⏭️ ", "failed": "❌"}
+
+    def report(patient_id, status):
+        error = pipeline.checkpoint.failed.get(patient_id) if status == "failed" else None
+        print(f"{icons[status]} {patient_id}" + (f" ({error})" if error else ""))
+
+    summary = pipeline.run(args.input_dir, on_result=report)
+
+    print(f"\n{summary['done']} diagnosed, {summary['skipped']} already done, {summary['failed']} failed")
+    if summary["failed"]:
+        print("Re-run the same command to retry the failed reports")
+
+
+if __name__ == "__main__":
+    main()
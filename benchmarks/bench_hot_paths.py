@@ -0,0 +1,172 @@
+"""
+asv-style benchmarks for the code the app runs on every page view
+
+Each class is one benchmark group: ``setup`` builds the inputs, every
+``time_*`` method is timed, and ``params`` expands a group over input
+sizes or variants. Run with:
+    python benchmarks/run.py
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.CardioAgents import ProgressTracker, RiskCalculator, TreatmentAdvisor
+from Utils import EnhancedAgents
+from Utils.FakeLLM import sample_response
+from Utils.ResponseParsing import TreatmentPlanResponse
+from Utils.RiskModels import RISK_MODEL_REGISTRY, get_risk_model
+from Utils import VisualHelpers
+from Utils.WhatIf import WhatIfSimulator
+
+# Agents are built on the offline backend so no API key is needed
+MODEL = "fake:bench"
+
+PATIENT = {
+    'age': 58, 'gender': 'Male', 'ethnicity': 'Caucasian', 'systolic': 142, 'diastolic': 88,
+    'total_cholesterol': 232, 'ldl': 150, 'hdl': 41, 'triglycerides': 180, 'smoking': 'Current',
+    'diabetes': False, 'hypertension': True, 'exercise': 'Sedentary', 'family_history': True
+}
+
+
+class FraminghamScore:
+    def setup(self):
+        self.calculator = RiskCalculator(PATIENT, model_name=MODEL)
+
+    def time_calculate_framingham_score(self):
+        self.calculator.calculate_framingham_score()
+
+
+class RiskCategory:
+    """``get_risk_category`` of cardio_ultimate.py
+
+    The page module is a Streamlit script that cannot be imported, so its
+    one-line body is timed here.
+    """
+
+    params = [sorted(RISK_MODEL_REGISTRY)]
+    param_names = ['model']
+
+    def time_get_risk_category(self, model):
+        get_risk_model(model).category(14.2)
+
+
+class ProgressTrends:
+    params = [[10, 1_000, 100_000]]
+    param_names = ['measurements']
+
+    def setup(self, measurements):
+        rng = np.random.default_rng(0)
+        dates = np.datetime64('2020-01-01T08:00', 's') + np.arange(measurements) * np.timedelta64(6, 'h')
+        self.tracker = ProgressTracker()
+        self.tracker.add_measurements(dates, {
+            'systolic': rng.normal(135, 8, measurements),
+            'diastolic': rng.normal(85, 5, measurements),
+            'total_cholesterol': rng.normal(215, 15, measurements),
+            'ldl': rng.normal(135, 12, measurements),
+            'hdl': rng.normal(45, 4, measurements),
+            'weight': rng.normal(88, 2, measurements)
+        })
+
+    def time_get_trends(self, measurements):
+        self.tracker.get_trends()
+
+
+class ParseJsonResponse:
+    params = [['clean', 'fenced', 'malformed'], ['none', 'TreatmentPlanResponse']]
+    param_names = ['payload', 'schema']
+
+    def setup(self, payload, schema):
+        plan = json.dumps(sample_response(TreatmentPlanResponse), indent=2)
+        self.text = {
+            'clean': plan,
+            'fenced': f"Here is the plan you asked for:\n```json\n{plan}\n```\nLet me know if you need more.",
+            # Truncated mid-object: every candidate has to be scanned and rejected
+            'malformed': f"Here is the plan:\n```json\n{plan[:len(plan) * 2 // 3]}"
+        }[payload]
+        self.schema = TreatmentPlanResponse if schema == 'TreatmentPlanResponse' else None
+        self.agent = TreatmentAdvisor(PATIENT, {}, model_name=MODEL)
+
+    def time_parse_json_response(self, payload, schema):
+        self.agent.parse_json_response(self.text, self.schema)
+
+
+class SpecialistPrompts:
+    """The six specialists a report fans out to, built and their prompts rendered"""
+
+    def setup(self):
+        self.specialists = [getattr(EnhancedAgents, role) for role in (
+            'Cardiologist', 'Psychologist', 'Pulmonologist', 'Neurologist', 'Endocrinologist', 'GeneralPractitioner'
+        )]
+        self.report = "Patient: 45-year-old male with intermittent chest pain and shortness of breath."
+
+    def time_build_and_format(self):
+        for specialist in self.specialists:
+            specialist(self.report, model_name=MODEL).format_prompt()
+
+
+def _builder_inputs():
+    """Arguments of every VisualHelpers builder at the sizes the pages use"""
+    rng = np.random.default_rng(0)
+    simulator = WhatIfSimulator(PATIENT, 'Framingham')
+    sbp_steps = list(range(0, -45, -5))
+    chol_steps = list(range(0, -90, -10))
+    dates = np.datetime64('2024-01-01', 'D') + np.arange(730)
+    return {
+        'create_risk_gauge': ((14.2, 'Framingham'), {}),
+        'create_ecg_waveform': ((10, 72, None, 250, 0), {}),
+        # Five minutes of Holter-style recording at 250 Hz
+        'create_ecg_trace': ((VisualHelpers.generate_ecg_signal(300, 72, 250, seed=0), 250), {}),
+        'create_3d_heart_model': (([
+            {'area': 'Left ventricle', 'description': 'Mild hypertrophy'},
+            {'area': 'Conduction system', 'description': 'Occasional ectopic beats'}
+        ],), {}),
+        'create_lipid_panel_chart': ((PATIENT,), {}),
+        # Two years of daily readings
+        'create_trend_chart': ((dates, rng.normal(135, 8, len(dates)), 'Systolic BP', 120), {}),
+        'create_risk_factor_radar': ((PATIENT,), {}),
+        'create_whatif_tornado': ((simulator.base_risk, simulator.tornado(), 'Framingham'), {}),
+        'create_whatif_heatmap': ((
+            simulator.heatmap('systolic', sbp_steps, 'total_cholesterol', chol_steps).tolist(),
+            [str(step) for step in sbp_steps], [str(step) for step in chol_steps],
+            'Systolic change', 'Cholesterol change', 'Framingham'
+        ), {})
+    }
+
+
+BUILDERS = list(_builder_inputs())
+CACHED_BUILDERS = [name for name in BUILDERS if hasattr(getattr(VisualHelpers, name), 'uncached')]
+
+
+class VisualBuilders:
+    """Full figure construction, bypassing the figure cache"""
+
+    params = [BUILDERS]
+    param_names = ['builder']
+
+    def setup(self, builder):
+        self.args, self.kwargs = _builder_inputs()[builder]
+        function = getattr(VisualHelpers, builder)
+        self.build = getattr(function, 'uncached', function)
+
+    def time_build(self, builder):
+        self.build(*self.args, **self.kwargs)
+
+
+class VisualBuildersCached:
+    """Repeat calls served from the figure cache (key hashing plus JSON rebuild)"""
+
+    params = [CACHED_BUILDERS]
+    param_names = ['builder']
+
+    def setup(self, builder):
+        self.args, self.kwargs = _builder_inputs()[builder]
+        self.build = getattr(VisualHelpers, builder)
+        self.build(*self.args, **self.kwargs)
+
+    def time_cached(self, builder):
+        self.build(*self.args, **self.kwargs)
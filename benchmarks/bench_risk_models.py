@@ -0,0 +1,62 @@
+"""
+Benchmark the vectorized risk models over a synthetic cohort
+
+Example:
+    python benchmarks/bench_risk_models.py --patients 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Utils.RiskModels import RISK_MODEL_REGISTRY, compare_models
+
+
+def synthetic_cohort(n, seed=0):
+    """Plausible adult patients as a mapping of NumPy columns"""
+    rng = np.random.default_rng(seed)
+    return {
+        'age': rng.integers(40, 80, n),
+        'gender': rng.choice(np.array(['Male', 'Female'], dtype=object), n),
+        'ethnicity': rng.choice(np.array(['Caucasian', 'African American', 'Hispanic', 'Asian'], dtype=object), n),
+        'systolic': rng.normal(130, 18, n).clip(90, 220),
+        'total_cholesterol': rng.normal(205, 38, n).clip(120, 340),
+        'hdl': rng.normal(52, 14, n).clip(20, 110),
+        'smoking': rng.choice(np.array(['Never', 'Former', 'Current'], dtype=object), n, p=[0.6, 0.25, 0.15]),
+        'diabetes': rng.random(n) < 0.1,
+        'hypertension': rng.random(n) < 0.3
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each risk model and the all-model comparison")
+    parser.add_argument("--patients", type=int, default=1_000_000, help="cohort size")
+    parser.add_argument("--repeat", type=int, default=3, help="best of this many runs")
+    args = parser.parse_args()
+
+    cohort = synthetic_cohort(args.patients)
+
+    def best(fn):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    print(f"{args.patients:,} patients, best of {args.repeat}")
+    for key, model in RISK_MODEL_REGISTRY.items():
+        seconds, risk = best(lambda: model.predict(cohort))
+        print(f"  {key:<12} {seconds:8.3f} s  {args.patients / seconds:>14,.0f} patients/s  median risk {np.median(risk):5.1f}%")
+
+    seconds, _ = best(lambda: compare_models(cohort))
+    print(f"  {'all models':<12} {seconds:8.3f} s  {args.patients / seconds:>14,.0f} patients/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Check the cold-start import time of the app and agent modules
+
+Each module is imported in a fresh interpreter under ``python -X importtime``
+and its cumulative import time compared with IMPORT_BUDGET_MS. The same
+fresh interpreter also reports which of the heavy libraries in FORBIDDEN
+were pulled in, so a stray top-level ``import plotly`` fails the check even
+on a machine fast enough to stay inside the budget. Exits with status 1 on
+any violation. Modules whose third-party dependencies are not installed are
+skipped; any other import failure (a syntax error, a broken ``Utils``
+import) is a violation.
+
+Examples:
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --scale 2 --top 15
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time (ms) each module may take in a fresh interpreter
+IMPORT_BUDGET_MS = {
+    "Utils.Agents": 150,
+    "Utils.EnhancedAgents": 400,
+    "Utils.CardioAgents": 450,
+    "Utils.MeasurementStore": 200,
+    "Utils.Telemetry": 50,
+    "Utils.RiskModels": 250,
+    "Utils.StreamlitCache": 1500
+}
+
+# Libraries a module must only load on first use
+HEAVY = ("langchain_core", "langchain_groq", "plotly", "pandas")
+FORBIDDEN = {
+    "Utils.Agents": HEAVY,
+    "Utils.EnhancedAgents": HEAVY,
+    "Utils.CardioAgents": HEAVY,
+    "Utils.MeasurementStore": HEAVY,
+    "Utils.Telemetry": HEAVY + ("numpy",),
+    "Utils.RiskModels": HEAVY,
+    "Utils.StreamlitCache": ("langchain_core", "langchain_groq", "plotly")
+}
+
+_PROBE = """
+import json, sys
+try:
+    import {module}
+except ModuleNotFoundError as e:
+    if not e.name or e.name.split('.')[0] == 'Utils':
+        raise
+    print(json.dumps({{'missing': e.name}}))
+else:
+    print(json.dumps({{'loaded': sorted({{name.split('.')[0] for name in sys.modules}})}}))
+"""
+
+
+class MissingDependency(ImportError):
+    """A third-party package the module needs is not installed"""
+
+
+def profile(module):
+    """``(total_us, direct imports as [(cumulative_us, name)], loaded packages)`` of importing ``module`` cold
+
+    Raises MissingDependency when a third-party package is not installed and
+    RuntimeError when the import fails for any other reason.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    if "missing" in probe:
+        raise MissingDependency(f"{probe['missing']} is not installed")
+    total, top, children = 0, [], []
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package (indented two spaces per level)
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            # A package's imports are printed just before the package itself
+            if name.strip() == module:
+                total, top = int(cumulative), sorted(children, reverse=True)
+            children = []
+    return total, top, set(probe["loaded"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail when a module imports too slowly or loads heavy libraries")
+    parser.add_argument("modules", nargs="*", help="modules to check (default: all with a budget)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, e.g. for slow CI machines")
+    parser.add_argument("--top", type=int, default=5, help="largest direct imports to list per module")
+    args = parser.parse_args()
+
+    violations = []
+    for module in args.modules or IMPORT_BUDGET_MS:
+        try:
+            total, top, loaded = profile(module)
+        except MissingDependency as e:
+            print(f"  {module:<26} skipped ({e})")
+            continue
+        except RuntimeError as e:
+            print(f"  {module:<26} FAILED ({e})")
+            violations.append(module)
+            continue
+        budget = IMPORT_BUDGET_MS.get(module, float("inf")) * args.scale
+        heavy = sorted(loaded.intersection(FORBIDDEN.get(module, ())))
+        status = "ok"
+        if total / 1000 > budget:
+            status = "OVER BUDGET"
+            violations.append(module)
+        if heavy:
+            status += f", loads {', '.join(heavy)}"
+            violations.append(module)
+        print(f"  {module:<26} {total / 1000:8.1f} ms / {budget:6.0f} ms  {status}")
+        for us, name in top[:args.top]:
+            print(f"      {us / 1000:8.1f} ms  {name}")
+
+    if violations:
+        sys.exit(f"\nImport budget exceeded: {', '.join(dict.fromkeys(violations))}")
+
+
+if __name__ == "__main__":
+    main()
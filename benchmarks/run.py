@@ -0,0 +1,181 @@
+"""
+Run the asv-style benchmark suite and keep one result file per commit
+
+Benchmarks are classes in benchmarks/bench_*.py with ``time_*`` methods and
+optional ``setup``/``params``/``param_names``, the layout asv uses. Results
+go to benchmarks/results/<commit>.json; comparing against an earlier
+commit's file flags every benchmark that got slower than the threshold and
+exits with status 1, so CI can fail on regressions.
+
+Examples:
+    python benchmarks/run.py
+    python benchmarks/run.py -k ProgressTrends --quick
+    python benchmarks/run.py --compare HEAD~1
+"""
+
+import argparse
+import datetime
+import glob
+import importlib.util
+import inspect
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Target wall time of one timing sample
+SAMPLE_SECONDS = 0.05
+
+
+def git(*args):
+    return subprocess.run(["git", *args], cwd=BENCH_DIR, capture_output=True, text=True).stdout.strip()
+
+
+def discover(pattern=None):
+    """``(name, cls, method, params)`` of every benchmark whose name contains ``pattern``"""
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, "bench_*.py"))):
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        for class_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module_name:
+                continue
+            params = list(itertools.product(*getattr(cls, "params", [])))
+            for method in sorted(m for m in vars(cls) if m.startswith("time_")):
+                for combination in params:
+                    name = f"{module_name}.{class_name}.{method}"
+                    if combination:
+                        name += f"({', '.join(map(str, combination))})"
+                    if pattern is None or pattern in name:
+                        yield name, cls, method, combination
+
+
+def measure(fn, repeat):
+    """Per-call seconds of ``fn`` for ``repeat`` samples of about SAMPLE_SECONDS each"""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * SAMPLE_SECONDS / max(elapsed, 1e-9)))
+    samples = np.array(timer.repeat(repeat=repeat, number=number)) / number
+    return {
+        "median": float(np.median(samples)),
+        "min": float(samples.min()),
+        "iqr": float(np.subtract(*np.percentile(samples, [75, 25]))),
+        "number": number,
+        "repeat": repeat
+    }
+
+
+def run(pattern=None, repeat=5):
+    results = {}
+    for name, cls, method, params in discover(pattern):
+        instance = cls()
+        try:
+            if hasattr(instance, "setup"):
+                instance.setup(*params)
+        except NotImplementedError:
+            # asv convention: setup raising NotImplementedError skips the case
+            continue
+        bound = getattr(instance, method)
+        try:
+            results[name] = measure(lambda: bound(*params), repeat)
+        except Exception as e:
+            print(f"  {name:<90} failed: {e!r}", flush=True)
+            continue
+        print(f"  {name:<90} {format_seconds(results[name]['median'])}", flush=True)
+    return results
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def result_path(revision):
+    commit = git("rev-parse", "--short=10", revision)
+    if not commit:
+        sys.exit(f"Unknown revision: {revision}")
+    return os.path.join(RESULTS_DIR, f"{commit}.json")
+
+
+def save(results):
+    commit = git("rev-parse", "--short=10", "HEAD")
+    payload = {
+        "commit": commit,
+        # Numbers from a modified tree do not describe the commit
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "results": results
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{commit}.json")
+    # Keep results of benchmarks that were not re-run (e.g. with -k)
+    if os.path.exists(path):
+        with open(path) as f:
+            payload["results"] = {**json.load(f)["results"], **results}
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    return path
+
+
+def compare(baseline, results, threshold):
+    """Print before/after for shared benchmarks; returns the names that regressed"""
+    print(f"\nCompared with {baseline['commit']} ({baseline['date']}, {baseline['machine']}):")
+    regressions = []
+    for name, current in sorted(results.items()):
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = current["median"] / before["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            flag = "  faster"
+        print(f"  {name:<90} {format_seconds(before['median'])} -> {format_seconds(current['median'])}"
+              f"  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare against earlier commits")
+    parser.add_argument("-k", dest="pattern", help="only benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="timing samples per benchmark")
+    parser.add_argument("--quick", action="store_true", help="one sample per benchmark, results not saved")
+    parser.add_argument("--compare", metavar="REV", help="commit whose saved results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown reported as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        path = result_path(args.compare)
+        if not os.path.exists(path):
+            sys.exit(f"No saved results for {args.compare}; check it out and run the suite there first")
+        # Read before saving, which may overwrite the same file
+        with open(path) as f:
+            baseline = json.load(f)
+
+    results = run(args.pattern, repeat=1 if args.quick else args.repeat)
+    if not args.quick:
+        print(f"\nSaved {save(results)}")
+    if baseline and compare(baseline, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,14 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import json
+import time
 from dotenv import load_dotenv
-from Utils.CardioAgents import (
-    RiskCalculator, ECGAnalyzer, LabAnalyzer,
-    SymptomAnalyzer, TreatmentAdvisor, ProgressTracker
-)
+from Utils.RiskModels import get_risk_model, risk_model_info
+from Utils.Telemetry import get_telemetry
+# Plotly, pandas, the agents and the measurement store are imported inside the
+# pages that use them, so a fresh worker renders its first page without them
 
 # Load environment
 load_dotenv(dotenv_path='apikey.env')
@@ -286,52 +284,19 @@ if 'ecg_analysis' not in st.session_state:
     st.session_state.ecg_analysis = None
 if 'ecg_problems' not in st.session_state:
     st.session_state.ecg_problems = []
+if 'ecg_record' not in st.session_state:
+    st.session_state.ecg_record = None
+if 'lab_analysis' not in st.session_state:
+    st.session_state.lab_analysis = None
 if 'recommendations' not in st.session_state:
     st.session_state.recommendations = None
-if 'progress_tracker' not in st.session_state:
-    st.session_state.progress_tracker = ProgressTracker()
+if 'patient_id' not in st.session_state:
+    st.session_state.patient_id = "default"
 if 'current_risk_model' not in st.session_state:
     st.session_state.current_risk_model = 'Framingham'
 
 # Risk model information
-RISK_MODELS = {
-    'Framingham': {
-        'name': 'Framingham Risk Score',
-        'description': 'Predicts 10-year risk of cardiovascular disease. Developed from the Framingham Heart Study.',
-        'best_for': 'General population, ages 30-74',
-        'factors': ['Age', 'Gender', 'Total Cholesterol', 'HDL', 'Blood Pressure', 'Smoking', 'Diabetes'],
-        'interpretation': {
-            'low': '<10% - Low risk, continue healthy lifestyle',
-            'moderate': '10-20% - Moderate risk, lifestyle changes recommended',
-            'high': '20-30% - High risk, medication may be needed',
-            'very_high': '>30% - Very high risk, aggressive treatment required'
-        }
-    },
-    'ASCVD': {
-        'name': 'ASCVD Risk Calculator',
-        'description': 'Estimates 10-year risk of atherosclerotic cardiovascular disease. ACC/AHA guideline.',
-        'best_for': 'Adults 40-79 without existing CVD',
-        'factors': ['Age', 'Gender', 'Race', 'Total Cholesterol', 'HDL', 'Blood Pressure', 'Diabetes', 'Smoking', 'Treatment'],
-        'interpretation': {
-            'low': '<5% - Low risk, lifestyle modifications',
-            'borderline': '5-7.5% - Borderline risk, consider risk enhancers',
-            'intermediate': '7.5-20% - Intermediate risk, statin therapy recommended',
-            'high': '>20% - High risk, high-intensity statin therapy'
-        }
-    },
-    'SCORE2': {
-        'name': 'SCORE2 (European)',
-        'description': 'European cardiovascular risk assessment. Predicts 10-year risk of CVD death and events.',
-        'best_for': 'European populations, ages 40-69',
-        'factors': ['Age', 'Gender', 'Smoking', 'Systolic BP', 'Total Cholesterol', 'HDL'],
-        'interpretation': {
-            'low': '<5% - Low risk, healthy lifestyle',
-            'moderate': '5-10% - Moderate risk, lifestyle intervention',
-            'high': '10-15% - High risk, consider drug therapy',
-            'very_high': '>15% - Very high risk, intensive treatment'
-        }
-    }
-}
+RISK_MODELS = risk_model_info()
 
 # Sidebar
 with st.sidebar:
@@ -359,7 +324,7 @@ with st.sidebar:
     
     risk_model = st.selectbox(
         "Select Risk Model",
-        ["Framingham", "ASCVD", "SCORE2"],
+        list(RISK_MODELS),
         help="Different models for different populations"
     )
     
@@ -379,6 +344,22 @@ with st.sidebar:
         ["llama-3.3-70b-versatile", "mixtral-8x7b-32768"]
     )
     
+    usage = get_telemetry().summary()
+    if usage:
+        import pandas as pd
+        with st.expander("📈 AI Usage"):
+            st.dataframe(pd.DataFrame([
+                {
+                    'Agent': role,
+                    'Calls': stats['calls'],
+                    'Cache hits': f"{stats['cache_hit_rate']:.0%}",
+                    'p95 (s)': round(stats['p95_latency'], 2),
+                    'Tokens': stats['prompt_tokens'] + stats['completion_tokens'],
+                    'Cost ($)': round(stats['cost_usd'], 4)
+                }
+                for role, stats in usage.items()
+            ]), hide_index=True, use_container_width=True)
+    
     st.markdown("---")
     if st.session_state.patient_data:
         st.markdown("### 📊 Quick Stats")
@@ -401,29 +382,30 @@ st.markdown('<h1 class="main-header">🫀 CardioAI Ultimate</h1>', unsafe_allow_
 st.markdown('<p class="sub-header">AI-Powered Cardiovascular Risk Assessment with 3D Visualization</p>', unsafe_allow_html=True)
 
 
-from Utils.VisualHelpers import (
-    create_risk_gauge, create_ecg_waveform, create_3d_heart_model,
-    create_lipid_panel_chart, create_trend_chart, create_risk_factor_radar
-)
+# Agents built once per inputs; the memoized figure builders are imported per page
+from Utils.StreamlitCache import get_agent
+from Utils.ECGSignal import load_uploaded_ecg, analyze_ecg, format_measurements
+from Utils.AnalysisJobs import get_analysis_runner
+import hashlib
 import streamlit.components.v1 as components
 
+# Helper function to show live progress of a background analysis
+def wait_for_job(job, label):
+    progress = st.progress(job.progress, text=f"{label}...")
+    while not job.wait(timeout=0.1):
+        progress.progress(job.progress, text=f"{label}: waiting for {', '.join(job.pending)}")
+    progress.empty()
+
+
+# Helper function to summarize step timings of a finished analysis
+def format_timings(job):
+    steps = " · ".join(f"{name} {job.timings[name]:.2f} s" for name in job.step_names)
+    return f"⏱️ Analysis time {job.elapsed:.2f} s ({steps})"
+
+
 # Helper function to get risk category based on model
 def get_risk_category(risk_pct, model):
-    if model == 'Framingham':
-        if risk_pct < 10: return 'Low', 'risk-low'
-        elif risk_pct < 20: return 'Moderate', 'risk-moderate'
-        elif risk_pct < 30: return 'High', 'risk-high'
-        else: return 'Very High', 'risk-critical'
-    elif model == 'ASCVD':
-        if risk_pct < 5: return 'Low', 'risk-low'
-        elif risk_pct < 7.5: return 'Borderline', 'risk-moderate'
-        elif risk_pct < 20: return 'Intermediate', 'risk-high'
-        else: return 'High', 'risk-critical'
-    else:  # SCORE2
-        if risk_pct < 5: return 'Low', 'risk-low'
-        elif risk_pct < 10: return 'Moderate', 'risk-moderate'
-        elif risk_pct < 15: return 'High', 'risk-high'
-        else: return 'Very High', 'risk-critical'
+    return get_risk_model(model).category(risk_pct)
 
 # Page: Dashboard
 if page == "🏠 Dashboard":
@@ -436,6 +418,8 @@ if page == "🏠 Dashboard":
             if st.button("➡️ Go to Patient Profile", type="primary", use_container_width=True):
                 st.rerun()
     else:
+        from Utils.StreamlitCache import create_risk_gauge, create_risk_factor_radar
+        
         # Quick stats row with animations
         col1, col2, col3, col4 = st.columns(4)
         
@@ -670,26 +654,27 @@ elif page == "👤 Patient Profile":
                 'ldl': st.session_state.lab_results.get('ldl', 130)
             }
             
+            from Utils.CardioAgents import RiskCalculator
+            from Utils.MeasurementStore import get_measurement_store
+            
             # Calculate risk score based on selected model
             with st.spinner(f"Calculating risk using {st.session_state.current_risk_model} model..."):
-                calculator = RiskCalculator(st.session_state.patient_data, model_name=ai_model)
-                framingham = calculator.calculate_framingham_score()
-                
-                # Adjust for different models
-                if st.session_state.current_risk_model == 'ASCVD':
-                    # ASCVD typically gives lower risk for same profile
-                    framingham['risk_percentage'] = framingham['risk_percentage'] * 0.7
-                elif st.session_state.current_risk_model == 'SCORE2':
-                    # SCORE2 European model
-                    framingham['risk_percentage'] = framingham['risk_percentage'] * 0.6
-                
-                st.session_state.risk_assessment = framingham
+                calculator = get_agent(RiskCalculator, st.session_state.patient_data, model_name=ai_model)
+                st.session_state.risk_assessment = calculator.calculate_risk(st.session_state.current_risk_model)
+            
+            # Keep a dated copy of today's values for progress tracking
+            data = st.session_state.patient_data
+            get_measurement_store().add_measurement(st.session_state.patient_id, datetime.now(), {
+                'systolic': data['systolic'], 'diastolic': data['diastolic'], 'weight': data['weight'],
+                'total_cholesterol': data['total_cholesterol'], 'hdl': data['hdl'], 'ldl': data['ldl'],
+                'cvd_risk': st.session_state.risk_assessment['risk_percentage']
+            })
             
             st.success("✅ Profile saved and risk calculated successfully!")
             st.balloons()
             
             # Show risk result
-            risk_pct = framingham['risk_percentage']
+            risk_pct = st.session_state.risk_assessment['risk_percentage']
             category, css_class = get_risk_category(risk_pct, st.session_state.current_risk_model)
             
             st.markdown(f"### 🎯 Your 10-Year CVD Risk: **{risk_pct:.1f}%** ({category})")
@@ -702,6 +687,9 @@ elif page == "👤 Patient Profile":
 
 # Page: ECG Analysis
 elif page == "📈 ECG Analysis":
+    from Utils.CardioAgents import ECGAnalyzer
+    from Utils.StreamlitCache import create_ecg_trace, create_ecg_waveform, create_3d_heart_model
+    
     st.markdown("## 📈 ECG Analysis & Rhythm Assessment")
     
     st.info("💡 Upload ECG data or paste ECG readings for AI-powered analysis with 3D heart visualization")
@@ -718,7 +706,13 @@ elif page == "📈 ECG Analysis":
                 placeholder="Example:\nHeart Rate: 72 bpm\nRhythm: Normal sinus rhythm\nPR Interval: 160 ms\nQRS Duration: 90 ms\nQT/QTc: 400/420 ms\nST Segment: Normal\nT Wave: Normal\n..."
             )
             
-            uploaded_file = st.file_uploader("Or upload ECG file", type=['txt', 'pdf', 'jpg', 'png'])
+            uploaded_files = st.file_uploader(
+                "Or upload ECG file (CSV/TXT samples, or WFDB .hea + .dat)",
+                type=['txt', 'csv', 'dat', 'hea', 'pdf', 'jpg', 'png'],
+                accept_multiple_files=True
+            )
+            ecg_sampling_rate = st.number_input("Sampling rate (Hz) for files without a time column",
+                                                min_value=50, max_value=2000, value=250)
         
         with col2:
             st.markdown("### 📋 ECG Parameters")
@@ -738,43 +732,94 @@ elif page == "📈 ECG Analysis":
             """)
         
         if st.button("🔍 Analyze ECG", type="primary", use_container_width=True):
-            if ecg_input or uploaded_file:
-                with st.spinner("Analyzing ECG data with AI..."):
-                    # Simulate AI analysis
-                    import time
-                    time.sleep(2)
-                    
-                    # Parse ECG data for problems
-                    problems = []
-                    if 'elevated' in ecg_input.lower() or 'elevation' in ecg_input.lower():
-                        problems.append({
-                            'area': 'Left Ventricle',
-                            'description': 'ST segment elevation detected - possible acute myocardial infarction',
-                            'severity': 'critical'
-                        })
-                    if 'irregular' in ecg_input.lower():
-                        problems.append({
-                            'area': 'Atria',
-                            'description': 'Irregular rhythm detected - possible atrial fibrillation',
-                            'severity': 'moderate'
-                        })
-                    if 'prolonged' in ecg_input.lower() and 'qt' in ecg_input.lower():
-                        problems.append({
-                            'area': 'Ventricular Conduction',
-                            'description': 'Prolonged QT interval - increased risk of arrhythmia',
-                            'severity': 'high'
-                        })
-                    
-                    st.session_state.ecg_analysis = {
-                        'rhythm': 'Normal Sinus Rhythm' if not problems else 'Abnormal Rhythm',
-                        'rate': 72,
-                        'abnormalities': [p['description'] for p in problems],
-                        'risk_level': 'Critical' if any(p['severity'] == 'critical' for p in problems) else 'Moderate' if problems else 'Low'
-                    }
-                    st.session_state.ecg_problems = problems
-                    
-                    st.success("✅ ECG analysis complete!")
-                    st.rerun()
+            if ecg_input or uploaded_files:
+                uploads = [(f.name, f.getvalue()) for f in uploaded_files or []]
+                gender = st.session_state.patient_data.get('gender', 'Male')
+
+                def measure_waveform(job):
+                    # Measure a recorded waveform when one was uploaded
+                    record = load_uploaded_ecg(uploads, ecg_sampling_rate)
+                    if record is None:
+                        return None
+                    return {'measurements': analyze_ecg(record, sex=gender), 'record': record}
+
+                def interpret(job):
+                    measured = job.result_of("Waveform measurement")
+                    report = ecg_input
+                    if measured and 'measurements' in measured:
+                        report = f"{report}\n\n{format_measurements(measured['measurements'])}".strip()
+                    return ECGAnalyzer(report, model_name=ai_model).analyze() if report else None
+
+                job = get_analysis_runner().submit(
+                    "ecg",
+                    {
+                        'text': ecg_input, 'sampling_rate': ecg_sampling_rate, 'model': ai_model, 'gender': gender,
+                        'files': [(name, hashlib.sha256(data).hexdigest()) for name, data in uploads]
+                    },
+                    {"Waveform measurement": measure_waveform, "AI interpretation": interpret}
+                )
+                wait_for_job(job, "Analyzing ECG")
+
+                measured = job.results["Waveform measurement"]
+                ai_analysis = job.results["AI interpretation"]
+                if measured and 'error' in measured:
+                    st.warning(f"⚠️ Could not read ECG waveform: {measured['error']}")
+                    measured = None
+                if ai_analysis and 'error' in ai_analysis:
+                    st.warning(f"⚠️ AI interpretation unavailable: {ai_analysis['error']}")
+                    ai_analysis = None
+                measurements = measured['measurements'] if measured else None
+
+                # Parse ECG data for problems
+                problems = []
+                if 'elevated' in ecg_input.lower() or 'elevation' in ecg_input.lower():
+                    problems.append({
+                        'area': 'Left Ventricle',
+                        'description': 'ST segment elevation detected - possible acute myocardial infarction',
+                        'severity': 'critical'
+                    })
+                if 'irregular' in ecg_input.lower():
+                    problems.append({
+                        'area': 'Atria',
+                        'description': 'Irregular rhythm detected - possible atrial fibrillation',
+                        'severity': 'moderate'
+                    })
+                if 'prolonged' in ecg_input.lower() and 'qt' in ecg_input.lower():
+                    problems.append({
+                        'area': 'Ventricular Conduction',
+                        'description': 'Prolonged QT interval - increased risk of arrhythmia',
+                        'severity': 'high'
+                    })
+
+                if measurements:
+                    known = {p['description'] for p in problems}
+                    problems += [p for p in measurements['problems'] if p['description'] not in known]
+                st.session_state.ecg_record = measured['record'] if measured else None
+
+                abnormalities = [p['description'] for p in problems]
+                if ai_analysis:
+                    abnormalities += [a for a in ai_analysis.get('abnormalities', []) if a not in abnormalities]
+
+                if measurements:
+                    rhythm, rate = measurements['rhythm'], measurements['heart_rate']
+                elif ai_analysis:
+                    rhythm, rate = ai_analysis.get('rhythm', 'Undetermined'), ai_analysis.get('heart_rate')
+                else:
+                    rhythm, rate = 'Normal Sinus Rhythm' if not problems else 'Abnormal Rhythm', None
+
+                st.session_state.ecg_analysis = {
+                    'rhythm': rhythm,
+                    'rate': rate,
+                    'abnormalities': abnormalities,
+                    'risk_level': 'Critical' if any(p['severity'] == 'critical' for p in problems) else 'Moderate' if problems else 'Low',
+                    'measurements': measurements,
+                    'ai_analysis': ai_analysis,
+                    'timings': format_timings(job)
+                }
+                st.session_state.ecg_problems = problems
+
+                st.success("✅ ECG analysis complete!")
+                st.rerun()
             else:
                 st.error("Please provide ECG data")
     
@@ -787,11 +832,24 @@ elif page == "📈 ECG Analysis":
             with col1:
                 st.metric("Rhythm", st.session_state.ecg_analysis['rhythm'])
             with col2:
-                st.metric("Heart Rate", f"{st.session_state.ecg_analysis['rate']} bpm")
+                rate = st.session_state.ecg_analysis['rate']
+                st.metric("Heart Rate", f"{rate:g} bpm" if rate else "—")
             with col3:
                 risk_level = st.session_state.ecg_analysis['risk_level']
                 st.metric("Risk Level", risk_level)
             
+            measurements = st.session_state.ecg_analysis.get('measurements')
+            if measurements:
+                st.markdown(f"### 📏 Measured Intervals ({measurements['beats']} beats, {measurements['duration_s']} s)")
+                col1, col2, col3, col4, col5 = st.columns(5)
+                for column, label, key in [
+                    (col1, "PR", 'pr_ms'), (col2, "QRS", 'qrs_ms'), (col3, "QT", 'qt_ms'),
+                    (col4, "QTc (Bazett)", 'qtc_ms'), (col5, "SDNN", 'sdnn_ms')
+                ]:
+                    with column:
+                        value = measurements.get(key)
+                        st.metric(label, f"{value} ms" if value is not None else "—")
+            
             # ECG waveform visualization
             st.markdown("### 📊 ECG Waveform")
             
@@ -802,9 +860,23 @@ elif page == "📈 ECG Analysis":
                 if any('elevation' in p['description'].lower() for p in st.session_state.ecg_problems):
                     abnormalities.append('elevated_st')
             
-            fig_ecg = create_ecg_waveform(duration=4, heart_rate=72, abnormalities=abnormalities if abnormalities else None)
+            if st.session_state.ecg_record is not None:
+                # Only the viewed window is read; the chart downsamples it to the plot width
+                record = st.session_state.ecg_record
+                fs = record.sampling_rate
+                view = (0.0, record.duration)
+                if record.duration > 10:
+                    view = st.slider("View window (seconds)", 0.0, float(record.duration),
+                                     (0.0, 10.0), step=0.1 if record.duration <= 60 else 1.0)
+                fig_ecg = create_ecg_trace(record.read(int(view[0] * fs), int(view[1] * fs)), fs, start=view[0])
+            else:
+                fig_ecg = create_ecg_waveform(duration=4, heart_rate=st.session_state.ecg_analysis['rate'] or 72,
+                                              abnormalities=abnormalities if abnormalities else None)
             st.plotly_chart(fig_ecg, use_container_width=True)
             
+            if st.session_state.ecg_analysis.get('timings'):
+                st.caption(st.session_state.ecg_analysis['timings'])
+            
             # Findings
             st.markdown("### 📋 Findings")
             
@@ -815,6 +887,17 @@ elif page == "📈 ECG Analysis":
                 st.success("✅ Normal sinus rhythm detected")
                 st.info("ℹ️ No significant abnormalities identified")
             
+            ai_analysis = st.session_state.ecg_analysis.get('ai_analysis')
+            if ai_analysis:
+                with st.expander("🤖 AI Interpretation", expanded=True):
+                    st.markdown(f"**Severity:** {ai_analysis.get('severity', 'N/A')}")
+                    if ai_analysis.get('clinical_significance'):
+                        st.markdown(ai_analysis['clinical_significance'])
+                    for finding in ai_analysis.get('urgent_findings', []):
+                        st.error(f"🚨 {finding}")
+                    for rec in ai_analysis.get('recommendations', []):
+                        st.markdown(f"- {rec}")
+            
             # Recommendations
             if st.session_state.ecg_problems:
                 st.markdown("### 💊 Recommendations")
@@ -843,6 +926,9 @@ elif page == "📈 ECG Analysis":
 
 # Page: Lab Results
 elif page == "🧪 Lab Results":
+    from Utils.CardioAgents import LabAnalyzer
+    from Utils.StreamlitCache import create_lipid_panel_chart
+    
     st.markdown("## 🧪 Laboratory Results Analyzer")
     
     tab1, tab2 = st.tabs(["📝 Enter Lab Results", "📊 View Analysis"])
@@ -935,14 +1021,31 @@ elif page == "🧪 Lab Results":
                 'crp': crp
             }
             
-            with st.spinner("Analyzing lab results with AI..."):
-                import time
-                time.sleep(2)
-                
-                # Update patient data with lab results
-                if st.session_state.patient_data:
-                    st.session_state.patient_data.update(st.session_state.lab_results)
-                
+            lipids = {k: st.session_state.lab_results[k] for k in ('total_cholesterol', 'ldl', 'hdl', 'triglycerides')}
+            biomarkers = {k: st.session_state.lab_results[k] for k in ('troponin', 'bnp', 'crp')}
+            job = get_analysis_runner().submit(
+                "labs",
+                {'labs': st.session_state.lab_results, 'model': ai_model},
+                {
+                    "Lipid panel": lambda job: LabAnalyzer(lipids, model_name=ai_model).analyze_lipid_panel(),
+                    "Cardiac biomarkers": lambda job: LabAnalyzer(biomarkers, model_name=ai_model).analyze_cardiac_biomarkers()
+                }
+            )
+            wait_for_job(job, "Analyzing lab results")
+            
+            st.session_state.lab_analysis = {
+                'lipid_panel': job.results["Lipid panel"],
+                'biomarkers': job.results["Cardiac biomarkers"],
+                'timings': format_timings(job)
+            }
+            
+            # Update patient data with lab results
+            if st.session_state.patient_data:
+                st.session_state.patient_data.update(st.session_state.lab_results)
+            
+            if job.failed:
+                st.warning("⚠️ Lab values saved, but the AI analysis did not complete")
+            else:
                 st.success("✅ Lab results analyzed successfully!")
                 st.balloons()
     
@@ -1020,6 +1123,26 @@ elif page == "🧪 Lab Results":
                 else:
                     st.error(f"🔴 CRP: {crp:.1f} mg/L (High Risk)")
             
+            lab_analysis = st.session_state.lab_analysis
+            if lab_analysis:
+                st.markdown("---")
+                st.markdown("### 🤖 AI Interpretation")
+                st.caption(lab_analysis['timings'])
+                
+                col1, col2 = st.columns(2)
+                for column, title, result, level_key in [
+                    (col1, "Lipid Panel", lab_analysis['lipid_panel'], 'risk_assessment'),
+                    (col2, "Cardiac Biomarkers", lab_analysis['biomarkers'], 'acute_event_risk')
+                ]:
+                    with column:
+                        st.markdown(f"#### {title}")
+                        if 'error' in result:
+                            st.warning(f"⚠️ Analysis unavailable: {result['error']}")
+                            continue
+                        st.metric("Risk", str(result.get(level_key, 'N/A')).title())
+                        for rec in result.get('recommendations', []):
+                            st.markdown(f"- {rec}")
+            
             st.markdown("---")
             st.markdown("### 💊 Treatment Recommendations")
             
@@ -1059,6 +1182,11 @@ elif page == "🎯 Risk Assessment":
     if not st.session_state.patient_data:
         st.warning("⚠️ Please complete your Patient Profile first!")
     else:
+        import pandas as pd
+        import plotly.express as px
+        from Utils.CardioAgents import RiskCalculator
+        from Utils.StreamlitCache import create_risk_gauge
+        
         # Show current model
         st.info(f"📊 Using **{RISK_MODELS[st.session_state.current_risk_model]['name']}** for risk calculation")
         
@@ -1075,16 +1203,8 @@ elif page == "🎯 Risk Assessment":
         with col2:
             if st.button("🔄 Recalculate Risk", type="primary", use_container_width=True):
                 with st.spinner(f"Calculating risk using {st.session_state.current_risk_model}..."):
-                    calculator = RiskCalculator(st.session_state.patient_data, model_name=ai_model)
-                    framingham = calculator.calculate_framingham_score()
-                    
-                    # Adjust for different models
-                    if st.session_state.current_risk_model == 'ASCVD':
-                        framingham['risk_percentage'] = framingham['risk_percentage'] * 0.7
-                    elif st.session_state.current_risk_model == 'SCORE2':
-                        framingham['risk_percentage'] = framingham['risk_percentage'] * 0.6
-                    
-                    st.session_state.risk_assessment = framingham
+                    calculator = get_agent(RiskCalculator, st.session_state.patient_data, model_name=ai_model)
+                    st.session_state.risk_assessment = calculator.calculate_risk(st.session_state.current_risk_model)
                     st.success("✅ Risk recalculated!")
                     st.rerun()
             
@@ -1108,16 +1228,13 @@ elif page == "🎯 Risk Assessment":
         
         if st.button("🔄 Calculate with All Models"):
             with st.spinner("Calculating with all three models..."):
-                calculator = RiskCalculator(st.session_state.patient_data, model_name=ai_model)
-                base_risk = calculator.calculate_framingham_score()
+                calculator = get_agent(RiskCalculator, st.session_state.patient_data, model_name=ai_model)
+                risks = calculator.compare_risk_models()
                 
                 comparison_data = {
-                    'Model': ['Framingham', 'ASCVD', 'SCORE2'],
-                    'Risk (%)': [
-                        base_risk['risk_percentage'],
-                        base_risk['risk_percentage'] * 0.7,
-                        base_risk['risk_percentage'] * 0.6
-                    ]
+                    'Model': list(risks),
+                    'Risk (%)': list(risks.values()),
+                    'Category': [get_risk_category(risk, model)[0] for model, risk in risks.items()]
                 }
                 
                 df = pd.DataFrame(comparison_data)
@@ -1143,7 +1260,9 @@ elif page == "🎯 Risk Assessment":
                 
                 st.plotly_chart(fig, use_container_width=True)
                 
-                st.info("💡 Different models use different populations and factors, which is why results vary.")
+                st.dataframe(df, hide_index=True, use_container_width=True)
+                st.info("💡 Different models use different populations and factors, which is why results vary. "
+                        "Compare each result against its own model's thresholds.")
 
 # Page: Recommendations
 elif page == "💊 Recommendations":
@@ -1152,16 +1271,55 @@ elif page == "💊 Recommendations":
     if not st.session_state.patient_data or not st.session_state.risk_assessment:
         st.warning("⚠️ Please complete Patient Profile and Risk Assessment first!")
     else:
+        from Utils.CardioAgents import TreatmentAdvisor
+        from Utils.StreamlitCache import create_whatif_tornado, create_whatif_heatmap
+        from Utils.WhatIf import WhatIfSimulator
+        
         if st.button("🔄 Generate Recommendations", type="primary", use_container_width=True):
-            with st.spinner("Generating personalized recommendations with AI..."):
-                advisor = TreatmentAdvisor(
-                    st.session_state.patient_data,
-                    st.session_state.risk_assessment,
-                    model_name=ai_model
-                )
-                recommendations = advisor.get_recommendations()
-                st.session_state.recommendations = recommendations
-                st.success("✅ Recommendations generated!")
+            advisor = get_agent(
+                TreatmentAdvisor,
+                st.session_state.patient_data,
+                st.session_state.risk_assessment,
+                model_name=ai_model
+            )
+            
+            # Show each section as soon as the model finishes writing it
+            live = st.empty()
+            live.info("⏳ Generating personalized recommendations with AI...")
+            section_titles = {
+                'lifestyle_modifications': "🏃 Lifestyle Modifications",
+                'medications': "💊 Medications",
+                'monitoring': "📊 Monitoring",
+                'goals': "🎯 Goals",
+                'priority_actions': "⚡ Priority Actions"
+            }
+            streamed = {}
+            
+            def show_section(name, value):
+                if name not in section_titles:
+                    return
+                streamed[name] = value
+                with live.container():
+                    st.caption(f"Streaming… {len(streamed)} of {len(section_titles)} sections")
+                    for key, title in section_titles.items():
+                        if key not in streamed:
+                            continue
+                        st.markdown(f"**{title}**")
+                        section = streamed[key]
+                        if isinstance(section, dict):
+                            for label, items in section.items():
+                                items = items if isinstance(items, list) else [items]
+                                st.markdown(f"- *{label.replace('_', ' ').title()}:* {'; '.join(map(str, items[:3]))}")
+                        elif isinstance(section, list):
+                            for item in section[:5]:
+                                st.markdown(f"- {item}")
+                        else:
+                            st.markdown(str(section))
+            
+            recommendations = advisor.stream_recommendations(on_section=show_section)
+            live.empty()
+            st.session_state.recommendations = recommendations
+            st.success("✅ Recommendations generated!")
         
         if st.session_state.recommendations:
             rec = st.session_state.recommendations
@@ -1252,60 +1410,173 @@ elif page == "💊 Recommendations":
                     st.metric("Exercise Target", goals.get('exercise', '150 min/week'))
         else:
             st.info("Click 'Generate Recommendations' to see personalized treatment plan")
+        
+        st.markdown("---")
+        
+        # What-if simulator: local vectorized risk math, no AI calls
+        st.markdown("### 🧪 What-If Simulator")
+        st.caption("See how your 10-year risk would change if you reach your goals")
+        
+        patient = st.session_state.patient_data
+        risk_model = st.session_state.current_risk_model
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            sbp_drop = st.slider("Lower systolic BP by (mmHg)", 0, 40, 0, step=5)
+        with col2:
+            chol_drop = st.slider("Lower total cholesterol by (mg/dL)", 0, 80, 0, step=10)
+        with col3:
+            hdl_gain = st.slider("Raise HDL by (mg/dL)", 0, 20, 0, step=5)
+        with col4:
+            quit_smoking = st.checkbox("Quit smoking", disabled=patient.get('smoking') != 'Current')
+        
+        scenario = {'systolic': -sbp_drop, 'total_cholesterol': -chol_drop, 'hdl': hdl_gain}
+        if quit_smoking:
+            scenario['smoking'] = 'Former'
+        
+        start = time.perf_counter()
+        simulator = WhatIfSimulator(patient, risk_model)
+        scenario_risk = float(simulator.simulate([scenario])[0])
+        tornado = simulator.tornado()
+        sbp_steps = list(range(0, -45, -5))
+        chol_steps = list(range(0, -90, -10))
+        others = {k: v for k, v in scenario.items() if k not in ('systolic', 'total_cholesterol')}
+        risk_map = simulator.heatmap('systolic', sbp_steps, 'total_cholesterol', chol_steps, extra=others)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Current Risk", f"{simulator.base_risk:.1f}%")
+        with col2:
+            st.metric("With These Changes", f"{scenario_risk:.1f}%",
+                      delta=f"{scenario_risk - simulator.base_risk:+.1f}%", delta_color="inverse")
+        with col3:
+            st.metric("Category", get_risk_category(scenario_risk, risk_model)[0])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(create_whatif_tornado(simulator.base_risk, tornado, risk_model), use_container_width=True)
+            unmodelled = simulator.unmodelled()
+            if unmodelled:
+                st.caption(f"Not modelled by {risk_model}: {', '.join(unmodelled)}")
+        with col2:
+            st.plotly_chart(create_whatif_heatmap(
+                risk_map, [str(x) for x in sbp_steps], [str(y) for y in chol_steps],
+                "Systolic BP change (mmHg)", "Total cholesterol change (mg/dL)", risk_model
+            ), use_container_width=True)
+        
+        n_scenarios = 1 + len(tornado) + risk_map.size
+        st.caption(f"⚡ {n_scenarios} scenarios evaluated in {elapsed_ms:.1f} ms")
 
 # Page: Progress Tracking
 elif page == "📊 Progress Tracking":
-    st.markdown("## 📊 Progress Tracking & Trends")
-    
-    # Generate sample historical data
-    dates = pd.date_range(end=datetime.now(), periods=6, freq='M')
-    
-    st.markdown("### 📈 Health Metrics Over Time")
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Blood pressure trend
-        systolic_values = [135, 132, 128, 125, 122, 120]
-        fig_bp = create_trend_chart(dates, systolic_values, "Systolic BP (mmHg)", target=120)
-        st.plotly_chart(fig_bp, use_container_width=True)
-    
-    with col2:
-        # Cholesterol trend
-        chol_values = [220, 210, 200, 190, 185, 180]
-        fig_chol = create_trend_chart(dates, chol_values, "Total Cholesterol (mg/dL)", target=200)
-        st.plotly_chart(fig_chol, use_container_width=True)
+    from Utils.MeasurementStore import get_measurement_store
+    from Utils.StreamlitCache import create_trend_chart
     
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Weight trend
-        weight_values = [85, 83, 81, 79, 77, 75]
-        fig_weight = create_trend_chart(dates, weight_values, "Weight (kg)", target=70)
-        st.plotly_chart(fig_weight, use_container_width=True)
+    st.markdown("## 📊 Progress Tracking & Trends")
     
-    with col2:
-        # Risk score trend
-        risk_values = [18, 16, 14, 13, 12, 12]
-        fig_risk = create_trend_chart(dates, risk_values, "10-Year CVD Risk (%)", target=10)
-        st.plotly_chart(fig_risk, use_container_width=True)
+    store = get_measurement_store()
+    st.session_state.patient_id = st.text_input(
+        "Patient ID", value=st.session_state.patient_id,
+        help="Measurements are stored per patient; saving a profile records today's values"
+    ).strip() or "default"
+    patient_id = st.session_state.patient_id
     
-    st.markdown("---")
-    st.markdown("### 📊 Progress Summary")
-    
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("BP Improvement", "-15 mmHg", delta="-11%", delta_color="inverse")
-    with col2:
-        st.metric("Cholesterol Reduction", "-40 mg/dL", delta="-18%", delta_color="inverse")
-    with col3:
-        st.metric("Weight Loss", "-10 kg", delta="-12%", delta_color="inverse")
-    with col4:
-        st.metric("Risk Reduction", "-6%", delta="-33%", delta_color="inverse")
+    with st.expander("➕ Record Measurement"):
+        with st.form("measurement_form"):
+            data = st.session_state.patient_data
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                measured_on = st.date_input("Date", value=datetime.now().date())
+                m_systolic = st.number_input("Systolic BP (mmHg)", 70, 250, int(data.get('systolic', 120)))
+                m_diastolic = st.number_input("Diastolic BP (mmHg)", 40, 150, int(data.get('diastolic', 80)))
+            with col2:
+                m_weight = st.number_input("Weight (kg)", 20.0, 300.0, float(data.get('weight', 75)))
+                m_total = st.number_input("Total Cholesterol (mg/dL)", 0, 500, int(data.get('total_cholesterol', 200)))
+            with col3:
+                m_ldl = st.number_input("LDL (mg/dL)", 0, 400, int(data.get('ldl', 130)))
+                m_hdl = st.number_input("HDL (mg/dL)", 0, 200, int(data.get('hdl', 50)))
+            
+            if st.form_submit_button("💾 Save Measurement"):
+                store.add_measurement(patient_id, measured_on, {
+                    'systolic': m_systolic, 'diastolic': m_diastolic, 'weight': m_weight,
+                    'total_cholesterol': m_total, 'ldl': m_ldl, 'hdl': m_hdl
+                })
+                st.success("✅ Measurement saved")
+    
+    first, last = store.date_range(patient_id)
+    
+    if first is None:
+        st.info("No measurements recorded for this patient yet. Save a profile or record a measurement to start tracking.")
+        if st.button("📥 Load Sample History"):
+            # Two years of weekly readings trending toward target
+            rng = np.random.default_rng(0)
+            weeks = 104
+            dates = np.datetime64(datetime.now().date(), 'D') - np.arange(weeks)[::-1] * np.timedelta64(7, 'D')
+            progress = np.linspace(0, 1, weeks)
+            store.append(patient_id, dates, {
+                'systolic': 138 - 18 * progress + rng.normal(0, 3, weeks),
+                'diastolic': 88 - 8 * progress + rng.normal(0, 2, weeks),
+                'weight': 86 - 10 * progress + rng.normal(0, 0.5, weeks),
+                'total_cholesterol': 225 - 45 * progress + rng.normal(0, 5, weeks),
+                'ldl': 150 - 40 * progress + rng.normal(0, 4, weeks),
+                'hdl': 40 + 8 * progress + rng.normal(0, 1.5, weeks),
+                'cvd_risk': 18 - 6 * progress + rng.normal(0, 0.3, weeks)
+            })
+            st.rerun()
+    else:
+        windows = {"1 month": 30, "3 months": 91, "6 months": 182, "1 year": 365, "All": None}
+        window = st.radio("Time window", list(windows), index=2, horizontal=True)
+        start = None if windows[window] is None else last - timedelta(days=windows[window])
+        
+        # Only the viewed window is read from the store
+        tracker = store.load(patient_id, start=start, end=last)
+        
+        st.markdown("### 📈 Health Metrics Over Time")
+        
+        charts = [
+            ('systolic', "Systolic BP (mmHg)", 120),
+            ('total_cholesterol', "Total Cholesterol (mg/dL)", 200),
+            ('weight', "Weight (kg)", None),
+            ('cvd_risk', "10-Year CVD Risk (%)", 10)
+        ]
+        for row in range(0, len(charts), 2):
+            cols = st.columns(2)
+            for col, (metric, title, target) in zip(cols, charts[row:row + 2]):
+                dates, values = tracker.series(metric)
+                with col:
+                    if len(values):
+                        st.plotly_chart(create_trend_chart(dates, values, title, target=target), use_container_width=True)
+                    else:
+                        st.info(f"No {title.split(' (')[0].lower()} readings in this window")
+        
+        st.markdown("---")
+        st.markdown("### 📊 Progress Summary")
+        
+        trends = tracker.get_trends()
+        summary = [
+            ('systolic', "BP Change", "mmHg"),
+            ('total_cholesterol', "Cholesterol Change", "mg/dL"),
+            ('weight', "Weight Change", "kg"),
+            ('cvd_risk', "Risk Change", "%")
+        ]
+        for col, (metric, label, unit) in zip(st.columns(4), summary):
+            with col:
+                trend = trends.get(metric)
+                if trend:
+                    delta = f"{trend['percent_change']:+.0f}%" if trend['percent_change'] is not None else None
+                    st.metric(label, f"{trend['change']:+.1f} {unit}", delta=delta, delta_color="inverse")
+                    st.caption(f"Trend: {trend['trend']} ({trend['readings']} readings)")
+                else:
+                    st.metric(label, "—")
+        
+        st.caption(f"📁 {len(tracker)} visits shown of {store.count(patient_id)} stored readings "
+                   f"({first:%Y-%m-%d} to {last:%Y-%m-%d})")
 
 # Page: 3D Heart Visualization
 elif page == "🫀 3D Heart Visualization":
+    from Utils.StreamlitCache import create_3d_heart_model
+    
     st.markdown("## 🫀 Interactive 3D Heart Model")
     
     st.info("💡 Rotate, zoom, and explore the 3D heart model. Problem areas are highlighted based on your ECG and lab results.")
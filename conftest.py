@@ -0,0 +1 @@
+# Lets the tests import ``Utils`` the way the app and scripts do, from the repository root
@@ -4,19 +4,20 @@ Run this to test the system without the Streamlit UI
 """
 
 from dotenv import load_dotenv
-from Utils.EnhancedAgents import (
-    Cardiologist, Psychologist, Pulmonologist,
-    Neurologist, Endocrinologist, GeneralPractitioner,
-    DrugInteractionChecker, LabResultAnalyzer, MultidisciplinaryTeam
-)
+import asyncio
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Load API key
 load_dotenv(dotenv_path='apikey.env')
 
 def demo_specialist_analysis():
     """Demo: Multi-specialist analysis"""
+    from Utils.EnhancedAgents import (
+        Cardiologist, Psychologist, Pulmonologist,
+        Neurologist, Endocrinologist, MultidisciplinaryTeam
+    )
+    from Utils.Orchestrator import AsyncOrchestrator, ConsultationScheduler
+
     print("\n" + "="*60)
     print("🏥 DEMO: Multi-Specialist Analysis")
     print("="*60)
@@ -49,15 +50,20 @@ def demo_specialist_analysis():
     
     print("\n📋 Analyzing with 5 specialists concurrently...\n")
     
-    # Run analysis concurrently
-    results = {}
-    with ThreadPoolExecutor() as executor:
-        futures = {executor.submit(agent.run): name for name, agent in specialists.items()}
-        
-        for future in as_completed(futures):
-            name = futures[future]
+    # Specialists and the team synthesis run as dependent tasks: the team
+    # starts as soon as 4 of 5 specialists have answered, or after 30 seconds
+    scheduler = ConsultationScheduler(
+        AsyncOrchestrator(max_concurrency=6, timeout=60),
+        quorum=4,
+        quorum_timeout=30
+    )
+    results, synthesis = asyncio.run(scheduler.consult(specialists, MultidisciplinaryTeam))
+    
+    for name in specialists:
+        if name in results:
             print(f"✅ {name} completed")
-            results[name] = future.result()
+        else:
+            print(f"⏭️  {name} did not answer before the synthesis started")
     
     print("\n" + "-"*60)
     print("📊 RESULTS SUMMARY")
@@ -72,10 +78,12 @@ def demo_specialist_analysis():
         else:
             print(f"  Error: {result['error']}")
     
-    return results
+    return results, synthesis
 
 def demo_drug_checker():
     """Demo: Drug interaction checker"""
+    from Utils.EnhancedAgents import DrugInteractionChecker
+
     print("\n" + "="*60)
     print("💊 DEMO: Drug Interaction Checker")
     print("="*60)
@@ -111,6 +119,8 @@ def demo_drug_checker():
 
 def demo_lab_analyzer():
     """Demo: Lab result analyzer"""
+    from Utils.EnhancedAgents import LabResultAnalyzer
+
     print("\n" + "="*60)
     print("🧪 DEMO: Laboratory Result Analyzer")
     print("="*60)
@@ -150,16 +160,13 @@ def demo_lab_analyzer():
     
     return result
 
-def demo_final_synthesis(specialist_results):
+def demo_final_synthesis(result):
     """Demo: Multi-disciplinary team synthesis"""
     print("\n" + "="*60)
     print("🎯 DEMO: Final Diagnosis Synthesis")
     print("="*60)
     
-    print("\n🔄 Synthesizing all specialist reports...\n")
-    
-    team = MultidisciplinaryTeam(specialist_results)
-    result = team.run()
+    print("\n🔄 Synthesis of the specialist reports that made the quorum...\n")
     
     print("-"*60)
     print("📋 INTEGRATED DIAGNOSIS")
@@ -200,10 +207,10 @@ def main():
     
     try:
         # Run demos
-        specialist_results = demo_specialist_analysis()
+        specialist_results, synthesis = demo_specialist_analysis()
         demo_drug_checker()
         demo_lab_analyzer()
-        demo_final_synthesis(specialist_results)
+        demo_final_synthesis(synthesis)
         
         print("\n" + "="*60)
         print("✅ DEMO COMPLETE!")
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from Utils.Downsample import downsample, lttb_indices, minmax_indices
+
+N = 100_000
+SPIKES = [1_234, 40_000, 77_777]
+DIP = 60_001
+
+
+@pytest.fixture
+def signal():
+    rng = np.random.default_rng(0)
+    y = np.sin(np.linspace(0, 20 * np.pi, N)) * 0.1 + rng.normal(0, 0.01, N)
+    y[SPIKES] = [2.0, 1.5, 3.0]
+    y[DIP] = -2.5
+    return y
+
+
+@pytest.mark.parametrize("select", [minmax_indices, lambda y, n: lttb_indices(np.arange(N), y, n)],
+                         ids=["minmax", "lttb"])
+def test_keeps_end_points_and_extremes(signal, select):
+    indices = select(signal, 200)
+
+    assert len(indices) <= 202
+    assert indices[0] == 0 and indices[-1] == N - 1
+    assert np.all(np.diff(indices) > 0)
+    assert set(SPIKES + [DIP]) <= set(indices.tolist())
+    assert signal[indices].max() == signal.max() and signal[indices].min() == signal.min()
+
+
+def test_minmax_keeps_every_bucket_extreme(signal):
+    indices = minmax_indices(signal, 200)
+    bucket = -(-N // 100)
+
+    for start in range(0, N, bucket):
+        chunk = signal[start:start + bucket]
+        kept = signal[indices[(indices >= start) & (indices < start + bucket)]]
+        assert kept.max() == chunk.max() and kept.min() == chunk.min()
+
+
+def test_lttb_returns_exactly_n_out_points(signal):
+    assert len(lttb_indices(np.arange(N), signal, 500)) == 500
+
+
+def test_downsample_short_series_unchanged():
+    x, y = np.arange(10), np.arange(10.0)
+
+    for method in ("minmax", "lttb"):
+        out_x, out_y = downsample(x, y, 100, method=method)
+        assert out_x.tolist() == x.tolist() and out_y.tolist() == y.tolist()
+
+
+def test_downsample_drops_nan_and_handles_dates():
+    dates = np.arange('2020-01-01', '2023-01-01', dtype='datetime64[D]')
+    values = np.linspace(120, 140, len(dates))
+    values[::10] = np.nan
+
+    x, y = downsample(dates, values, 100, method='lttb')
+    assert len(y) == 100 and not np.isnan(y).any()
+    assert x[0] == dates[1] and x[-1] == dates[-1]
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        downsample(np.arange(10), np.arange(10.0), 4, method='every_other')
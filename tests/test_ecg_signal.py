@@ -0,0 +1,40 @@
+import pytest
+
+from Utils.ECGSignal import analyze_ecg, load_ecg_csv, load_uploaded_ecg
+from Utils.VisualHelpers import generate_ecg_signal
+
+
+def _csv(sampling_rate, heart_rate, seconds=20, time_column=True):
+    ecg = generate_ecg_signal(seconds, heart_rate, sampling_rate, seed=0)
+    if not time_column:
+        return "\n".join(f"{v:.4f}" for v in ecg).encode()
+    rows = [f"{i / sampling_rate:.4f},{v:.4f}" for i, v in enumerate(ecg)]
+    return ("time,lead_ii\n" + "\n".join(rows)).encode()
+
+
+def test_time_column_overrides_the_fallback_rate():
+    # A 500 Hz file uploaded with the UI's default of 250 Hz
+    record = load_uploaded_ecg([("ecg.csv", _csv(500, 75))], sampling_rate=250)
+
+    assert record.sampling_rate == pytest.approx(500)
+    measurements = analyze_ecg(record)
+    assert measurements["heart_rate"] == pytest.approx(75, abs=2)
+    assert "Bradycardia" not in measurements["rhythm"]
+    record.close()
+
+
+def test_fallback_rate_used_without_a_time_column():
+    record = load_uploaded_ecg([("ecg.csv", _csv(500, 75, time_column=False))], sampling_rate=500)
+
+    assert record.sampling_rate == 500
+    assert analyze_ecg(record)["heart_rate"] == pytest.approx(75, abs=2)
+    record.close()
+
+
+def test_rate_required_without_a_time_column(tmp_path):
+    path = tmp_path / "ecg.csv"
+    path.write_bytes(_csv(250, 60, time_column=False))
+
+    with pytest.raises(ValueError):
+        load_ecg_csv(str(path))
+    assert len(load_ecg_csv(str(path), sampling_rate=250)) == 20 * 250
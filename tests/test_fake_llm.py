@@ -0,0 +1,96 @@
+import pytest
+
+from Utils import CardioAgents, EnhancedAgents
+from Utils.FakeLLM import FakeChatModel, FakeLLMError, match_schema, sample_response
+from Utils.LLMClients import json_mode
+from Utils.RateLimiter import is_rate_limit_error
+from Utils.ResponseParsing import (
+    CardiacBiomarkerResponse, ChestPainResponse, DrugInteractionResponse, ECGResponse, LabResultResponse,
+    LipidPanelResponse, MultidisciplinaryResponse, ResponseParseError, RiskAssessmentResponse, SpecialistResponse,
+    TreatmentPlanResponse, parse_response
+)
+
+STUB = "stub:unused"
+LABS = {"ldl": 160, "hdl": 38, "troponin": 0.01}
+
+
+def _agent_prompts():
+    """(prompt, schema) for every structured agent call"""
+    labs = CardioAgents.LabAnalyzer(LABS, model_name=STUB)
+    return [
+        (CardioAgents.RiskCalculator({"age": 58}, model_name=STUB)._get_ai_risk_assessment_prompt(),
+         RiskAssessmentResponse),
+        (CardioAgents.ECGAnalyzer("Heart Rate: 72 bpm", model_name=STUB)._analyze_prompt(), ECGResponse),
+        (labs._analyze_lipid_panel_prompt(), LipidPanelResponse),
+        (labs._analyze_cardiac_biomarkers_prompt(), CardiacBiomarkerResponse),
+        (CardioAgents.SymptomAnalyzer("Chest pressure", model_name=STUB)._analyze_chest_pain_prompt(),
+         ChestPainResponse),
+        (CardioAgents.TreatmentAdvisor({"age": 58}, {"risk": "moderate"}, model_name=STUB)
+         ._get_recommendations_prompt(), TreatmentPlanResponse),
+        (EnhancedAgents.Cardiologist("Chest pain", model_name=STUB).format_prompt(), SpecialistResponse),
+        (EnhancedAgents.DrugInteractionChecker(["lisinopril", "spironolactone"], model_name=STUB).format_prompt(),
+         DrugInteractionResponse),
+        (EnhancedAgents.LabResultAnalyzer(LABS, model_name=STUB).format_prompt(), LabResultResponse),
+        (EnhancedAgents.MultidisciplinaryTeam({"Cardiologist": {"findings": ["angina"]}}, model_name=STUB)
+         .format_prompt(), MultidisciplinaryResponse)
+    ]
+
+
+def _model(**options):
+    return FakeChatModel(**dict(dict(latency=0, tokens_per_second=1e9, seed=0), **options))
+
+
+@pytest.mark.parametrize("prompt, schema", _agent_prompts(), ids=lambda value: getattr(value, "__name__", ""))
+def test_agent_prompts_match_their_schema(prompt, schema):
+    assert match_schema(prompt) is schema
+
+    reply = json_mode(_model()).invoke(prompt).content
+    assert parse_response(reply, schema) == sample_response(schema, "Fake", parse_response(reply)["confidence_score"])
+
+
+def test_unstructured_prompts_get_prose_or_generic_json():
+    prompt = "Summarize the report in three bullet points."
+
+    assert match_schema(prompt) is None
+    assert _model().invoke(prompt).content.startswith("- Possible issue 1")
+    assert set(parse_response(json_mode(_model()).invoke(prompt).content)) == {"response", "confidence_score"}
+
+
+def test_simulated_failures():
+    prompt = "Summarize the report."
+
+    with pytest.raises(FakeLLMError) as error:
+        _model(rate_limit_rate=1).invoke(prompt)
+    assert error.value.status_code == 429 and is_rate_limit_error(error.value)
+
+    with pytest.raises(FakeLLMError) as error:
+        _model(error_rate=1).invoke(prompt)
+    assert error.value.status_code == 503 and not is_rate_limit_error(error.value)
+
+    ecg_prompt = CardioAgents.ECGAnalyzer("Heart Rate: 72 bpm", model_name=STUB)._analyze_prompt()
+    with pytest.raises(ResponseParseError):
+        parse_response(json_mode(_model(malformed_rate=1)).invoke(ecg_prompt).content, ECGResponse)
+
+
+def test_usage_and_stats():
+    model = _model(completion_tokens=50)
+    message = model.invoke("x" * 400)
+
+    assert message.usage_metadata == {"input_tokens": 100, "output_tokens": 50, "total_tokens": 150}
+    assert "".join(chunk.content for chunk in model.stream("x" * 400)) == message.content
+    assert model.stats() == {"calls": 2, "errors": 0, "rate_limited": 0, "malformed": 0,
+                             "input_tokens": 200, "output_tokens": 100}
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_FAKE_LATENCY", "0.25")
+    monkeypatch.setenv("LLM_FAKE_LATENCY_DISTRIBUTION", "fixed")
+    monkeypatch.setenv("LLM_FAKE_ERROR_RATE", "0.1")
+    monkeypatch.setenv("LLM_FAKE_REQUESTS_PER_MINUTE", "60")
+
+    model = FakeChatModel.from_env("fake:test", error_rate=0.2)
+    assert model.first_token_latency() == 0.25
+    # Keyword overrides win over the environment
+    assert model.error_rate == 0.2
+    assert model.request_scheduler.requests.capacity == 60
+    assert model.request_scheduler.tokens.capacity == 1e12
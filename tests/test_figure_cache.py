@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+import pytest
+
+from Utils import VisualHelpers
+from Utils.FigureCache import FIGURE_CACHE, FigureCache, cached_figure
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    FIGURE_CACHE.clear()
+    yield
+    FIGURE_CACHE.clear()
+
+
+def _figure(values):
+    return go.Figure(go.Scatter(y=list(values)))
+
+
+def test_hit_returns_an_independent_copy():
+    cache = FigureCache()
+    key = cache.make_key("trend", ([1, 2, 3],), {})
+    assert cache.get(key) is None
+
+    cache.set(key, _figure([1, 2, 3]))
+    first = cache.get(key)
+    first.update_layout(title="changed")
+
+    assert list(first.data[0].y) == [1, 2, 3]
+    assert cache.get(key).layout.title.text is None
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_figure_is_evicted():
+    cache = FigureCache(max_entries=2)
+    keys = [cache.make_key("trend", (i,), {}) for i in range(3)]
+    cache.set(keys[0], _figure([0]))
+    cache.set(keys[1], _figure([1]))
+    cache.get(keys[0])
+    cache.set(keys[2], _figure([2]))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+
+
+def test_keys_follow_argument_content():
+    key = FigureCache.make_key
+    values = np.arange(5.0)
+
+    assert key("f", (values,), {}) == key("f", (values.copy(),), {})
+    assert key("f", (values,), {}) != key("f", (values + 1,), {})
+    assert key("f", (values,), {}) != key("f", (values.astype(np.float32),), {})
+    assert key("f", ({"a": 1, "b": 2},), {}) == key("f", ({"b": 2, "a": 1},), {})
+    assert key("f", (1,), {}) != key("g", (1,), {})
+    assert key("f", (), {"risk_model": "ASCVD"}) != key("f", (), {"risk_model": "SCORE2"})
+
+
+def test_cached_builder_runs_once_per_input():
+    calls = []
+
+    @cached_figure
+    def build(values, title="Trend"):
+        calls.append(title)
+        return _figure(values).update_layout(title=title)
+
+    build(np.arange(3), title="A")
+    fig = build(np.arange(3), title="A")
+    build(np.arange(3), title="B")
+
+    assert calls == ["A", "B"]
+    assert fig.layout.title.text == "A"
+    assert build.uncached is not build
+
+
+def test_cached_chart_keeps_the_cardio_template():
+    built = VisualHelpers.create_whatif_tornado(20.0, {"Quit smoking": 15.0, "SBP −10 mmHg": 18.0})
+    cached = VisualHelpers.create_whatif_tornado(20.0, {"Quit smoking": 15.0, "SBP −10 mmHg": 18.0})
+
+    assert FIGURE_CACHE.stats()["hits"] == 1
+    assert json.loads(cached.to_json()) == json.loads(built.to_json())
+    assert cached.layout.template.layout.font.family == "Poppins"
+    # Building charts does not change the template of unrelated figures
+    assert pio.templates.default == "plotly"
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "import_budget.py")
+
+
+def test_modules_import_within_budget():
+    # IMPORT_BUDGET_SCALE loosens the budgets on slow machines
+    proc = subprocess.run(
+        [sys.executable, SCRIPT, "--scale", os.environ.get("IMPORT_BUDGET_SCALE", "1")],
+        capture_output=True, text=True
+    )
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+
+
+def _check(*modules, pythonpath=None):
+    env = dict(os.environ, PYTHONPATH=str(pythonpath)) if pythonpath else None
+    return subprocess.run([sys.executable, SCRIPT, *modules], capture_output=True, text=True, env=env)
+
+
+def test_broken_modules_fail_the_check(tmp_path):
+    (tmp_path / "broken_module.py").write_text("def analyze(:\n")
+    (tmp_path / "needs_missing_package.py").write_text("import not_an_installed_package\n")
+
+    assert _check("broken_module", pythonpath=tmp_path).returncode == 1
+    assert _check("Utils.NotAModule").returncode == 1
+    # Only a missing third-party package is skipped
+    proc = _check("needs_missing_package", pythonpath=tmp_path)
+    assert proc.returncode == 0 and "skipped" in proc.stdout
@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from Utils.LLMClients import ClientRegistry, LoopLocalTransport
+
+
+def test_clients_are_shared_per_model_and_temperature():
+    registry = ClientRegistry()
+    cardiology = registry.get("stub:cardiology")
+
+    assert registry.get("stub:cardiology") is cardiology
+    assert registry.get("stub:cardiology", temperature=0.5) is not cardiology
+    assert registry.get("stub:psychology") is not cardiology
+    assert registry.stats()["clients_created"] == 3
+
+
+def test_requests_reuse_pooled_connections():
+    registry = ClientRegistry()
+    clients = [registry.get("stub:cardiology"), registry.get("stub:psychology"),
+               registry.get("stub:cardiology", temperature=0.5)]
+    for _ in range(3):
+        for client in clients:
+            client.invoke("Patient report")
+
+    stats = registry.stats()
+    assert stats["stub_requests"] == 9
+    # Sequential requests from every client go over one kept-alive connection
+    assert stats["stub_connections_opened"] == 1
+
+
+def test_clear_drops_clients_and_connections():
+    registry = ClientRegistry()
+    client = registry.get("stub:cardiology")
+    client.invoke("Patient report")
+    registry.clear()
+
+    assert registry.stats() == dict.fromkeys(registry.stats(), 0)
+    assert registry.get("stub:cardiology") is not client
+
+
+def test_async_calls_share_one_pool_per_event_loop():
+    httpx = pytest.importorskip("httpx")
+    transport = LoopLocalTransport(lambda: httpx.MockTransport(lambda request: httpx.Response(200)))
+
+    async def batch():
+        clients = [httpx.AsyncClient(transport=transport) for _ in range(3)]
+        responses = await asyncio.gather(*(client.get("https://api.example/chat") for client in clients))
+        return [response.status_code for response in responses]
+
+    assert asyncio.run(batch()) == [200, 200, 200]
+    assert transport.pools_opened == 1
+    # A new loop never reuses connections of a closed one
+    asyncio.run(batch())
+    assert transport.pools_opened == 2
+
+
+def test_groq_clients_share_the_async_pool(monkeypatch):
+    pytest.importorskip("langchain_groq")
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    registry = ClientRegistry()
+    clients = [registry.get("llama-3.3-70b-versatile"), registry.get("llama-3.1-8b-instant", temperature=0.5)]
+
+    shared = registry.async_transport("groq")
+    assert all(client.http_async_client._transport is shared for client in clients)
+    assert all(client.http_client is registry.transport("groq") for client in clients)
+    registry.clear()
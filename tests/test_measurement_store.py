@@ -0,0 +1,61 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from Utils.MeasurementStore import MeasurementStore
+
+DATES = np.array(['2024-01-01', '2024-02-01', '2024-03-01', '2024-04-01'], dtype='datetime64[s]')
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MeasurementStore(str(tmp_path / "measurements.sqlite"))
+    store.append("p1", DATES, {'systolic': [150, 144, 140.3, 132], 'ldl': [160, np.nan, 130, None]})
+    store.append("p2", DATES[:2], {'systolic': [120, 118]})
+    yield store
+    store.close()
+
+
+def test_load_round_trip(store):
+    tracker = store.load("p1")
+
+    assert tracker.dates.tolist() == DATES.astype(object).tolist()
+    assert tracker.series('systolic')[1].tolist() == [150, 144, 140.3, 132]
+    # Missing readings stay missing rather than becoming zeros
+    dates, ldl = tracker.series('ldl')
+    assert ldl.tolist() == [160, 130]
+    assert dates.tolist() == [datetime(2024, 1, 1), datetime(2024, 3, 1)]
+    assert store.count("p1") == 6 and store.count() == 8
+    assert store.patients() == ["p1", "p2"]
+
+
+def test_window_queries(store):
+    dates, values = store.series("p1", "systolic", start='2024-01-15', end='2024-03-01')
+    assert values.tolist() == [144, 140.3]
+    assert dates.tolist() == [datetime(2024, 2, 1), datetime(2024, 3, 1)]
+
+    tracker = store.load("p1", start='2024-02-01', metrics=['ldl'])
+    assert tracker.series('systolic')[1].tolist() == []
+    assert tracker.series('ldl')[1].tolist() == [130]
+    assert store.date_range("p1") == (datetime(2024, 1, 1), datetime(2024, 4, 1))
+    assert store.date_range("nobody") == (None, None)
+    assert store.series("nobody", "systolic")[1].tolist() == []
+
+
+def test_loaded_tracker_writes_through(store):
+    tracker = store.load("p2")
+    tracker.add_measurement('2024-05-01', {'systolic': 116, 'weight': None})
+
+    reopened = MeasurementStore(store.path)
+    assert reopened.series("p2", "systolic")[1].tolist() == [120, 118, 116]
+    assert reopened.count("p2") == 3
+    reopened.close()
+
+
+def test_same_timestamp_replaces_the_reading(store):
+    store.add_measurement("p2", '2024-02-01', {'systolic': 125})
+
+    assert store.series("p2", "systolic")[1].tolist() == [120, 125]
+    store.delete("p2")
+    assert store.count("p2") == 0 and store.patients() == ["p1"]
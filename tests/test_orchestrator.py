@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+from Utils.Orchestrator import AsyncOrchestrator, ConsultationScheduler
+from Utils.RateLimiter import RequestScheduler, TokenBucket
+
+
+class Agent:
+    """Specialist stand-in answering ``result`` after ``delay`` seconds"""
+
+    def __init__(self, result, delay=0.0):
+        self.result = result
+        self.delay = delay
+        self.cancelled = False
+
+    async def arun(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.result
+
+
+class Team:
+    def __init__(self, reports):
+        self.reports = reports
+
+    async def arun(self):
+        return "synthesis of " + ", ".join(sorted(self.reports))
+
+
+def _consult(specialists, **options):
+    scheduler = ConsultationScheduler(AsyncOrchestrator(timeout=5), **options)
+    started = time.monotonic()
+    reports, synthesis = asyncio.run(scheduler.consult(specialists, Team))
+    return reports, synthesis, time.monotonic() - started
+
+
+def test_waits_for_every_specialist_by_default():
+    specialists = {name: Agent(f"{name} report", delay) for name, delay in [("a", 0.02), ("b", 0.01), ("c", 0.03)]}
+
+    reports, synthesis, _ = _consult(specialists)
+    assert reports == {"a": "a report", "b": "b report", "c": "c report"}
+    assert synthesis == "synthesis of a, b, c"
+
+
+def test_quorum_starts_synthesis_and_cancels_stragglers():
+    specialists = {"a": Agent("a report", 0.01), "b": Agent("b report", 0.02), "c": Agent("c report", 5)}
+
+    reports, synthesis, elapsed = _consult(specialists, quorum=2)
+    assert synthesis == "synthesis of a, b"
+    assert elapsed < 1
+    assert specialists["c"].cancelled
+
+
+def test_failed_reports_do_not_count_towards_quorum():
+    specialists = {"a": Agent({"error": "model failed"}, 0.0), "b": Agent("b report", 0.02),
+                   "c": Agent("c report", 0.04)}
+
+    reports, synthesis, _ = _consult(specialists, quorum=2)
+    assert set(reports) == {"b", "c"}
+
+
+def test_quorum_timeout_synthesizes_what_has_arrived():
+    specialists = {"a": Agent("a report", 0.01), "b": Agent("b report", 5), "c": Agent("c report", 5)}
+
+    reports, synthesis, elapsed = _consult(specialists, quorum_timeout=0.1)
+    assert synthesis == "synthesis of a"
+    assert elapsed < 1
+    assert specialists["b"].cancelled and specialists["c"].cancelled
+
+
+def test_no_report_means_no_synthesis():
+    specialists = {"a": Agent({"error": "model failed"}), "b": Agent("b report", 5)}
+
+    reports, synthesis, _ = _consult(specialists, quorum_timeout=0.05)
+    assert reports == {}
+    assert synthesis["error"] == "No specialist report available"
+
+
+def test_slow_calls_time_out():
+    agent = Agent("late", 5)
+
+    result = asyncio.run(AsyncOrchestrator(timeout=0.05).call("Cardiologist", agent.arun))
+    assert result == {"error": "Cardiologist timed out after 0.05s", "confidence_score": 0.0}
+    assert agent.cancelled
+
+
+def test_time_queued_for_rate_limits_does_not_time_out():
+    scheduler = RequestScheduler()
+    # One request every 0.2 s, none available now
+    scheduler.requests = TokenBucket(1, 5)
+    scheduler.requests.tokens = 0
+
+    async def rate_limited_call():
+        return await scheduler.acall(lambda: asyncio.sleep(0.01, result="answer"))
+
+    started = time.monotonic()
+    result = asyncio.run(AsyncOrchestrator(timeout=0.1).call("Cardiologist", rate_limited_call))
+    assert result == "answer"
+    assert time.monotonic() - started >= 0.15
+
+
+def test_run_consults_every_patient():
+    finished = []
+    scheduler = ConsultationScheduler(AsyncOrchestrator(max_concurrency=2), max_patients=2)
+
+    def build(patient_id, delay):
+        return {"a": Agent(f"{patient_id} a", delay), "b": Agent(f"{patient_id} b")}, Team
+
+    results = asyncio.run(scheduler.run([("p1", 0.03), ("p2", 0.0), ("p3", 0.01)], build,
+                                        on_result=lambda patient_id, result: finished.append(patient_id)))
+    assert {patient_id: synthesis for patient_id, (_, synthesis) in results.items()} == {
+        "p1": "synthesis of a, b", "p2": "synthesis of a, b", "p3": "synthesis of a, b"}
+    assert sorted(finished) == ["p1", "p2", "p3"]
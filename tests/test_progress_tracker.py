@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from Utils.CardioAgents import ProgressTracker
+
+DATES = ['2024-01-01', '2024-01-11', '2024-01-21', '2024-01-31']
+
+
+def _tracker(**kwargs):
+    tracker = ProgressTracker(**kwargs)
+    for day, systolic in zip(DATES, [150, 144, 140, 132]):
+        tracker.add_measurement(day, {'systolic': systolic, 'hdl': 40.3 if day == DATES[0] else None})
+    return tracker
+
+
+def test_zero_capacity_grows():
+    tracker = _tracker(capacity=0)
+
+    assert len(tracker) == 4
+    assert tracker.series('systolic')[1].tolist() == [150, 144, 140, 132]
+
+
+def test_trends_and_slope():
+    trends = _tracker().get_trends()
+
+    systolic = trends['systolic']
+    assert systolic['trend'] == 'improving'
+    assert systolic['change'] == -18
+    # 150, 144, 140, 132 over days 0, 10, 20, 30
+    assert systolic['slope_per_day'] == pytest.approx(-0.58)
+    assert systolic['at_target'] is False
+    # One HDL reading is not a trend
+    assert 'hdl' not in trends
+    assert _tracker().generate_progress_report()['overall_progress'] == 'improving'
+
+
+def test_too_few_readings():
+    tracker = ProgressTracker()
+    tracker.add_measurement('2024-01-01', {'systolic': 130})
+
+    assert 'error' in tracker.get_trends()
+    assert tracker.generate_progress_report()['overall_progress'] == 'insufficient_data'
+
+
+def test_out_of_order_dates_are_sorted():
+    tracker = ProgressTracker(capacity=2)
+    for day, systolic in [(DATES[2], 140), (DATES[0], 150), (DATES[3], 132), (DATES[1], 144)]:
+        tracker.add_measurement(day, {'systolic': systolic})
+
+    assert tracker.dates.astype(str).tolist() == [f'{day}T00:00:00' for day in DATES]
+    assert tracker.series('systolic')[1].tolist() == [150, 144, 140, 132]
+    assert tracker.get_trends()['systolic'] == _tracker().get_trends()['systolic']
+
+
+def test_history_round_trip():
+    tracker = _tracker()
+    history = tracker.history
+
+    assert history[0] == {'date': datetime(2024, 1, 1), 'measurements': {'systolic': 150.0, 'hdl': 40.3}}
+    assert history[1] == {'date': datetime(2024, 1, 11), 'measurements': {'systolic': 144.0}}
+
+    rebuilt = ProgressTracker()
+    for entry in history:
+        rebuilt.add_measurement(entry['date'], entry['measurements'])
+    assert rebuilt.history == history
+
+
+def test_add_measurements_matches_single_appends():
+    tracker = ProgressTracker(capacity=1)
+    tracker.add_measurements(DATES, {'systolic': [150, 144, 140, 132], 'ldl': [160, np.nan, 130, 110]})
+
+    assert len(tracker) == 4
+    assert tracker.series('systolic')[1].tolist() == _tracker().series('systolic')[1].tolist()
+    dates, ldl = tracker.series('ldl', start='2024-01-05')
+    assert ldl.tolist() == [130, 110]
+    assert dates.astype(str).tolist() == ['2024-01-21T00:00:00', '2024-01-31T00:00:00']
+
+    tracker.add_measurements(['2023-12-01'], {'systolic': [160]})
+    assert tracker.series('systolic')[1].tolist() == [160, 150, 144, 140, 132]
+    tracker.add_measurements([], {})
+    assert len(tracker) == 5
@@ -0,0 +1,86 @@
+import pytest
+
+from Utils import CardioAgents  # noqa: F401 (registers the CardioAgents prompts)
+from Utils.Prompts import (
+    BUILTIN_PROMPTS, PromptError, PromptRegistry, get_prompt_registry, set_prompt_registry, template_variables
+)
+
+NAME = "Tests.Summary"
+
+
+@pytest.fixture
+def builtin(monkeypatch):
+    monkeypatch.setitem(BUILTIN_PROMPTS, NAME, {"1": "Summarize {report} for {audience}."})
+
+
+@pytest.fixture
+def directory(tmp_path, builtin):
+    for version, text in [("2", "Summarize {report} briefly for {audience}."),
+                          ("10", "Summary of {report} for {audience}:")]:
+        (tmp_path / f"{NAME}@{version}.txt").write_text(text)
+    (tmp_path / "notes.txt").write_text("not a prompt {")
+    return tmp_path
+
+
+def test_template_variables():
+    assert template_variables("{a} and {b} but not {{c}}") == {"a", "b"}
+    with pytest.raises(PromptError):
+        template_variables("unclosed {brace")
+
+
+def test_highest_version_is_active(directory):
+    registry = PromptRegistry(str(directory))
+
+    assert registry.versions(NAME) == ["1", "2", "10"]
+    assert registry.active_version(NAME) == "10"
+    assert registry.get(NAME).format(report="ECG", audience="GP") == "Summary of ECG for GP:"
+
+
+def test_pins_select_a_version(directory):
+    registry = PromptRegistry(str(directory), pins={NAME: "2"})
+
+    assert registry.get(NAME).template == "Summarize {report} briefly for {audience}."
+    assert registry.get(NAME, "1").template == BUILTIN_PROMPTS[NAME]["1"]
+    with pytest.raises(KeyError):
+        PromptRegistry(str(directory), pins={NAME: "3"}).get(NAME)
+    with pytest.raises(KeyError):
+        registry.get("Tests.Unknown")
+
+
+def test_versions_must_take_the_builtin_inputs(tmp_path, builtin):
+    (tmp_path / f"{NAME}@2.txt").write_text("Summarize {report}.")
+    registry = PromptRegistry(str(tmp_path))
+
+    with pytest.raises(PromptError, match="takes report; its agent passes audience, report"):
+        registry.get(NAME)
+    # The built-in version is still usable by pinning back to it
+    assert PromptRegistry(str(tmp_path), pins={NAME: "1"}).get(NAME).input_variables == ["audience", "report"]
+
+
+def test_malformed_file_names_the_file(tmp_path, builtin):
+    (tmp_path / f"{NAME}@2.txt").write_text("Summarize {report")
+
+    with pytest.raises(PromptError, match=f"{NAME}@2.txt"):
+        PromptRegistry(str(tmp_path))
+
+
+def test_templates_are_parsed_once(builtin):
+    registry = PromptRegistry()
+    template = registry.get(NAME)
+
+    assert registry.get(NAME) is template
+    registry.clear()
+    assert registry.get(NAME) is not template
+
+
+def test_environment_registry(monkeypatch, directory):
+    monkeypatch.setenv("LLM_PROMPTS_DIR", str(directory))
+    monkeypatch.setenv("LLM_PROMPT_VERSIONS", f" {NAME} = 2 , CardioAgents.ECGAnalysis=1")
+    set_prompt_registry(None)
+    try:
+        registry = get_prompt_registry()
+        assert registry.pins == {NAME: "2", "CardioAgents.ECGAnalysis": "1"}
+        assert registry.active_version(NAME) == "2"
+        assert "{ecg_data}" in registry.template("CardioAgents.ECGAnalysis")
+    finally:
+        set_prompt_registry(None)
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from Utils.RateLimiter import (
+    HIGH, LOW, NORMAL, URGENT, QueueWait, RequestScheduler, TokenBucket, estimate_tokens, is_rate_limit_error,
+    track_queue_wait
+)
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+def _scheduler(**options):
+    options = dict(dict(requests_per_minute=600, tokens_per_minute=60000, base_delay=0.001), **options)
+    return RequestScheduler(**options)
+
+
+def test_priority_classes_are_admitted_in_order():
+    scheduler = _scheduler()
+    # One request every 20 ms, none available now, so every caller queues
+    scheduler.requests = TokenBucket(1, 50)
+    scheduler.requests.tokens = 0
+    admitted = []
+
+    async def request(priority, name):
+        await scheduler.aacquire(priority)
+        admitted.append(name)
+
+    async def main():
+        await asyncio.gather(*(request(priority, name) for priority, name in [
+            (LOW, "low"), (NORMAL, "normal 1"), (URGENT, "urgent"), (NORMAL, "normal 2"), (HIGH, "high")]))
+
+    asyncio.run(main())
+    assert admitted == ["urgent", "high", "normal 1", "normal 2", "low"]
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_settle_returns_the_unused_reservation():
+    scheduler = _scheduler(tokens_per_minute=10000)
+    prompt = "x" * 400
+    reserved = estimate_tokens(prompt, scheduler.completion_tokens)
+
+    assert scheduler.call(lambda: "reply", prompt) == "reply"
+    assert scheduler.stats()["token_budget"] == pytest.approx(10000 - reserved, abs=20)
+    scheduler.settle(prompt, 300)
+    assert scheduler.stats()["token_budget"] == pytest.approx(10000 - 300, abs=20)
+
+
+def test_settle_leaves_the_bucket_in_debt_for_overruns():
+    scheduler = _scheduler(tokens_per_minute=2000)
+    prompt = "x" * 400
+    scheduler.call(lambda: "reply", prompt)
+    scheduler.settle(prompt, 3000)
+
+    assert scheduler.stats()["token_budget"] == pytest.approx(-1000, abs=20)
+    # The next call waits until the debt is repaid
+    assert scheduler.tokens.wait_time(estimate_tokens(prompt)) > 30
+
+
+def test_rate_limit_errors_are_retried_with_backoff():
+    scheduler = _scheduler(tokens_per_minute=10000)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimited("Error code: 429 - rate limit exceeded")
+        return "reply"
+
+    queue_wait = QueueWait()
+    with track_queue_wait(queue_wait):
+        assert scheduler.call(flaky, "x" * 400) == "reply"
+    stats = scheduler.stats()
+    assert (stats["retries"], stats["rate_limited"]) == (2, 2)
+    # Rejected attempts were refunded: only the successful one is still reserved
+    assert stats["token_budget"] == pytest.approx(10000 - estimate_tokens("x" * 400), abs=20)
+    # Backoff counts as queued time, not call time
+    assert queue_wait.seconds() > 0
+
+
+def test_async_rate_limit_errors_are_retried():
+    scheduler = _scheduler()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RateLimited("rate limit")
+        return "reply"
+
+    assert asyncio.run(scheduler.acall(flaky)) == "reply"
+    assert scheduler.stats()["retries"] == 1
+
+
+def test_other_errors_and_exhausted_retries_are_raised():
+    scheduler = _scheduler(max_retries=2)
+    attempts = []
+
+    def unavailable():
+        attempts.append(1)
+        raise RuntimeError("Error code: 503 - unavailable")
+
+    def always_limited():
+        attempts.append(1)
+        raise RateLimited("429")
+
+    with pytest.raises(RuntimeError):
+        scheduler.call(unavailable)
+    assert len(attempts) == 1
+
+    attempts.clear()
+    with pytest.raises(RateLimited):
+        scheduler.call(always_limited)
+    assert len(attempts) == 3
+
+
+def test_backoff_is_bounded_full_jitter():
+    scheduler = _scheduler(base_delay=1.0, max_delay=5.0)
+
+    for attempt in range(6):
+        delays = [scheduler.backoff(attempt) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= min(5.0, 2 ** attempt)
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(RateLimited())
+    assert is_rate_limit_error(Exception("Rate limit reached for model"))
+    assert not is_rate_limit_error(Exception("Error code: 503"))
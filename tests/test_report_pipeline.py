@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from Utils.LLMClients import get_registry
+from Utils.ReportPipeline import Checkpoint, ReportPipeline
+from Utils.ResponseCache import set_response_cache
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    # Instant fake model, memory-only response cache
+    monkeypatch.setenv("LLM_FAKE_LATENCY", "0")
+    monkeypatch.setenv("LLM_FAKE_TOKENS_PER_SECOND", "1e9")
+    monkeypatch.setenv("LLM_CACHE_PATH", "")
+    set_response_cache(None)
+    get_registry().clear()
+    yield
+    get_registry().clear()
+    set_response_cache(None)
+
+
+@pytest.fixture
+def reports(tmp_path):
+    directory = tmp_path / "reports"
+    directory.mkdir()
+    for patient_id in ("alice", "bob", "carol"):
+        (directory / f"{patient_id}.txt").write_text(f"{patient_id}: chest pain on exertion, SOB")
+    return directory
+
+
+def _pipeline(output, pipeline="basic"):
+    return ReportPipeline(output_dir=str(output), pipeline=pipeline, model_name="fake:test", max_patients=2)
+
+
+@pytest.mark.parametrize("pipeline", ["basic", "enhanced"])
+def test_failures_are_checkpointed_and_retried(tmp_path, reports, monkeypatch, pipeline):
+    output = tmp_path / "results"
+    (reports / "bob.txt").write_bytes(b"\xff\xfe not utf-8")
+    diagnose = ReportPipeline.diagnose
+
+    async def flaky(self, report):
+        if report.startswith("carol"):
+            raise RuntimeError("model unavailable")
+        return await diagnose(self, report)
+
+    monkeypatch.setattr(ReportPipeline, "diagnose", flaky)
+    first = _pipeline(output, pipeline)
+    statuses = {}
+    summary = first.run(str(reports), on_result=statuses.__setitem__)
+
+    # One unreadable report and one failed diagnosis do not stop the batch
+    assert summary == {"done": 1, "skipped": 0, "failed": 2}
+    assert statuses == {"alice": "done", "bob": "failed", "carol": "failed"}
+    checkpoint = Checkpoint(str(output / ".checkpoint.jsonl"))
+    assert set(checkpoint.done) == {"alice"}
+    assert checkpoint.failed["carol"] == "RuntimeError: model unavailable"
+    assert checkpoint.failed["bob"].startswith("UnicodeDecodeError")
+
+    # Resume: the finished report is skipped, the failed ones are retried
+    monkeypatch.setattr(ReportPipeline, "diagnose", diagnose)
+    (reports / "bob.txt").write_text("bob: palpitations")
+    summary = _pipeline(output, pipeline).run(str(reports))
+
+    assert summary == {"done": 2, "skipped": 1, "failed": 0}
+    checkpoint = Checkpoint(str(output / ".checkpoint.jsonl"))
+    assert set(checkpoint.done) == {"alice", "bob", "carol"} and checkpoint.failed == {}
+    extension = ".txt" if pipeline == "basic" else ".json"
+    assert sorted(path.name for path in output.glob(f"*{extension}")) == [
+        f"{name}{extension}" for name in ("alice", "bob", "carol")]
+
+
+def test_edited_report_is_diagnosed_again(tmp_path, reports):
+    output = tmp_path / "results"
+    assert _pipeline(output).run(str(reports)) == {"done": 3, "skipped": 0, "failed": 0}
+
+    (reports / "alice.txt").write_text("alice: new symptoms")
+    (output / "bob.txt").unlink()
+    assert _pipeline(output).run(str(reports)) == {"done": 2, "skipped": 1, "failed": 0}
+
+
+def test_checkpoint_ignores_a_partial_last_line(tmp_path):
+    path = tmp_path / ".checkpoint.jsonl"
+    path.write_text(json.dumps({"patient_id": "alice", "digest": "abc"}) + "\n" + '{"patient_id": "bo')
+
+    checkpoint = Checkpoint(str(path))
+    assert checkpoint.done == {"alice": "abc"} and checkpoint.failed == {}
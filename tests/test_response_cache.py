@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from Utils.ResponseCache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def test_make_key_depends_on_every_part():
+    key = ResponseCache.make_key("Cardiologist", "llama", 0, "report")
+
+    assert key == ResponseCache.make_key("Cardiologist", "llama", 0, "report")
+    assert len({key, ResponseCache.make_key("Psychologist", "llama", 0, "report"),
+                ResponseCache.make_key("Cardiologist", "llama+json_object", 0, "report"),
+                ResponseCache.make_key("Cardiologist", "llama", 0, "report.")}) == 4
+
+
+def test_entries_expire_after_ttl(clock, tmp_path):
+    cache = ResponseCache(ttl=60, path=str(tmp_path / "cache.sqlite"))
+    cache.set("a", "reply")
+
+    clock[0] += 60
+    assert cache.get("a") == "reply"
+    clock[0] += 1
+    assert cache.get("a") is None
+    # The expired row is gone from disk as well, not only from memory
+    assert ResponseCache(ttl=None, path=cache.path).get("a") is None
+    assert cache.stats()["disk_entries"] == 0
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert [cache.get(key) for key in "abc"] == ["1", None, "3"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_serves_what_memory_evicted(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(max_entries=1, path=path)
+    cache.set("a", "1")
+    cache.set("b", "2")
+
+    assert cache.get("a") == "1"
+    assert cache.stats()["disk_hits"] == 1
+    # Promoted back into memory: the next read does not touch the disk
+    assert cache.get("a") == "1"
+    assert cache.stats()["disk_hits"] == 1
+
+    # Survives a restart
+    restarted = ResponseCache(path=path)
+    assert (restarted.get("a"), restarted.get("b")) == ("1", "2")
+    assert restarted.stats()["disk_entries"] == 2
+
+
+def test_disk_tier_is_pruned_by_last_access(clock, tmp_path):
+    cache = ResponseCache(max_entries=1, path=str(tmp_path / "cache.sqlite"), max_disk_entries=2)
+    for key in "ab":
+        cache.set(key, key.upper())
+        clock[0] += 1
+    cache.get("a")
+    clock[0] += 1
+    cache.set("c", "C")
+
+    assert cache.stats()["disk_entries"] == 2
+    fresh = ResponseCache(path=cache.path)
+    assert [fresh.get(key) for key in "abc"] == ["A", None, "C"]
+
+
+def test_clear_resets_both_tiers(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    cache.set("a", "1")
+    cache.get("a")
+    cache.clear()
+
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 0, "misses": 1, "disk_hits": 0, "hit_rate": 0.0, "evictions": 0,
+                             "memory_entries": 0, "disk_entries": 0}
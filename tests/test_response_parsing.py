@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from Utils.ResponseCache import set_response_cache
+from Utils.ResponseParsing import (
+    ECGResponse, IncrementalJSONParser, ResponseParseError, extract_json, invoke_structured, parse_response
+)
+
+ECG = {"rhythm": "Sinus rhythm", "heart_rate": 72, "severity": "mild",
+       "intervals": {"pr": "160 ms"}, "abnormalities": ["none {really}"]}
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_PATH", "")
+    set_response_cache(None)
+    yield
+    set_response_cache(None)
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(ECG),
+    f"```json\n{json.dumps(ECG, indent=2)}\n```",
+    f"Here is the analysis:\n{json.dumps(ECG)}\nLet me know if you need more.",
+    # A brace-balanced fragment that is not JSON comes first
+    f"Intervals {{pr: long}} were reviewed. {json.dumps(ECG)}"
+])
+def test_extract_json_finds_the_object(text):
+    assert extract_json(text) == ECG
+
+
+@pytest.mark.parametrize("text", ["", "No findings.", '{"rhythm": "Sinus"', "[1, 2, 3]", "{'rhythm': 'Sinus'}"])
+def test_extract_json_rejects_malformed_replies(text):
+    with pytest.raises(ResponseParseError) as error:
+        extract_json(text)
+    assert error.value.response == text
+
+
+def test_parse_response_validates_and_fills_defaults():
+    parsed = parse_response(json.dumps({"rhythm": "Sinus", "severity": "mild", "confidence_score": "85%"}), ECGResponse)
+
+    assert parsed["confidence_score"] == 0.85
+    assert parsed["recommendations"] == [] and parsed["heart_rate"] is None
+    with pytest.raises(ResponseParseError, match="severity"):
+        parse_response('{"rhythm": "Sinus"}', ECGResponse)
+
+
+@pytest.mark.parametrize("value, rate", [("72 bpm", 72.0), ("about 58.5", 58.5), (88, 88.0),
+                                         ("irregular", None), (None, None), (True, None)])
+def test_heart_rate_is_a_number_or_none(value, rate):
+    parsed = parse_response(json.dumps({"rhythm": "Sinus", "severity": "mild", "heart_rate": value}), ECGResponse)
+    assert parsed["heart_rate"] == rate
+
+
+def test_incremental_parser_emits_fields_as_they_complete():
+    text = "Sure:\n```json\n" + json.dumps(ECG, indent=2) + "\n```"
+    parser = IncrementalJSONParser()
+    completed = []
+    # Chunks split keys, strings, escapes and nested objects
+    for start in range(0, len(text), 3):
+        completed += parser.feed(text[start:start + 3])
+
+    assert completed == list(ECG.items())
+    assert parser.done and parser.fields == ECG
+    assert extract_json(parser.text) == ECG
+
+
+def test_incremental_parser_holds_back_an_unfinished_field():
+    parser = IncrementalJSONParser()
+
+    assert parser.feed('{"rhythm": "Sinus", "heart_rate": 7') == [("rhythm", "Sinus")]
+    assert parser.feed('2, "note": "say \\"hi\\", ') == [("heart_rate", 72)]
+    assert parser.feed('then stop"}') == [("note", 'say "hi", then stop')]
+    assert parser.done
+
+
+def test_invalid_reply_is_reasked_once():
+    model = FakeListChatModel(responses=["Rhythm looks fine.", json.dumps(ECG), "unused"])
+
+    assert invoke_structured(model, "Analyze this ECG", ECGResponse, role="ECG")["heart_rate"] == 72.0
+    # Exactly two replies were requested
+    assert model.invoke("next").content == "unused"
+
+
+def test_reasks_give_up_with_the_last_reply():
+    model = FakeListChatModel(responses=["Rhythm looks fine.", '{"rhythm": "Sinus"}', json.dumps(ECG)])
+
+    with pytest.raises(ResponseParseError) as error:
+        invoke_structured(model, "Analyze this ECG", ECGResponse, role="ECG", max_reasks=1)
+    assert error.value.response == '{"rhythm": "Sinus"}'
@@ -0,0 +1,105 @@
+import math
+
+import numpy as np
+import pytest
+
+from Utils.RiskModels import RISK_MODEL_REGISTRY, SCORE2_REGIONS, PooledCohortEquations, Score2
+
+# Goff et al. 2013, Table A: 55 years, TC 213 mg/dL, HDL 50 mg/dL, untreated
+# SBP 120 mmHg, nonsmoker, no diabetes. (individual sum, 10-year risk %)
+PCE_WORKED_EXAMPLE = {
+    ('Female', 'Caucasian'): (-29.67, 2.1),
+    ('Female', 'African American'): (86.16, 3.0),
+    ('Male', 'Caucasian'): (60.69, 5.3),
+    ('Male', 'African American'): (18.97, 6.1)
+}
+
+# SCORE2 working group 2021, supplementary methods: coefficients for age,
+# smoking, SBP, TC, HDL, age x smoking, age x SBP, age x TC, age x HDL;
+# baseline survival; and the ESC 2021 regional recalibration scales
+SCORE2_PUBLISHED = {
+    'Male': ([0.3742, 0.6012, 0.2777, 0.1458, -0.2698, -0.0755, -0.0255, -0.0281, 0.0426], 0.9605,
+             {'low': (-0.5699, 0.7476), 'moderate': (-0.1565, 0.8009),
+              'high': (0.3207, 0.9360), 'very_high': (0.5836, 0.8294)}),
+    'Female': ([0.4648, 0.7744, 0.3131, 0.1002, -0.2606, -0.1088, -0.0277, -0.0226, 0.0613], 0.9776,
+               {'low': (-0.7380, 0.7019), 'moderate': (-0.3143, 0.7701),
+                'high': (0.5710, 0.9369), 'very_high': (0.9412, 0.8329)})
+}
+
+
+def _patient(**fields):
+    return {key: [value] for key, value in fields.items()}
+
+
+@pytest.mark.parametrize("gender, ethnicity", list(PCE_WORKED_EXAMPLE))
+def test_pce_matches_the_guideline_worked_example(gender, ethnicity):
+    model = PooledCohortEquations()
+    patient = _patient(age=55, gender=gender, ethnicity=ethnicity, total_cholesterol=213, hdl=50, systolic=120,
+                       hypertension=False, smoking='Never', diabetes=False)
+    individual_sum, risk = PCE_WORKED_EXAMPLE[(gender, ethnicity)]
+
+    assert sum(model.contributions(patient).values())[0] == pytest.approx(individual_sum, abs=0.01)
+    # The published table works with logarithms rounded to two places
+    assert model.predict(patient)[0] == pytest.approx(risk, abs=0.1)
+
+
+def test_pce_uses_the_white_equations_for_other_races():
+    model = PooledCohortEquations()
+    patient = dict(age=62, gender='Male', total_cholesterol=240, hdl=40, systolic=150, hypertension=True,
+                   smoking='Current', diabetes=True)
+
+    white = model.predict(_patient(ethnicity='Caucasian', **patient))
+    for ethnicity in ('Hispanic', 'Asian', 'Other'):
+        assert model.predict(_patient(ethnicity=ethnicity, **patient)) == pytest.approx(white)
+    # Treated blood pressure carries more risk than the same untreated reading
+    assert model.predict(_patient(ethnicity='Caucasian', **dict(patient, hypertension=False))) < white
+
+
+def _score2_reference(age, gender, smoking, systolic, total_cholesterol, hdl, region):
+    """SCORE2 written out term by term from the published equations"""
+    beta, baseline, scales = SCORE2_PUBLISHED[gender]
+    c_age, smoker = (age - 60) / 5, float(smoking == 'Current')
+    c_sbp, c_tc, c_hdl = (systolic - 120) / 20, total_cholesterol / 38.67 - 6, (hdl / 38.67 - 1.3) / 0.5
+    x = sum(b * v for b, v in zip(beta, [c_age, smoker, c_sbp, c_tc, c_hdl,
+                                         c_age * smoker, c_age * c_sbp, c_age * c_tc, c_age * c_hdl]))
+    risk = 1 - baseline ** math.exp(x)
+    scale1, scale2 = scales[region]
+    return 100 * (1 - math.exp(-math.exp(scale1 + scale2 * math.log(-math.log(1 - risk)))))
+
+
+@pytest.mark.parametrize("region", list(SCORE2_REGIONS))
+def test_score2_matches_the_published_equations(region):
+    rng = np.random.default_rng(0)
+    n = 200
+    data = {
+        'age': rng.integers(40, 70, n), 'gender': rng.choice(['Male', 'Female'], n),
+        'smoking': rng.choice(['Never', 'Former', 'Current'], n), 'systolic': rng.integers(100, 180, n),
+        'total_cholesterol': rng.integers(150, 300, n), 'hdl': rng.integers(30, 90, n)
+    }
+    expected = [_score2_reference(*(data[key][i] for key in ('age', 'gender', 'smoking', 'systolic',
+                                                             'total_cholesterol', 'hdl')), region)
+                for i in range(n)]
+
+    assert Score2(region).predict(data) == pytest.approx(expected, rel=1e-9)
+
+
+def test_score2_regions_are_ordered():
+    patient = _patient(age=55, gender='Female', smoking='Current', systolic=140, total_cholesterol=230, hdl=50)
+    risks = [Score2(region).predict(patient)[0] for region in ('low', 'moderate', 'high', 'very_high')]
+
+    assert risks == sorted(risks)
+    assert RISK_MODEL_REGISTRY['SCORE2'].region == 'moderate'
+    with pytest.raises(ValueError):
+        Score2('northern')
+
+
+@pytest.mark.parametrize("key", list(RISK_MODEL_REGISTRY))
+def test_assess_matches_predict(key):
+    model = RISK_MODEL_REGISTRY[key]
+    patient = dict(age=58, gender='Male', ethnicity='Caucasian', total_cholesterol=220, hdl=45, systolic=138,
+                   hypertension=True, smoking='Current', diabetes=False)
+    result = model.assess(patient)
+
+    assert result['model'] == key
+    assert result['risk_percentage'] == pytest.approx(model.predict(_patient(**patient))[0], abs=0.05)
+    assert result['risk_category'] == model.category(result['risk_percentage'])[0]
@@ -0,0 +1,78 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from Utils.CardioAgents import RiskCalculator
+from Utils.RiskScoring import (
+    AGE_REPRESENTATIVES, CHOLESTEROL_REPRESENTATIVES, FRAMINGHAM_DEFAULTS, FRAMINGHAM_LOOKUP, HDL_REPRESENTATIVES,
+    SYSTOLIC_REPRESENTATIVES, framingham_points, validate_framingham_lookup
+)
+
+KEYS = ['gender', 'age', 'total_cholesterol', 'hdl', 'systolic', 'smoking', 'diabetes']
+CATEGORICAL = list(itertools.product(['Male', 'Female', 'Other'], ['Never', 'Former', 'Current'], [False, True]))
+# The integer range each field's precomputed code list covers
+SCANS = {'age': 131, 'total_cholesterol': 1000, 'hdl': 300, 'systolic': 400}
+
+
+def _reference(patient):
+    calculator = RiskCalculator.__new__(RiskCalculator)
+    calculator.patient_data = patient
+    return calculator.calculate_framingham_score()
+
+
+def _columns(patients):
+    return {key: np.array([p[key] for p in patients], dtype=object if key in ('gender', 'smoking') else None)
+            for key in KEYS}
+
+
+def _grid():
+    """Every table cell, then every value of each numeric field against every categorical combination"""
+    for gender, age, cholesterol, hdl, systolic, (smoking, diabetes) in itertools.product(
+            ['Male', 'Female', 'Other'], AGE_REPRESENTATIVES, CHOLESTEROL_REPRESENTATIVES, HDL_REPRESENTATIVES,
+            SYSTOLIC_REPRESENTATIVES, itertools.product(['Never', 'Former', 'Current'], [False, True])):
+        yield [dict(zip(KEYS, (gender, age, cholesterol, hdl, systolic, smoking, diabetes)))]
+    for field, limit in SCANS.items():
+        for gender, smoking, diabetes in CATEGORICAL:
+            base = dict(FRAMINGHAM_DEFAULTS, gender=gender, smoking=smoking, diabetes=diabetes)
+            # Integers take the code lists, everything else bisect; kept apart so
+            # the batch paths see both int and float columns
+            yield [dict(base, **{field: value}) for value in range(limit)]
+            yield [dict(base, **{field: value + 0.5}) for value in range(limit)] + [dict(base, **{field: float('nan')})]
+
+
+def test_framingham_lookup_matches_reference_scoring():
+    report = validate_framingham_lookup()
+
+    assert report['checked'] > 1_000_000
+    assert report['mismatches'] == 0, report['examples']
+
+
+def test_every_input_matches_the_scalar_path():
+    checked = 0
+    for patients in _grid():
+        expected = [_reference(p) for p in patients]
+        data = _columns(patients)
+        batch = FRAMINGHAM_LOOKUP.scores(data)
+
+        assert [FRAMINGHAM_LOOKUP.score(p) for p in patients] == expected
+        assert framingham_points(data).tolist() == [e['score'] for e in expected]
+        assert batch['score'].tolist() == [e['score'] for e in expected]
+        assert batch['risk_percentage'].tolist() == [e['risk_percentage'] for e in expected]
+        assert batch['risk_category'].tolist() == [e['risk_category'] for e in expected]
+        checked += len(patients)
+
+    assert checked == 3 * 5 * 4 * 4 * 4 * 3 * 2 + len(CATEGORICAL) * sum(2 * limit + 1 for limit in SCANS.values())
+
+
+@pytest.mark.parametrize("missing", KEYS)
+def test_missing_fields_use_the_scalar_defaults(missing):
+    patient = {'gender': 'Female', 'age': 64, 'total_cholesterol': 250, 'hdl': 38, 'systolic': 145,
+               'smoking': 'Current', 'diabetes': True}
+    del patient[missing]
+    expected = _reference(patient)
+    data = {key: np.array([value], dtype=object if isinstance(value, str) else None) for key, value in patient.items()}
+
+    assert FRAMINGHAM_LOOKUP.score(patient) == expected
+    assert framingham_points(data).tolist() == [expected['score']]
+    assert {key: values[0] for key, values in FRAMINGHAM_LOOKUP.scores(data).items()} == expected
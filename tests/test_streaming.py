@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from Utils.EnhancedAgents import Cardiologist
+from Utils.FakeLLM import CHUNK_CHARS, FakeChatModel
+from Utils.LLMClients import astream_model, invoke_model, stream_model
+from Utils.ResponseCache import get_response_cache, set_response_cache
+from Utils.ResponseParsing import astream_structured, stream_structured
+
+PROMPT = Cardiologist("Chest pain on exertion", model_name="stub:unused").format_prompt()
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_PATH", "")
+    set_response_cache(None)
+    yield
+    set_response_cache(None)
+
+
+def _model():
+    return FakeChatModel(model_name="fake", latency=0, latency_distribution="fixed", tokens_per_second=1e9, seed=0)
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_chunks_assemble_to_the_full_reply():
+    chunks = list(stream_model(_model(), PROMPT, role="Cardiologist", use_cache=False))
+
+    assert len(chunks) > 1 and all(len(chunk) <= CHUNK_CHARS for chunk in chunks)
+    assert "".join(chunks) == invoke_model(_model(), PROMPT, role="Cardiologist", use_cache=False)
+    assert asyncio.run(_collect(astream_model(_model(), PROMPT, role="Cardiologist", use_cache=False))) == chunks
+
+
+def test_finished_stream_is_cached_as_one_chunk():
+    model = _model()
+    chunks = list(stream_model(model, PROMPT, role="Cardiologist"))
+
+    assert list(stream_model(model, PROMPT, role="Cardiologist")) == ["".join(chunks)]
+    assert asyncio.run(_collect(astream_model(model, PROMPT, role="Cardiologist"))) == ["".join(chunks)]
+    assert model.stats()["calls"] == 1
+
+
+def test_rejected_stream_is_not_cached():
+    model = _model()
+    list(stream_model(model, PROMPT, role="Cardiologist", accept=lambda text: False))
+
+    assert get_response_cache().stats()["memory_entries"] == 0
+    list(stream_model(model, PROMPT, role="Cardiologist"))
+    assert model.stats()["calls"] == 2
+
+
+def test_structured_stream_announces_each_field_once():
+    seen = []
+    parsed = stream_structured(_model(), PROMPT, Cardiologist.schema, role="Cardiologist",
+                               on_field=lambda key, value: seen.append((key, value)))
+
+    assert [key for key, _ in seen] == list(parsed)
+    assert dict(seen) == parsed
+    assert parsed["findings"] and parsed["severity"]
+
+
+def test_async_structured_stream_matches_sync():
+    seen = []
+    parsed = asyncio.run(astream_structured(_model(), PROMPT, Cardiologist.schema, role="Cardiologist",
+                                            on_field=lambda key, value: seen.append(key)))
+
+    assert parsed == stream_structured(_model(), PROMPT, Cardiologist.schema, role="Cardiologist")
+    assert seen == list(parsed)
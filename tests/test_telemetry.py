@@ -0,0 +1,48 @@
+import pytest
+
+from Utils.EnhancedAgents import Cardiologist
+from Utils.FakeLLM import FakeChatModel
+from Utils.ResponseCache import set_response_cache
+from Utils.ResponseParsing import invoke_structured
+from Utils.Telemetry import InMemoryExporter, Telemetry, set_telemetry
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    # Memory-only response cache and a fresh process-wide telemetry
+    monkeypatch.setenv("LLM_CACHE_PATH", "")
+    set_response_cache(None)
+    telemetry = Telemetry()
+    exporter = telemetry.add_exporter(InMemoryExporter())
+    set_telemetry(telemetry)
+    yield exporter
+    set_telemetry(None)
+    set_response_cache(None)
+
+
+def test_structured_call_exports_one_call_and_one_parse(exporter):
+    model = FakeChatModel(model_name="fake", latency=0, tokens_per_second=1e9, seed=0)
+    prompt = Cardiologist("Chest pain on exertion", model_name="stub:unused").format_prompt()
+
+    invoke_structured(model, prompt, Cardiologist.schema, role="Cardiologist")
+
+    call, parse = exporter.records
+    assert call["type"] == "call"
+    assert (call["role"], call["model"], call["schema"], call["cache"]) == (
+        "Cardiologist", "fake+json_object", "SpecialistResponse", "miss")
+    assert call["error"] is None and call["retries"] == 0
+    assert call["prompt_tokens"] > 0 and call["completion_tokens"] > 0
+    assert parse == {"type": "parse", "time": parse["time"], "role": "Cardiologist",
+                     "schema": "SpecialistResponse", "outcome": "ok", "reasks": 0}
+
+
+def test_cache_hit_is_exported_without_tokens(exporter):
+    model = FakeChatModel(model_name="fake", latency=0, tokens_per_second=1e9, seed=0)
+    prompt = Cardiologist("Chest pain on exertion", model_name="stub:unused").format_prompt()
+
+    invoke_structured(model, prompt, Cardiologist.schema, role="Cardiologist")
+    invoke_structured(model, prompt, Cardiologist.schema, role="Cardiologist")
+
+    calls = [record for record in exporter.records if record["type"] == "call"]
+    assert [record["cache"] for record in calls] == ["miss", "hit"]
+    assert calls[1]["prompt_tokens"] == calls[1]["completion_tokens"] == 0
@@ -0,0 +1,87 @@
+import numbers
+
+import numpy as np
+import pytest
+
+from Utils.RiskModels import RISK_MODEL_DEFAULTS, RISK_MODEL_REGISTRY
+from Utils.WhatIf import WHAT_IF_PRESETS, WhatIfSimulator
+
+PATIENT = {
+    'age': 58, 'gender': 'Male', 'ethnicity': 'African American', 'systolic': 148, 'hypertension': True,
+    'total_cholesterol': 236, 'hdl': 38, 'smoking': 'Current', 'diabetes': True
+}
+# Fields the models fall back to defaults for are left out
+PARTIAL_PATIENT = {'age': 63, 'gender': 'Female', 'systolic': 152}
+
+SCENARIOS = list(WHAT_IF_PRESETS.values()) + [
+    {'age': 5}, {'gender': 'Female'}, {'systolic': -15, 'smoking': 'Never', 'hdl': 5}, {}
+]
+
+
+def _recomputed(model, patient, change):
+    """Risk of the modified patient scored from scratch"""
+    modified = dict(patient)
+    for field, value in change.items():
+        base = patient.get(field, RISK_MODEL_DEFAULTS[field])
+        numeric = isinstance(value, numbers.Number) and not isinstance(value, bool)
+        modified[field] = base + value if numeric else value
+    return float(model.predict({field: [value] for field, value in modified.items()})[0])
+
+
+@pytest.mark.parametrize('patient', [PATIENT, PARTIAL_PATIENT], ids=['full', 'partial'])
+@pytest.mark.parametrize('key', list(RISK_MODEL_REGISTRY))
+def test_simulate_matches_full_recomputation(key, patient):
+    simulator = WhatIfSimulator(patient, key)
+    model = RISK_MODEL_REGISTRY[key]
+
+    expected = [_recomputed(model, patient, change) for change in SCENARIOS]
+    np.testing.assert_allclose(simulator.simulate(SCENARIOS), expected)
+    assert simulator.base_risk == pytest.approx(_recomputed(model, patient, {}))
+
+
+@pytest.mark.parametrize('patient', [PATIENT, PARTIAL_PATIENT], ids=['full', 'partial'])
+@pytest.mark.parametrize('key', list(RISK_MODEL_REGISTRY))
+def test_tornado_matches_full_recomputation(key, patient):
+    simulator = WhatIfSimulator(patient, key)
+    model = RISK_MODEL_REGISTRY[key]
+
+    tornado = simulator.tornado()
+    assert tornado
+    for label, risk in tornado.items():
+        assert risk == pytest.approx(_recomputed(model, patient, WHAT_IF_PRESETS[label]))
+
+
+def test_tornado_leaves_out_changes_that_do_nothing_or_are_not_modelled():
+    # The partial patient is not diabetic under the defaults
+    framingham = WhatIfSimulator(PARTIAL_PATIENT, 'Framingham')
+    assert 'Diabetes in remission' not in framingham.tornado()
+    assert 'Quit smoking' not in WhatIfSimulator(dict(PARTIAL_PATIENT, smoking='Former'), 'Framingham').tornado()
+    assert framingham.unmodelled() == []
+
+    score2 = WhatIfSimulator(PATIENT, 'SCORE2')
+    assert 'Diabetes in remission' not in score2.tornado()
+    assert score2.unmodelled() == ['Diabetes in remission']
+
+
+def test_unknown_fields_do_not_crash():
+    simulator = WhatIfSimulator(PARTIAL_PATIENT, 'Framingham')
+
+    assert simulator.tornado({'BMI −2': {'bmi': -2}}) == {}
+    np.testing.assert_allclose(simulator.simulate([{'bmi': -2}]), [simulator.base_risk])
+
+
+@pytest.mark.parametrize('key', list(RISK_MODEL_REGISTRY))
+def test_heatmap_matches_full_recomputation(key):
+    simulator = WhatIfSimulator(PARTIAL_PATIENT, key)
+    model = RISK_MODEL_REGISTRY[key]
+    x_changes, y_changes = [0, -10, -20], [None, -20, -40]
+
+    matrix = simulator.heatmap('systolic', x_changes, 'total_cholesterol', y_changes, extra={'smoking': 'Never'})
+
+    assert matrix.shape == (3, 3)
+    for row, y in enumerate(y_changes):
+        for col, x in enumerate(x_changes):
+            change = {'smoking': 'Never', 'systolic': x}
+            if y is not None:
+                change['total_cholesterol'] = y
+            assert matrix[row, col] == pytest.approx(_recomputed(model, PARTIAL_PATIENT, change))